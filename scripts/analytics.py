@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Lifecycle analytics from the beads interaction log.
+
+Reads every status transition bd recorded and keeps running aggregates in
+.git/ct/analytics.json:
+
+    time_in_status   how long tasks sit in open, in_progress, review, ...
+    review           transitions into review, and review -> in_progress
+                     bounces (feedback rework, as begin-work's resume sees it)
+    cycle_time       first in_progress (else creation) to close, by issue
+                     type and by meta/game category
+    throughput       tasks closed per day (UTC)
+
+.beads/interactions.jsonl is append-only, so it is streamed from the byte
+offset the previous run stopped at (a trailing partial line waits for the
+next run); years of history are read once, and each later run only parses
+what was appended. A log that shrank or whose first bytes changed was
+rewritten, and is re-read from the start.
+
+Without an interaction log, the issue history in issues.jsonl is used
+instead: each run compares every issue's status with the one seen last time
+and records a transition at its updated_at (closed_at for closes). That sees
+at most one transition per issue between runs, so run it often (e.g. from
+session-start hooks) or enable the interaction log. The IDs of closed issues
+are kept (a few bytes each), so a close is counted once whatever its
+closed_at, and a reopened issue resumes at its updated_at instead of being
+created again. The file is only parsed when its size or mtime changed.
+
+Durations are kept in the log-linear histograms of metrics.py, so
+quantiles come from a few hundred integers however long the history gets.
+
+Usage:
+    python3 scripts/analytics.py [--days 30] [--rebuild] [--pretty]
+    python3 scripts/analytics.py bench [--issues 20000]
+    ct analytics --pretty
+
+Output JSON:
+    {
+        "source": "interactions",              // or "issues"
+        "events": 48211, "new_events": 12,
+        "time_in_status": {"in_progress": {"count": 4012, "p50_h": 3.1, "p90_h": 26.0, "mean_h": 9.4}},
+        "review": {"entered": 3980, "bounces": 611, "bounced_tasks": 502, "bounce_rate": 0.154},
+        "cycle_time": {
+            "by_type": {"task": {"count": 2900, "p50_h": 20.5, "p90_h": 96.0, "mean_h": 41.2}},
+            "by_category": {"meta": {...}, "game": {...}}
+        },
+        "throughput": {"days": {"2026-01-04": 7, "2026-01-05": 3}, "per_day": 5.0, "total": 3890},
+        "elapsed_ms": 2.4
+    }
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import metrics
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+STATE_FILE = "analytics.json"
+STATE_VERSION = 2
+LOG_NAME = "interactions.jsonl"
+
+# Bytes fingerprinted to notice a rewritten (not appended) log
+HEAD_BYTES = 256
+
+DEFAULT_DAYS = 30
+QUANTILES = (0.5, 0.9)
+
+_TIME_RE = re.compile(r"^(.+?T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?$")
+
+
+def parse_time(value) -> float | None:
+    """Epoch seconds of an RFC 3339 timestamp (nanosecond fractions allowed), None if invalid."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+    match = _TIME_RE.match(value.strip())
+    if not match:
+        return None
+    base, fraction, zone = match.groups()
+    text = base + (f".{fraction[:6]}" if fraction else "") + ("+00:00" if zone in (None, "Z") else zone)
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def empty_state(source: str) -> dict:
+    return {
+        "version": STATE_VERSION,
+        "source": source,
+        "log": None,
+        "issues_signature": None,
+        "events": 0,
+        "issues": {},
+        "time_in_status": {},
+        "reviews": 0,
+        "bounces": 0,
+        "bounced_tasks": 0,
+        "cycle": {"by_type": {}, "by_category": {}},
+        "throughput": {},
+        "closed_ids": [],
+    }
+
+
+class Context:
+    """Issue types and meta/game categories, loaded only if a close needs them."""
+
+    def __init__(self, project_root: Path | None):
+        self.project_root = project_root
+        self._issues = None
+        self._meta = None
+
+    def _load(self) -> None:
+        import depgraph
+        import issue_store
+
+        issues = issue_store.load_issues(self.project_root, export_fallback=False) if self.project_root else []
+        self._issues = {i["id"]: i for i in issues}
+        graph = depgraph.DepGraph.from_issues(issues)
+        self._meta = graph.descendants(depgraph.META_EPIC) if depgraph.META_EPIC in graph else set()
+
+    def issue_type(self, issue_id: str) -> str:
+        if self._issues is None:
+            self._load()
+        return self._issues.get(issue_id, {}).get("issue_type") or "unknown"
+
+    def category(self, issue_id: str) -> str:
+        if self._meta is None:
+            self._load()
+        return "meta" if issue_id in self._meta else "game"
+
+
+def _record(histograms: dict, key: str, seconds: float) -> None:
+    micros = max(0, int(seconds * 1_000_000))
+    metrics.add_samples(histograms.setdefault(key, metrics.empty_histogram()), [micros])
+
+
+def apply(state: dict, issue_id: str, status: str, at: float, context: Context, created: bool = False) -> None:
+    """
+    Apply one status transition to the aggregates.
+
+    Args:
+        state: Analytics state (updated in place)
+        issue_id: Issue that changed
+        status: Its new status
+        at: When, epoch seconds
+        context: Issue types and categories
+        created: The transition is the issue's creation
+    """
+    entry = state["issues"].get(issue_id)
+    if entry is None:
+        entry = state["issues"][issue_id] = {"status": None, "since": at}
+    if created:
+        entry["created"] = at
+
+    old = entry["status"]
+    if old == status:
+        return
+    if old is not None:
+        _record(state["time_in_status"], old, at - entry["since"])
+    if old == "review" and status == "in_progress":
+        state["bounces"] += 1
+        if not entry.get("bounced"):
+            state["bounced_tasks"] += 1
+            entry["bounced"] = True
+    if status == "review":
+        state["reviews"] += 1
+    if status == "in_progress" and "started" not in entry:
+        entry["started"] = at
+
+    if status == "closed":
+        start = entry.get("started", entry.get("created"))
+        if start is not None:
+            _record(state["cycle"]["by_type"], context.issue_type(issue_id), at - start)
+            _record(state["cycle"]["by_category"], context.category(issue_id), at - start)
+        day = time.strftime("%Y-%m-%d", time.gmtime(at))
+        state["throughput"][day] = state["throughput"].get(day, 0) + 1
+        # Only open work is tracked, so the state stays small however long the history
+        del state["issues"][issue_id]
+        return
+
+    entry["status"] = status
+    entry["since"] = at
+
+
+def _value_status(value) -> str | None:
+    """Status from an event's old/new value (a plain string or a JSON object)."""
+    if isinstance(value, str) and value.startswith("{"):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    if isinstance(value, dict):
+        value = value.get("status")
+    return value if isinstance(value, str) and value else None
+
+
+def apply_event(state: dict, record: dict, context: Context) -> bool:
+    """
+    Apply one interaction-log record; returns whether it was a status event.
+
+    Understands bd's event records: created, status_changed (new_value is
+    the status), closed and reopened.
+    """
+    issue_id = record.get("issue_id")
+    kind = record.get("event_type") or record.get("type")
+    at = parse_time(record.get("created_at") or record.get("timestamp"))
+    if not issue_id or at is None:
+        return False
+    if kind == "created":
+        apply(state, issue_id, "open", at, context, created=True)
+    elif kind == "status_changed":
+        status = _value_status(record.get("new_value"))
+        if status is None:
+            return False
+        apply(state, issue_id, status, at, context)
+    elif kind == "closed":
+        apply(state, issue_id, "closed", at, context)
+    elif kind == "reopened":
+        apply(state, issue_id, "open", at, context)
+    else:
+        return False
+    return True
+
+
+def _head(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(HEAD_BYTES), digest_size=8).hexdigest()
+
+
+def ingest_log(state: dict, path: Path, context: Context) -> int:
+    """
+    Apply what was appended to the log since the saved offset.
+
+    Returns:
+        Status events applied
+    """
+    size = path.stat().st_size
+    head = _head(path)
+    log = state["log"]
+    if log is None or log["path"] != str(path) or size < log["offset"] \
+            or (log["offset"] >= HEAD_BYTES and log["head"] != head):
+        # New or rewritten log: start over
+        state.update(empty_state("interactions"))
+        log = state["log"] = {"path": str(path), "offset": 0, "head": head}
+
+    with open(path, "rb") as f:
+        f.seek(log["offset"])
+        data = f.read()
+    end = data.rfind(b"\n") + 1  # A partial last line waits for the next run
+
+    applied = 0
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict) and apply_event(state, record, context):
+            applied += 1
+    log["offset"] += end
+    log["head"] = head
+    state["events"] += applied
+    return applied
+
+
+def ingest_issues(state: dict, project_root: Path, context: Context) -> int:
+    """
+    Record status changes between issues.jsonl snapshots (no interaction log).
+
+    Returns:
+        Transitions applied
+    """
+    import issue_store
+
+    store = issue_store.find_store(project_root)
+    if store is None:
+        return 0
+    stat = store.stat()
+    signature = [str(store), stat.st_mtime_ns, stat.st_size]
+    if state["issues_signature"] == signature:
+        return 0
+
+    applied = 0
+    closed = set(state["closed_ids"])
+    with open(store) as f:
+        for issue in issue_store.parse_lines(f):
+            issue_id = issue.get("id")
+            status = issue.get("status")
+            if not issue_id or not status:
+                continue
+            entry = state["issues"].get(issue_id)
+            if entry is not None and entry["status"] == status:
+                continue
+            if entry is None and issue_id in closed:
+                if status == "closed":
+                    continue  # Counted by an earlier run
+                # Reopened: its entry went at the close, so resume from the reopen
+                closed.discard(issue_id)
+                apply(state, issue_id, status, parse_time(issue.get("updated_at")) or time.time(), context)
+                applied += 1
+                continue
+            if entry is None:
+                created = parse_time(issue.get("created_at"))
+                if created is not None:
+                    apply(state, issue_id, "open", created, context, created=True)
+                    applied += 1
+            at = parse_time(issue.get("closed_at") if status == "closed" else None) \
+                or parse_time(issue.get("updated_at")) or time.time()
+            if state["issues"].get(issue_id, {}).get("status") != status:
+                apply(state, issue_id, status, at, context)
+                applied += 1
+            if status == "closed":
+                closed.add(issue_id)
+    state["closed_ids"] = sorted(closed)
+    state["issues_signature"] = signature
+    state["events"] += applied
+    return applied
+
+
+def _stats(histogram: dict) -> dict:
+    hour = 3600 * 1_000_000
+    return {
+        "count": histogram["count"],
+        **{f"p{round(q * 100)}_h": round(metrics.quantile(histogram, q) / hour, 2) for q in QUANTILES},
+        "mean_h": round(histogram["sum_us"] / histogram["count"] / hour, 2),
+    }
+
+
+def report(state: dict, days: int, new_events: int) -> dict:
+    """Summary of the aggregates (see module docstring)."""
+    today = time.time()
+    window = [time.strftime("%Y-%m-%d", time.gmtime(today - n * 86400)) for n in range(days - 1, -1, -1)]
+    recent = {day: state["throughput"].get(day, 0) for day in window}
+    return {
+        "source": state["source"],
+        "events": state["events"],
+        "new_events": new_events,
+        "time_in_status": {k: _stats(h) for k, h in sorted(state["time_in_status"].items()) if h["count"]},
+        "review": {
+            "entered": state["reviews"],
+            "bounces": state["bounces"],
+            "bounced_tasks": state["bounced_tasks"],
+            "bounce_rate": round(state["bounces"] / state["reviews"], 3) if state["reviews"] else None,
+        },
+        "cycle_time": {
+            group: {k: _stats(h) for k, h in sorted(histograms.items()) if h["count"]}
+            for group, histograms in state["cycle"].items()
+        },
+        "throughput": {
+            "days": recent,
+            "per_day": round(sum(recent.values()) / days, 2) if days else None,
+            "total": sum(state["throughput"].values()),
+        },
+    }
+
+
+def update(project_root: Path, rebuild: bool = False) -> tuple[dict, int]:
+    """
+    Bring the saved aggregates up to date.
+
+    Returns:
+        Tuple of (state, events applied by this run)
+    """
+    import issue_store
+
+    path = state_dir() / STATE_FILE
+    log = issue_store.find_store(project_root, LOG_NAME)
+    source = "interactions" if log is not None else "issues"
+
+    state = None if rebuild else read_json(path, default=None)
+    if not state or state.get("version") != STATE_VERSION or state.get("source") != source:
+        state = empty_state(source)
+
+    context = Context(project_root)
+    if log is not None:
+        applied = ingest_log(state, log, context)
+    else:
+        applied = ingest_issues(state, project_root, context)
+
+    if applied or rebuild:
+        try:
+            write_json(path, state)
+        except OSError:
+            pass
+    return state, applied
+
+
+def synthetic_log(path: Path, issue_count: int) -> int:
+    """Write three years of plausible bd events for issue_count issues; returns events written."""
+    import random
+
+    rng = random.Random(7)
+    start = time.time() - 3 * 365 * 86400
+    events = []
+    for n in range(issue_count):
+        issue_id = f"bench-{n}"
+        at = start + n * (3 * 365 * 86400 / issue_count)
+        events.append((at, issue_id, "created", None))
+        for status in ("in_progress", "review"):
+            at += rng.expovariate(1 / 20000)
+            events.append((at, issue_id, "status_changed", status))
+        while rng.random() < 0.2:
+            for status in ("in_progress", "review"):
+                at += rng.expovariate(1 / 10000)
+                events.append((at, issue_id, "status_changed", status))
+        at += rng.expovariate(1 / 5000)
+        events.append((at, issue_id, "closed", None))
+    events.sort()
+    with open(path, "w") as f:
+        for at, issue_id, kind, status in events:
+            record = {"issue_id": issue_id, "event_type": kind, "actor": "bench",
+                      "created_at": datetime.fromtimestamp(at, timezone.utc).isoformat().replace("+00:00", "Z")}
+            if status:
+                record["new_value"] = status
+            f.write(json.dumps(record) + "\n")
+    return len(events)
+
+
+def bench(issue_count: int) -> dict:
+    """Time a full read of a synthetic log, an incremental run, and an idle run with report."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / LOG_NAME
+        state_path = Path(tmp) / STATE_FILE
+        events = synthetic_log(log, issue_count)
+        context = Context(None)
+
+        def run() -> tuple[dict, int, float]:
+            start = time.perf_counter()
+            state = read_json(state_path, default=None) or empty_state("interactions")
+            applied = ingest_log(state, log, context)
+            if applied:
+                write_json(state_path, state)
+            report(state, DEFAULT_DAYS, applied)
+            return state, applied, round((time.perf_counter() - start) * 1000, 1)
+
+        _, _, full_ms = run()
+        with open(log, "a") as f:
+            for n in range(50):
+                f.write(json.dumps({"issue_id": f"new-{n}", "event_type": "created",
+                                    "created_at": datetime.now(timezone.utc).isoformat()}) + "\n")
+        _, applied, incremental_ms = run()
+        state, _, idle_ms = run()
+
+        return {
+            "issues": issue_count,
+            "events": events,
+            "log_bytes": log.stat().st_size,
+            "state_bytes": state_path.stat().st_size,
+            "ms": {"full": full_ms, "incremental": incremental_ms, "idle": idle_ms},
+            "incremental_events": applied,
+            "review": report(state, DEFAULT_DAYS, 0)["review"],
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time in status, review bounces, cycle time and throughput")
+    parser.add_argument("command", nargs="?", default="report", choices=["report", "bench"])
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help=f"Throughput window (default {DEFAULT_DAYS})")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the saved aggregates and re-read everything")
+    parser.add_argument("--issues", type=int, default=20000, help="bench: synthetic issues")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        output = bench(args.issues)
+    else:
+        start = time.perf_counter()
+        project_root = find_project_root()
+        if project_root is None:
+            print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+            return 1
+        state, applied = update(project_root, args.rebuild)
+        output = report(state, max(1, args.days), applied)
+        output["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
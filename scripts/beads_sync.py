@@ -0,0 +1,199 @@
+"""
+Coalescing coordinator for `bd sync`.
+
+Every `bd sync` commits to the beads-sync branch and may talk to the remote,
+yet the lifecycle scripts request one at several points per run (session-end
+three times, end-work twice). A SyncCoordinator turns those requests into
+the minimum number of real syncs:
+
+    - Within a run: a request is skipped when nothing was marked dirty and
+      the beads database fingerprint still matches the one recorded after
+      the last sync.
+    - Across runs: syncs are serialized with the beads-sync lock, and the fingerprint
+      stamp is shared, so a script that waited for another one's sync (or
+      starts within COALESCE_WINDOW of it) finds the state already synced
+      and skips its own.
+    - Otherwise `bd sync --status` is asked first, and the sync only runs if
+      it reports pending changes (or its output can't be read). That only
+      covers outgoing changes, so the stamp also records what a pull can
+      bring in (the remote-tracking beads-sync ref and issues.jsonl): when
+      either moved since the last sync, the sync runs to import it.
+
+Example:
+    coordinator = SyncCoordinator(["--json"])
+    coordinator.sync()          # runs bd sync
+    coordinator.sync()          # skipped: nothing changed
+    run(["bd", "close", ...])
+    coordinator.mark_dirty()
+    coordinator.sync()          # runs again
+"""
+
+import json
+import time
+from pathlib import Path
+
+import cmdcache
+import locks
+import netsync
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+STAMP_FILE = "beads-sync.json"
+
+# bd sync may pull and push; allow a slow remote before giving up on the lock
+LOCK_TIMEOUT = 120.0
+
+# How recent another script's sync must be to stand in for ours. Older stamps
+# are ignored so the first sync of a run still picks up remote changes.
+COALESCE_WINDOW = 60.0
+
+
+def has_pending(status_output: str) -> bool | None:
+    """
+    Interpret `bd sync --status --json` output.
+
+    Returns:
+        True/False if the output could be read, None if not
+    """
+    try:
+        data = json.loads(status_output)
+        # bd sync --status returns info about pending changes
+        return bool(data.get("pending", False) or data.get("uncommitted", False))
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def pending_status() -> bool | None:
+    """Ask bd whether there are unsynced beads changes. None if unknown."""
+    try:
+        result = cmdcache.run(["bd", "sync", "--status", "--json"])
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    return has_pending(result.stdout)
+
+
+def _stat(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class SyncCoordinator:
+    """
+    Tracks whether beads state needs syncing and runs `bd sync` only when it does.
+
+    Args:
+        sync_args: Extra arguments for `bd sync` (e.g. ["--json"])
+    """
+
+    def __init__(self, sync_args: list[str] | None = None):
+        self.sync_args = sync_args or []
+        self.dirty = True  # Nothing is known about the state before the first request
+        self.requested = 0
+        self.ran = 0
+
+    def mark_dirty(self) -> None:
+        """Record that this run changed beads state (bd update/close/...)."""
+        self.dirty = True
+
+    def _fingerprint(self) -> dict | None:
+        """
+        Fingerprint of the beads state a sync would act on.
+
+        Returns:
+            Dict with 'database' (beads DB files) and 'inbound' (what a pull
+            brings in: the remote-tracking beads-sync ref and issues.jsonl),
+            or None outside a repository
+        """
+        project_root = find_project_root()
+        if project_root is None:
+            return None
+        remote_ref = f"refs/remotes/{netsync.REMOTE}/{netsync.BRANCHES[1]}"
+        return {
+            "database": cmdcache.beads_fingerprint(project_root),
+            "inbound": [
+                netsync.ref_shas(project_root).get(remote_ref),
+                _stat(project_root / ".beads" / "issues.jsonl"),
+            ],
+        }
+
+    def _stamp_path(self) -> Path:
+        return state_dir() / STAMP_FILE
+
+    def _in_sync(self, fingerprint: dict | None, max_age: float | None = None) -> bool:
+        """
+        True if the given beads state was already synced by someone.
+
+        Args:
+            fingerprint: Current state, from _fingerprint()
+            max_age: Ignore stamps older than this many seconds
+        """
+        stamp = read_json(self._stamp_path(), default={})
+        if max_age is not None and time.time() - stamp.get("synced_at", 0) > max_age:
+            return False
+        return fingerprint is not None and stamp.get("fingerprint") == fingerprint
+
+    def _inbound_changed(self, fingerprint: dict | None) -> bool:
+        """True if a pull brought in beads changes since the last sync."""
+        stamp = read_json(self._stamp_path(), default={}).get("fingerprint") or {}
+        return fingerprint is None or stamp.get("inbound") != fingerprint["inbound"]
+
+    def _record(self, fingerprint: dict | None = None) -> None:
+        write_json(self._stamp_path(), {
+            "fingerprint": fingerprint or self._fingerprint(),
+            "synced_at": time.time(),
+        })
+        self.dirty = False
+
+    def sync(self) -> dict:
+        """
+        Request a sync; run `bd sync` only if something is pending.
+
+        Returns dict with:
+            - ran: whether bd sync actually executed
+            - ok: False only if bd sync ran and failed
+            - reason: why it ran or was skipped
+            - details: stderr of a failed sync
+        """
+        self.requested += 1
+
+        if not self.dirty and self._in_sync(self._fingerprint()):
+            return {"ran": False, "ok": True, "reason": "coalesced"}
+
+        with locks.hold((locks.BEADS_SYNC, locks.EXCLUSIVE), timeout=LOCK_TIMEOUT):
+            # Another script may have synced while we waited for the lock
+            fingerprint = self._fingerprint()
+            if self._in_sync(fingerprint, max_age=COALESCE_WINDOW):
+                self.dirty = False
+                return {"ran": False, "ok": True, "reason": "already synced"}
+
+            # --status only knows local changes; a pull may have brought remote ones
+            inbound = self._inbound_changed(fingerprint)
+            if not inbound and pending_status() is False:
+                self._record(fingerprint)
+                return {"ran": False, "ok": True, "reason": "nothing pending"}
+
+            cmd = ["bd", "sync", *self.sync_args]
+            try:
+                result = cmdcache.run(cmd)
+            except FileNotFoundError:
+                return {"ran": False, "ok": False, "reason": "bd not found", "details": ""}
+
+            self.ran += 1
+            if result.returncode != 0:
+                return {
+                    "ran": True,
+                    "ok": False,
+                    "reason": "failed",
+                    "details": f"Exit code: {result.returncode}\nStderr: {result.stderr}",
+                }
+
+            self._record()
+            return {"ran": True, "ok": True, "reason": "remote changes" if inbound else "pending changes"}
+
+    def stats(self) -> dict:
+        """Requested vs executed syncs, for script output."""
+        return {"requested": self.requested, "ran": self.ran}
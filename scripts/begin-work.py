@@ -8,6 +8,11 @@ Usage:
     begin-work.py <task-id>             # Implementer mode
     begin-work.py --review <task-id>    # Reviewer mode
     begin-work.py --research <task-id>  # Research mode
+    begin-work.py --review <task-id> --snapshot    # Also a read-only copy of the branch in tmpfs
+    begin-work.py --research <task-id> --snapshot  # Read-only copy of master in tmpfs
+    begin-work.py <task-id> --since <token>  # Resume/review: only what changed
+    begin-work.py --claim-next          # Claim the top ready task and set it up
+    begin-work.py --claim-next --count 3  # Claim up to 3 (one per agent)
 
 Output JSON:
     {
@@ -25,18 +30,52 @@ Output JSON:
         "workspace": {
             "worktree_path": "./worktrees/xyz",
             "worktree_name": "xyz",
-            "branch_name": "task/xyz"
+            "branch_name": "task/xyz",
+            "sparse": [".claude", "plans", "scripts"],  // mode="new" with a sparse:<profile> label only
+            "snapshot_path": "/dev/shm/ct-snapshots-1000/.../xyz-1a2b3c4d5e6f",  // --snapshot only
+            "snapshot_rev": "1a2b3c..."
         },
-        "mode": "new" | "resume" | "review" | "research",
+        "mode": "new" | "resume" | "review" | "research",  // research: workspace only with --snapshot
+        "related": [  // mode="research" only: past tasks matching the title (full-text index)
+            {"id": "spacetraders-abc", "title": "...", "status": "closed", "score": 8.2, "snippet": "..."}
+        ],
         "resume_context": {  // Present when mode="resume" or "review"
             "commits": ["abc123 commit title", ...],  // git log --oneline master..HEAD
             "uncommitted_changes": ["M file.rs", ...],  // git status --short
             "notes_sections": ["COMPLETED", "IN_PROGRESS", ...]  // Known sections found in notes
-        }
+        },
+        "resume_token": "3f9c0a1b2d4e"  // Present when mode="resume" or "review"; pass to --since
+    }
+
+Output JSON (resume/review with --since <token>):
+    {
+        "task": {  // Only fields that changed since the token's payload
+            "id": "spacetraders-xyz",
+            "notes_changed": {"IN_PROGRESS": "IN_PROGRESS: ..."},  // Changed notes sections
+            "notes_removed": ["NEXT"],
+            "comments_changed": [{"id": 4, ...}],  // New or edited comments
+            "comments_removed": ["2"]
+        },
+        "workspace": {...}, "mode": "resume",
+        "resume_context": {
+            "commits_added": ["def456 ..."],  // Commits not in the previous payload
+            "commits_removed": 1,              // e.g. after a rebase
+            "uncommitted_changes": [...],      // Only if the list changed
+            "notes_sections": [...]            // Only if notes sections changed
+        },
+        "resume_token": "8e1d...",
+        "delta": {"since": "3f9c0a1b2d4e", "full": false}  // full=true: unknown token, full payload sent
+    }
+
+Output JSON (--claim-next):
+    {
+        "requested": 3,
+        "claimed": [ <implementer-mode output as above, mode="new">, ... ],
+        "skipped": [{"id": "spacetraders-abc", "reason": "status is in_progress"}]
     }
 
 Exit codes:
-    0: Success
+    0: Success (including a --claim-next that found nothing to claim)
     1: Error (with JSON error message on stderr)
 """
 
@@ -44,8 +83,15 @@ import argparse
 import json
 import subprocess
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 
+import cmdcache
+import locks
+import resume_delta
+import taskids
+import timing
+
 
 def error_exit(message: str, details: str = "") -> None:
     """Exit with error JSON on stderr and non-zero exit code."""
@@ -56,14 +102,16 @@ def error_exit(message: str, details: str = "") -> None:
     sys.exit(1)
 
 
-def run_command(cmd: list[str], capture_output: bool = True, check: bool = True) -> subprocess.CompletedProcess:
-    """Run a command and return the result."""
+def run_command(cmd: list[str], capture_output: bool = True, check: bool = True,
+                cache: bool = True) -> subprocess.CompletedProcess:
+    """Run a command and return the result (cache=False bypasses cmdcache hits)."""
     try:
-        return subprocess.run(
+        return cmdcache.run(
             cmd,
             capture_output=capture_output,
             text=True,
-            check=check
+            check=check,
+            cache=cache
         )
     except subprocess.CalledProcessError as e:
         error_exit(
@@ -74,6 +122,17 @@ def run_command(cmd: list[str], capture_output: bool = True, check: bool = True)
         error_exit(f"Command not found: {cmd[0]}")
 
 
+@contextmanager
+def hold_locks(*requests: tuple[str, str]):
+    """Hold repository locks (see locks.py), exiting with an error on timeout."""
+    try:
+        with locks.hold(*requests):
+            yield
+    except locks.LockTimeout as e:
+        error_exit(str(e), "Another agent holds the lock; inspect with `ct locks`")
+
+
+@timing.timed
 def get_task_info(task_id: str) -> dict:
     """
     Fetch task information from beads.
@@ -81,9 +140,17 @@ def get_task_info(task_id: str) -> dict:
     Args:
         task_id: Task ID (short or full form)
 
+    Short and partial IDs are resolved against the local ID index first
+    (a partial ID is confirmed with a cached `bd show`, see taskids.py).
+
     Returns:
         Task information dict
     """
+    try:
+        task_id = taskids.resolve(task_id) or task_id
+    except taskids.AmbiguousId as e:
+        error_exit(str(e), "Candidates: " + ", ".join(e.candidates[:taskids.MAX_CANDIDATES]))
+
     result = run_command(["bd", "show", task_id, "--json"])
 
     try:
@@ -103,6 +170,7 @@ def get_task_info(task_id: str) -> dict:
     return task
 
 
+@timing.timed
 def get_task_comments(task_id: str) -> list:
     """
     Fetch comments for a task from beads.
@@ -114,7 +182,7 @@ def get_task_comments(task_id: str) -> list:
         List of comment dicts, or empty list if none
     """
     try:
-        result = subprocess.run(
+        result = cmdcache.run(
             ["bd", "comments", task_id, "--json"],
             capture_output=True,
             text=True,
@@ -137,10 +205,9 @@ def get_project_root() -> Path:
 
 def extract_short_id(full_id: str) -> str:
     """Extract short ID from full ID (e.g., 'spacetraders-q4x' -> 'q4x')."""
-    parts = full_id.split("-", 1)
-    if len(parts) != 2:
+    if "-" not in full_id:
         error_exit(f"Invalid task ID format: {full_id}")
-    return parts[1]
+    return taskids.short_id(full_id)
 
 
 def check_worktree_exists(worktree_path: Path) -> bool:
@@ -159,24 +226,35 @@ def get_branch_name(task: dict, short_id: str) -> str:
     return f"{issue_type}/{short_id}"
 
 
-def create_worktree(worktree_path: Path, branch_name: str) -> None:
+@timing.timed
+def create_worktree(worktree_path: Path, branch_name: str, sparse_dirs: list[str] | None = None) -> None:
     """
-    Create a new worktree and branch.
+    Create a new worktree and branch, checking files out in parallel.
 
     Args:
         worktree_path: Path where worktree should be created
         branch_name: Name of the branch to create
+        sparse_dirs: Cone-mode sparse-checkout directories (None: full checkout)
     """
+    from materialize import PARALLEL_CHECKOUT
+
     # Ensure worktrees directory exists
     worktree_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Create worktree with new branch based on master
-    run_command([
-        "git", "worktree", "add",
-        str(worktree_path),
-        "-b", branch_name,
-        "master"
-    ])
+    if sparse_dirs is None:
+        # Create worktree with new branch based on master
+        run_command([
+            "git", *PARALLEL_CHECKOUT, "worktree", "add",
+            str(worktree_path),
+            "-b", branch_name,
+            "master"
+        ])
+        return
+
+    # Sparse: set the profile before anything is written
+    run_command(["git", "worktree", "add", "--no-checkout", str(worktree_path), "-b", branch_name, "master"])
+    run_command(["git", "-C", str(worktree_path), "sparse-checkout", "set", "--cone", *sparse_dirs])
+    run_command(["git", "-C", str(worktree_path), *PARALLEL_CHECKOUT, "checkout", "-q"])
 
 
 def prime_worktree(worktree_path: Path, project_root: Path) -> None:
@@ -209,15 +287,234 @@ def prime_worktree(worktree_path: Path, project_root: Path) -> None:
                 print(f"Warning: Failed to copy {source_rel}: {e}", file=sys.stderr)
 
 
-def set_task_in_progress(task_id: str) -> None:
-    """Set task status to in_progress to claim work."""
-    run_command(["bd", "update", task_id, "--status", "in_progress"])
+def setup_worktree(task: dict, short_id: str, project_root: Path) -> tuple[Path, str, list[str] | None]:
+    """
+    Create and prime the worktree for a newly started task.
+
+    The checkout is full unless the task has a `sparse:<profile>` label
+    (see materialize.SPARSE_PROFILES).
+
+    The worktree is recorded in the registry (see registry.py).
+
+    Returns:
+        Tuple of (worktree_path, branch_name, sparse directories or None)
+    """
+    import registry
+    from materialize import sparse_profile
+
+    worktree_path = project_root / "worktrees" / short_id
+    branch_name = get_branch_name(task, short_id)
+    sparse_dirs = sparse_profile(task.get("labels", []))
+    # Branching off master only needs it not to move underneath us;
+    # other agents can create their own worktrees at the same time
+    with hold_locks((locks.MASTER, locks.SHARED), (locks.worktree(short_id), locks.EXCLUSIVE)):
+        base = run_command(["git", "rev-parse", "master"]).stdout.strip()
+        create_worktree(worktree_path, branch_name, sparse_dirs)
+        prime_worktree(worktree_path, project_root)
+        registry.register(task["id"], short_id, branch_name, base)
+    return (worktree_path, branch_name, sparse_dirs)
+
+
+@timing.timed
+def take_snapshot(project_root: Path, rev: str, name: str) -> dict:
+    """
+    Read-only copy of rev in tmpfs (see materialize.snapshot).
+
+    Returns:
+        Workspace fields: snapshot_path and snapshot_rev
+    """
+    import materialize
+
+    try:
+        path, sha = materialize.snapshot(project_root, rev, name)
+    except (RuntimeError, OSError) as e:
+        error_exit(f"Could not snapshot {rev}", str(e))
+    return {"snapshot_path": str(path), "snapshot_rev": sha}
+
+
+def task_payload(task: dict, comments: list) -> dict:
+    """Task fields handed to the agent."""
+    return {
+        "id": task["id"],
+        "title": task["title"],
+        "description": task.get("description", ""),
+        "design": task.get("design", ""),
+        "acceptance_criteria": task.get("acceptance_criteria", ""),
+        "notes": task.get("notes", ""),
+        "comments": comments
+    }
+
+
+def reread_task(task_id: str) -> dict | None:
+    """
+    Current state of a task straight from bd, never from the cache.
+
+    The compare half of every compare-and-set on a task's status; call it
+    under the beads-db lock.
+
+    Returns:
+        Task dict, or None if it could not be read
+    """
+    result = run_command(["bd", "show", task_id, "--json"], check=False, cache=False)
+    try:
+        task = json.loads(result.stdout)[0]
+    except (json.JSONDecodeError, IndexError, TypeError, KeyError):
+        return None
+    return task if isinstance(task, dict) else None
+
+
+@timing.timed
+def claim_tasks(count: int, project_root: Path) -> tuple[list[dict], list[dict]]:
+    """
+    Atomically move up to `count` ready tasks from open to in_progress.
+
+    Runs under the exclusive beads-db lock, which every status change made
+    by these scripts goes through. Each candidate's status is re-read under
+    the lock and only updated if it is still open (compare-and-set), so two
+    agents can never claim the same task.
+
+    Returns:
+        Tuple of (claimed tasks, skipped candidates with reasons)
+    """
+    import depgraph
+    import ranking
+
+    claimed = []
+    skipped = []
+
+    with hold_locks((locks.BEADS_DB, locks.EXCLUSIVE)):
+        result = run_command(["bd", "ready", "--json"])
+        try:
+            ready = json.loads(result.stdout) if result.stdout.strip() else []
+        except json.JSONDecodeError as e:
+            error_exit("Failed to parse bd ready output", str(e))
+
+        candidates = [
+            t for t in (ready or [])
+            if "container" not in t.get("labels", [])
+        ]
+
+        # Same order session-start --rank shows (priority, age, unblocks, category)
+        graph = depgraph.DepGraph.load(project_root)
+        ranked = ranking.rank(candidates, graph.descendants(depgraph.META_EPIC), graph)
+
+        for candidate in ranked:
+            if len(claimed) == count:
+                break
+
+            # Compare: re-read the status under the lock, never from the cache
+            task = reread_task(candidate["id"])
+            if task is None:
+                skipped.append({"id": candidate["id"], "reason": "could not re-read task"})
+                continue
+            if task.get("status") != "open":
+                skipped.append({"id": task["id"], "reason": f"status is {task.get('status')}"})
+                continue
+            short_id = extract_short_id(task["id"])
+            if check_worktree_exists(project_root / "worktrees" / short_id):
+                skipped.append({"id": task["id"], "reason": "worktree already exists"})
+                continue
+
+            # Set: claim it
+            run_command(["bd", "update", task["id"], "--status", "in_progress"])
+            task["status"] = "in_progress"
+            claimed.append(task)
+
+    return (claimed, skipped)
+
 
+def release_claims(tasks: list[dict]) -> None:
+    """
+    Return claimed tasks that got no worktree to open.
 
-def get_resume_context(worktree_path: Path, task: dict) -> dict:
+    Same compare-and-set as claim_tasks: only tasks still in_progress are
+    reset. Best-effort (it runs while another error is being reported).
+    """
+    with hold_locks((locks.BEADS_DB, locks.EXCLUSIVE)):
+        for task in tasks:
+            current = reread_task(task["id"])
+            if current is not None and current.get("status") == "in_progress":
+                run_command(["bd", "update", task["id"], "--status", "open"], check=False)
+
+
+def claim_next(count: int) -> dict:
+    """
+    Claim the next `count` ready tasks and set up a worktree for each.
+
+    If a worktree can't be set up, the claimed tasks still without one are
+    returned to open before the error exits: an in_progress task without a
+    worktree is a state determine_mode rejects.
+
+    Returns:
+        Dict with 'requested', 'claimed' (begin-work outputs) and 'skipped'
+    """
+    project_root = get_project_root()
+    claimed, skipped = claim_tasks(count, project_root)
+
+    outputs = []
+    for index, task in enumerate(claimed):
+        short_id = extract_short_id(task["id"])
+        try:
+            worktree_path, branch_name, sparse_dirs = setup_worktree(task, short_id, project_root)
+        except SystemExit:
+            # error_exit has already reported why. A worktree created before
+            # the failure keeps its claim: begin-work resumes it.
+            release_claims([
+                t for t in claimed[index:]
+                if not check_worktree_exists(project_root / "worktrees" / extract_short_id(t["id"]))
+            ])
+            raise
+        workspace = {
+            "worktree_path": str(worktree_path.relative_to(project_root)),
+            "worktree_name": short_id,
+            "branch_name": branch_name
+        }
+        if sparse_dirs is not None:
+            workspace["sparse"] = sparse_dirs
+        outputs.append({
+            "task": task_payload(task, get_task_comments(task["id"])),
+            "workspace": workspace,
+            "mode": "new"
+        })
+
+    return {"requested": count, "claimed": outputs, "skipped": skipped}
+
+
+def set_task_in_progress(task_id: str, expected: str) -> None:
+    """
+    Set task status to in_progress to claim work.
+
+    Same compare-and-set as claim_tasks: the status is re-read under the
+    beads-db lock and the task only claimed if it is still `expected` (the
+    status this run decided its mode on), so a manual begin-work and a
+    concurrent claim-next can't both claim one task.
+
+    Args:
+        task_id: Full task ID
+        expected: Status the task must still have
+    """
+    with hold_locks((locks.BEADS_DB, locks.EXCLUSIVE)):
+        task = reread_task(task_id)
+        if task is None:
+            error_exit(f"Could not re-read task {task_id} before claiming it")
+        status = task.get("status")
+        if status != expected:
+            error_exit(
+                f"Task {task_id} is now {status} (was {expected})",
+                "Another agent changed it while begin-work ran; run begin-work again"
+            )
+        if status != "in_progress":
+            run_command(["bd", "update", task_id, "--status", "in_progress"])
+
+
+@timing.timed
+def get_resume_context(worktree_path: Path, task: dict, branch: str | None = None) -> dict:
     """
     Gather context for resume mode to help agent understand current state.
 
+    With `branch` (review snapshot without a worktree), commits are read from
+    the branch in the main repo and there are no uncommitted changes.
+
     Returns dict with:
         - commits: list of commit titles on the branch (git log --oneline)
         - uncommitted_changes: list of changed files (git status --short)
@@ -230,9 +527,13 @@ def get_resume_context(worktree_path: Path, task: dict) -> dict:
     }
 
     # Get recent commits on branch (relative to master)
+    if branch:
+        log_cmd = ["git", "log", "--oneline", f"master..{branch}"]
+    else:
+        log_cmd = ["git", "-C", str(worktree_path), "log", "--oneline", "master..HEAD"]
     try:
         result = subprocess.run(
-            ["git", "-C", str(worktree_path), "log", "--oneline", "master..HEAD"],
+            log_cmd,
             capture_output=True,
             text=True,
             check=False
@@ -242,38 +543,61 @@ def get_resume_context(worktree_path: Path, task: dict) -> dict:
     except Exception:
         pass
 
-    # Get uncommitted changes
-    try:
-        result = subprocess.run(
-            ["git", "-C", str(worktree_path), "status", "--short"],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            context["uncommitted_changes"] = result.stdout.strip().split("\n")
-    except Exception:
-        pass
+    # Get uncommitted changes (a branch without worktree has none)
+    if not branch:
+        try:
+            result = subprocess.run(
+                ["git", "-C", str(worktree_path), "status", "--short"],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                context["uncommitted_changes"] = result.stdout.strip().split("\n")
+        except Exception:
+            pass
 
     # Check for known sections in notes field
     notes = task.get("notes", "")
-    known_sections = [
-        "COMPLETED",
-        "IN_PROGRESS",
-        "NEXT",
-        "BLOCKERS",
-        "KEY_DECISIONS",
-        "CRITERIA",
-        "VAULT_DOCS",
-        "DISCOVERED"
-    ]
-    for section in known_sections:
+    for section in resume_delta.NOTES_SECTIONS:
         if f"{section}:" in notes:
             context["notes_sections"].append(section)
 
     return context
 
 
+def get_worktree_branch(task: dict, short_id: str, worktree_path: Path) -> str:
+    """
+    Branch checked out in an existing worktree.
+
+    Read from the registry; a worktree created before the registry existed
+    is looked up in `git worktree list` (by exact path) and registered.
+    """
+    import registry
+
+    entry = registry.lookup(short_id)
+    if entry and entry.get("branch"):
+        return entry["branch"]
+
+    result = run_command(["git", "worktree", "list", "--porcelain"])
+    branch_name = None
+    current = None
+    for line in result.stdout.split("\n"):
+        if line.startswith("worktree "):
+            current = Path(line.split(" ", 1)[1])
+        elif line.startswith("branch refs/heads/") and current == worktree_path:
+            # Format: "branch refs/heads/task/q4x"
+            branch_name = line[len("branch refs/heads/"):]
+            break
+
+    if not branch_name:
+        # Fallback: reconstruct from task type
+        return get_branch_name(task, short_id)
+
+    registry.register(task["id"], short_id, branch_name, registry.merge_base(worktree_path, branch_name))
+    return branch_name
+
+
 def determine_mode(task: dict, worktree_exists: bool, review_mode: bool = False, research_mode: bool = False) -> str:
     """
     Determine work mode based on task status and worktree existence.
@@ -322,17 +646,17 @@ def determine_mode(task: dict, worktree_exists: bool, review_mode: bool = False,
     elif status == "in_progress" and not worktree_exists:
         error_exit(
             f"Task {task['id']} is in_progress but worktree doesn't exist",
-            "Inconsistent state - task marked as started but no worktree found"
+            "Inconsistent state - task marked as started but no worktree found; run `ct reconcile`"
         )
     elif status == "open" and worktree_exists:
         error_exit(
             f"Task {task['id']} is open but worktree already exists",
-            "Inconsistent state - worktree exists but task not marked as started"
+            "Inconsistent state - worktree exists but task not marked as started; run `ct reconcile`"
         )
     elif status == "review" and not worktree_exists:
         error_exit(
             f"Task {task['id']} is in review but worktree doesn't exist",
-            "Inconsistent state - can't resume review without worktree"
+            "Inconsistent state - can't resume review without worktree; run `ct reconcile`"
         )
     else:
         error_exit(
@@ -341,12 +665,14 @@ def determine_mode(task: dict, worktree_exists: bool, review_mode: bool = False,
         )
 
 
+@timing.timed("begin_work")
 def main():
     parser = argparse.ArgumentParser(
         description="Set up worktree for beads task execution"
     )
     parser.add_argument(
         "task_id",
+        nargs="?",
         help="Beads task ID (short form like 'q4x' or full form like 'spacetraders-q4x')"
     )
     parser.add_argument(
@@ -359,6 +685,27 @@ def main():
         action="store_true",
         help="Research mode: loads task info without creating worktree, sets status to in_progress"
     )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="With --review/--research: read-only copy of the branch (review) or master (research) in tmpfs"
+    )
+    parser.add_argument(
+        "--since",
+        metavar="TOKEN",
+        help="Resume/review: only return what changed since the payload that returned this resume_token"
+    )
+    parser.add_argument(
+        "--claim-next",
+        action="store_true",
+        help="Atomically claim the highest-ranked ready task(s) and create their worktrees"
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=1,
+        help="With --claim-next: number of tasks to claim (one per agent)"
+    )
 
     args = parser.parse_args()
 
@@ -366,6 +713,23 @@ def main():
     if args.review and args.research:
         error_exit("Cannot use --review and --research together")
 
+    if args.since and (args.research or args.claim_next):
+        error_exit("--since only applies to resume and review payloads")
+
+    if args.snapshot and not (args.review or args.research):
+        error_exit("--snapshot only applies to --review and --research")
+
+    if args.claim_next:
+        if args.task_id or args.review or args.research:
+            error_exit("--claim-next takes no task ID and no mode flag")
+        if args.count < 1:
+            error_exit("--count must be at least 1")
+        print(json.dumps(claim_next(args.count), indent=2))
+        return
+
+    if not args.task_id:
+        error_exit("Task ID required (or use --claim-next)")
+
     # Get task information
     task = get_task_info(args.task_id)
 
@@ -376,21 +740,18 @@ def main():
     # Research mode: skip worktree logic entirely
     if args.research:
         # Set task to in_progress and output minimal JSON
-        set_task_in_progress(full_id)
+        set_task_in_progress(full_id, task.get("status"))
         comments = get_task_comments(full_id)
 
+        import search
+
         output = {
-            "task": {
-                "id": task["id"],
-                "title": task["title"],
-                "description": task.get("description", ""),
-                "design": task.get("design", ""),
-                "acceptance_criteria": task.get("acceptance_criteria", ""),
-                "notes": task.get("notes", ""),
-                "comments": comments
-            },
-            "mode": "research"
+            "task": task_payload(task, comments),
+            "mode": "research",
+            "related": search.related(task)
         }
+        if args.snapshot:
+            output["workspace"] = take_snapshot(get_project_root(), "master", "master")
 
         print(json.dumps(output, indent=2))
         return
@@ -402,77 +763,81 @@ def main():
     # Check worktree existence
     worktree_exists = check_worktree_exists(worktree_path)
 
+    # A review snapshot only needs the branch, not the implementer's worktree
+    snapshot_branch = None
+    if args.snapshot and args.review and not worktree_exists:
+        snapshot_branch = get_branch_name(task, short_id)
+        if run_command(["git", "rev-parse", "--verify", "--quiet", f"refs/heads/{snapshot_branch}"], check=False).returncode != 0:
+            snapshot_branch = None
+
     # Capture original status for transition logic
     original_status = task.get("status")
 
     # Determine mode
-    mode = determine_mode(task, worktree_exists, review_mode=args.review, research_mode=args.research)
+    mode = determine_mode(
+        task, worktree_exists or snapshot_branch is not None, review_mode=args.review, research_mode=args.research
+    )
 
     # Create worktree if in 'new' mode
+    sparse_dirs = None
     if mode == "new":
-        branch_name = get_branch_name(task, short_id)
-        create_worktree(worktree_path, branch_name)
-        prime_worktree(worktree_path, project_root)
-        set_task_in_progress(full_id)
+        # Claim before creating anything, and give the claim back if the
+        # worktree can't be set up (see claim_next)
+        set_task_in_progress(full_id, original_status)
+        try:
+            worktree_path, branch_name, sparse_dirs = setup_worktree(task, short_id, project_root)
+        except SystemExit:
+            if not check_worktree_exists(worktree_path):
+                release_claims([task])
+            raise
+    elif snapshot_branch is not None:
+        branch_name = snapshot_branch
     else:
         # Resume or review mode - worktree already exists
         if mode == "resume" and original_status == "review":
             # Implementer resuming after feedback - transition back to in_progress
-            set_task_in_progress(full_id)
+            set_task_in_progress(full_id, original_status)
         # Review mode: no status transition (reviewer is inspecting, not claiming)
 
-        # Get branch name from existing worktree
-        result = run_command(["git", "worktree", "list", "--porcelain"])
-        branch_name = None
-        found_worktree = False
-
-        lines = result.stdout.split("\n")
-        for i, line in enumerate(lines):
-            if line.startswith("worktree ") and str(worktree_path) in line:
-                # Found our worktree, look for branch in subsequent lines
-                found_worktree = True
-                continue
-
-            if found_worktree and line.startswith("branch "):
-                # Extract branch name (format: "branch refs/heads/task/q4x")
-                branch_ref = line.split(" ", 1)[1]
-                if branch_ref.startswith("refs/heads/"):
-                    branch_name = branch_ref.replace("refs/heads/", "")
-                break
-
-            # Empty line marks end of worktree entry
-            if found_worktree and line == "":
-                break
+        branch_name = get_worktree_branch(task, short_id, worktree_path)
 
-        if not branch_name:
-            # Fallback: reconstruct from task type
-            branch_name = get_branch_name(task, short_id)
+    workspace = {
+        "worktree_path": str(worktree_path.relative_to(project_root)),
+        "worktree_name": short_id,
+        "branch_name": branch_name
+    }
+    if sparse_dirs is not None:
+        workspace["sparse"] = sparse_dirs
+    if args.snapshot:
+        workspace.update(take_snapshot(project_root, branch_name, short_id))
 
     # Fetch comments (review feedback, external notes)
     comments = get_task_comments(full_id)
 
     # Build output JSON
     output = {
-        "task": {
-            "id": task["id"],
-            "title": task["title"],
-            "description": task.get("description", ""),
-            "design": task.get("design", ""),
-            "acceptance_criteria": task.get("acceptance_criteria", ""),
-            "notes": task.get("notes", ""),
-            "comments": comments
-        },
-        "workspace": {
-            "worktree_path": str(worktree_path.relative_to(project_root)),
-            "worktree_name": short_id,
-            "branch_name": branch_name
-        },
+        "task": task_payload(task, comments),
+        "workspace": workspace,
         "mode": mode
     }
 
     # Add resume context for resume and review modes (both need to see existing state)
     if mode in ("resume", "review"):
-        output["resume_context"] = get_resume_context(worktree_path, task)
+        context = get_resume_context(worktree_path, task, branch=snapshot_branch)
+        output["resume_context"] = context
+
+        parts = resume_delta.snapshot(task, comments, context)
+        output["resume_token"] = resume_delta.save(short_id, parts)
+
+        if args.since:
+            previous = resume_delta.load(short_id, args.since)
+            if previous is None:
+                output["delta"] = {"since": args.since, "full": True, "reason": "unknown or expired token"}
+            else:
+                task_delta, context_delta = resume_delta.delta(task, comments, context, previous, parts)
+                output["task"] = task_delta
+                output["resume_context"] = context_delta
+                output["delta"] = {"since": args.since, "full": False}
 
     # Output JSON to stdout
     print(json.dumps(output, indent=2))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Build health of every active worktree against current master.
+
+For each task worktree whose task isn't closed, the branch's committed work
+is merged with master in memory (`git merge-tree --write-tree`, no checkout
+is touched):
+
+    conflict    the branch no longer merges cleanly
+    ok          `cargo check --all-targets` of the merge result passes
+    errors      it doesn't compile
+    timeout     the check ran out of time (not cached)
+    failed      git or cargo could not be run (not cached)
+
+The merge result is written to .git/ct/build-health/src/<short-id>/ and
+checked there. At most --jobs (CT_BUILD_HEALTH_JOBS, default 2) checks run
+at once, splitting the cargo CPU budget. Each parallel slot has its own
+CARGO_TARGET_DIR shared by every worktree on the same toolchain
+(.git/ct/cargo-target/<toolchain>/check-<slot>/; cargo serializes runs on
+one target dir), so dependencies compile once per slot, not per worktree.
+
+Results are cached in .git/ct/build-health/results.json by the tree
+merge-tree produces (conflicted or not) and the toolchain. That tree is
+exactly what gets checked, so the key follows the merge base as well as
+both tips, and a new master commit that doesn't change the merge result
+costs no check. Uncommitted changes are not checked.
+
+Usage:
+    python3 scripts/build_health.py [--jobs N] [--pretty]
+    python3 scripts/session-start.py --build-health
+    ct build-health --pretty
+
+Output JSON:
+    {
+        "master": "9f3c2a1b0d",
+        "worktrees": [
+            {"task_id": "spacetraders-q4x", "branch": "task/q4x", "worktree": "worktrees/q4x",
+             "status": "errors", "errors": 2, "warnings": 0, "cached": false, "seconds": 12.4,
+             "diagnostics": [{"level": "error", "code": "E0425", "message": "cannot find value `x`",
+                              "file": "src/agent.rs", "line": 10}]}
+        ],
+        "failing": ["spacetraders-q4x"],       // status conflict or errors
+        "checked": 1,                          // cargo checks run (the rest were cached)
+        "elapsed_ms": 12650.3
+    }
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cargo_env
+import fleet
+import issue_store
+import materialize
+import taskids
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+DEFAULT_JOBS = int(os.environ.get("CT_BUILD_HEALTH_JOBS", "2"))
+BASE = "master"
+RESULTS_FILE = "results.json"
+
+MAX_DIAGNOSTICS = 10
+MAX_RESULTS = 256
+
+# Outcomes that depend only on the cache key's inputs
+CACHEABLE = {"ok", "errors", "conflict"}
+
+
+def git(args: list[str], cwd: Path, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, **kwargs)
+
+
+def active_worktrees(project_root: Path) -> list[dict]:
+    """Agent worktrees whose task is not closed."""
+    issues = {taskids.short_id(i["id"]): i for i in issue_store.load_issues(project_root, export_fallback=False)}
+    prefixes = tuple(ns[len("refs/heads/"):] + "/" for ns in fleet.BRANCH_NAMESPACES)
+    entries = []
+    for branch, path in sorted(fleet.worktree_branches(project_root).items()):
+        if not branch.startswith(prefixes) or not path.is_dir():
+            continue
+        short_id = branch.split("/", 1)[1]
+        issue = issues.get(short_id)
+        if issue and issue.get("status") == "closed":
+            continue
+        entries.append({
+            "task_id": issue["id"] if issue else None,
+            "branch": branch,
+            "path": path,
+            "short_id": short_id,
+        })
+    return entries
+
+
+def cache_key(merged: str, clean: bool, toolchain: str) -> str:
+    outcome = "clean" if clean else "conflict"
+    return hashlib.blake2b(f"{merged}:{outcome}:{toolchain}".encode(), digest_size=12).hexdigest()
+
+
+def merged_tree(project_root: Path, branch: str) -> tuple[str, bool]:
+    """
+    Tree of branch merged into master, and whether the merge was clean.
+
+    A conflicted merge still yields a tree (with conflict markers), which
+    identifies the conflict just as well for caching.
+
+    Raises:
+        RuntimeError: git merge-tree failed
+    """
+    result = git(["merge-tree", "--write-tree", BASE, branch], project_root)
+    if result.returncode not in (0, 1):
+        raise RuntimeError(result.stderr.strip() or "git merge-tree failed")
+    return (result.stdout.split("\n", 1)[0].strip(), result.returncode == 0)
+
+
+def write_tree(project_root: Path, tree: str, short_id: str, worktree: Path) -> Path:
+    """
+    Write a tree's files to .git/ct/build-health/src/<short_id>/.
+
+    See materialize.export_tree: no checkout or index of the repo is touched.
+    Cargo.lock is gitignored here; the worktree's (or main checkout's) copy
+    is brought along so cargo doesn't have to re-resolve dependencies.
+    """
+    src = state_dir("build-health", "src") / short_id
+    shutil.rmtree(src, ignore_errors=True)
+    materialize.export_tree(project_root, tree, src)
+
+    if not (src / "Cargo.lock").exists():
+        for candidate in (worktree / "Cargo.lock", project_root / "Cargo.lock"):
+            if candidate.exists():
+                shutil.copy2(candidate, src / "Cargo.lock")
+                break
+    return src
+
+
+def check(src: Path, toolchain: str, slot: int, jobs: int, timeout: float | None) -> dict:
+    """cargo check of a materialized tree in the slot's shared target dir."""
+    target = cargo_env.shared_target(toolchain, f"check-{slot}")
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(
+            ["cargo", "check", "--all-targets", "--message-format=json", "-j", str(jobs)],
+            cwd=src, capture_output=True, text=True, env=cargo_env.env(target), timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout", "seconds": round(time.perf_counter() - start, 2)}
+    except OSError as e:
+        return {"status": "failed", "details": str(e)}
+
+    counts, diagnostics = cargo_env.parse_messages(result.stdout, MAX_DIAGNOSTICS)
+    if result.returncode != 0 and not counts["error"]:
+        # cargo itself failed (manifest, resolution, ...), not the code
+        return {"status": "failed", "details": result.stderr.strip()[-2000:]}
+    return {
+        "status": "ok" if result.returncode == 0 else "errors",
+        "errors": counts["error"],
+        "warnings": counts["warning"],
+        "diagnostics": diagnostics,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def sweep(project_root: Path, jobs: int = DEFAULT_JOBS, deadline=None) -> dict:
+    """
+    Build health of every active worktree (see module docstring).
+
+    Args:
+        project_root: Main checkout
+        jobs: Checks run at once
+        deadline: Optional deadline.Deadline; checks it cuts short report "timeout"
+    """
+    start = time.perf_counter()
+    master = git(["rev-parse", BASE], project_root).stdout.strip()
+    results_path = state_dir("build-health") / RESULTS_FILE
+    cache = read_json(results_path, default={})
+
+    worktrees = active_worktrees(project_root)
+
+    def probe(entry: dict) -> None:
+        entry["toolchain"] = cargo_env.toolchain(entry["path"])
+        try:
+            entry["tree"], entry["clean"] = merged_tree(project_root, entry["branch"])
+        except RuntimeError as e:
+            # Never cached, so it is retried on every sweep
+            entry["tree"], entry["clean"], entry["error"] = None, False, str(e)
+        entry["key"] = cache_key(entry["tree"] or entry["branch"], entry["clean"], entry["toolchain"])
+
+    with ThreadPoolExecutor(max_workers=fleet.MAX_WORKERS) as pool:
+        list(pool.map(probe, worktrees))
+
+    stale = [e for e in worktrees if e["key"] not in cache]
+    slots: queue.SimpleQueue[int] = queue.SimpleQueue()
+    workers = max(1, min(jobs, len(stale)))
+    for slot in range(workers):
+        slots.put(slot)
+    cargo_jobs = cargo_env.split_budget(workers)
+
+    def run(entry: dict) -> dict:
+        if entry["tree"] is None:
+            return {"status": "failed", "details": entry["error"]}
+        if not entry["clean"]:
+            return {"status": "conflict"}
+        try:
+            src = write_tree(project_root, entry["tree"], entry["short_id"], entry["path"])
+        except RuntimeError as e:
+            return {"status": "failed", "details": str(e)}
+        timeout = deadline.timeout() if deadline is not None else None
+        if timeout is not None and timeout <= 0:
+            return {"status": "timeout", "seconds": 0}
+        slot = slots.get()
+        try:
+            return check(src, entry["toolchain"], slot, cargo_jobs, timeout)
+        finally:
+            slots.put(slot)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fresh = dict(zip((e["key"] for e in stale), pool.map(run, stale)))
+
+    output_entries = []
+    for entry in worktrees:
+        cached = entry["key"] in cache
+        result = cache[entry["key"]] if cached else fresh[entry["key"]]
+        if not cached and result["status"] in CACHEABLE:
+            cache[entry["key"]] = {**result, "at": time.time()}
+        output_entries.append({
+            "task_id": entry["task_id"],
+            "branch": entry["branch"],
+            "worktree": os.path.relpath(entry["path"], project_root),
+            **{k: v for k, v in result.items() if k != "at"},
+            "cached": cached,
+        })
+
+    if len(cache) > MAX_RESULTS:
+        newest = sorted(cache.items(), key=lambda item: item[1].get("at", 0))[-MAX_RESULTS:]
+        cache = dict(newest)
+    try:
+        write_json(results_path, cache)
+    except OSError:
+        pass
+
+    return {
+        "master": master[:10],
+        "worktrees": output_entries,
+        "failing": [
+            e["task_id"] or e["branch"] for e in output_entries if e["status"] in ("conflict", "errors")
+        ],
+        "checked": len(stale),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="cargo check every active worktree merged with master")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help=f"Checks run at once (default {DEFAULT_JOBS})")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    project_root = find_project_root()
+    if project_root is None:
+        print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+        return 1
+
+    print(json.dumps(sweep(project_root, args.jobs), indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Shared cargo setup for scripts that build task worktrees.
+
+Every worktree has its own target/, so building N worktrees compiled every
+dependency N times. Scripts that run cargo on Control Tower's behalf point
+CARGO_TARGET_DIR at a directory shared per toolchain instead:
+
+    .git/ct/cargo-target/<toolchain>/<purpose>/
+
+One per purpose (clippy, test, check-<slot>), because cargo runs sharing a
+target dir wait for each other on cargo's build lock. The CPU budget (CT_CARGO_JOBS,
+default: all cores) is split between the cargo processes run at once.
+"""
+
+import json
+import os
+import re
+import subprocess
+from pathlib import Path
+
+from ct_state import state_dir
+
+
+def toolchain(cwd: Path) -> str:
+    """
+    Toolchain that cargo would use in cwd (honours rust-toolchain files).
+
+    Returns:
+        Slug like "1.90.0-1159e78c4-x86_64-unknown-linux-gnu", or "unknown"
+    """
+    try:
+        result = subprocess.run(["rustc", "-vV"], cwd=cwd, capture_output=True, text=True)
+    except OSError:
+        return "unknown"
+    fields = dict(
+        line.split(": ", 1) for line in result.stdout.splitlines() if ": " in line
+    )
+    parts = [fields.get("release"), fields.get("commit-hash", "")[:9], fields.get("host")]
+    slug = "-".join(p for p in parts if p)
+    return re.sub(r"[^A-Za-z0-9._-]", "_", slug) or "unknown"
+
+
+def shared_target(toolchain_slug: str, purpose: str) -> Path:
+    """CARGO_TARGET_DIR shared by every worktree for one toolchain and purpose."""
+    return state_dir("cargo-target", toolchain_slug, purpose)
+
+
+def cpu_budget() -> int:
+    """Cores Control Tower's cargo runs may use in total."""
+    try:
+        return max(1, int(os.environ["CT_CARGO_JOBS"]))
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+
+def split_budget(ways: int) -> int:
+    """Jobs per cargo process when `ways` of them run at once."""
+    return max(1, cpu_budget() // max(1, ways))
+
+
+def env(target_dir: Path) -> dict[str, str]:
+    """Environment for a cargo run using target_dir."""
+    return {**os.environ, "CARGO_TARGET_DIR": str(target_dir), "CARGO_TERM_COLOR": "never"}
+
+
+def tree_hash(worktree: Path) -> str | None:
+    """Git tree of the worktree's HEAD commit, or None if it can't be read."""
+    result = subprocess.run(
+        ["git", "-C", str(worktree), "rev-parse", "HEAD^{tree}"],
+        capture_output=True, text=True,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def parse_messages(stdout: str, limit: int) -> tuple[dict[str, int], list[dict]]:
+    """
+    Compiler diagnostics from `cargo ... --message-format=json` output.
+
+    Duplicates (a lib warning is reported once per target with --all-targets)
+    and span-less summaries ("aborting due to ...") are skipped.
+
+    Returns:
+        Tuple of ({"error": n, "warning": n}, first `limit` diagnostics as
+        {"level", "code", "message", "file", "line"})
+    """
+    counts = {"error": 0, "warning": 0}
+    diagnostics = []
+    seen = set()
+    for line in stdout.splitlines():
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if message.get("reason") != "compiler-message":
+            continue
+        diagnostic = message["message"]
+        spans = [s for s in diagnostic.get("spans", []) if s.get("is_primary")]
+        level = diagnostic.get("level")
+        if not spans or level not in counts:
+            continue
+        entry = {
+            "level": level,
+            "code": (diagnostic.get("code") or {}).get("code"),
+            "message": diagnostic.get("message"),
+            "file": spans[0].get("file_name"),
+            "line": spans[0].get("line_start"),
+        }
+        identity = tuple(entry.values())
+        if identity in seen:
+            continue
+        seen.add(identity)
+        counts[level] += 1
+        if len(diagnostics) < limit:
+            diagnostics.append(entry)
+    return counts, diagnostics
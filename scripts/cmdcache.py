@@ -0,0 +1,281 @@
+"""
+Read-through cache for read-only bd and git queries.
+
+Control Tower runs the same `bd list`, `bd show` and `git worktree list`
+queries from session-start, begin-work and session-end, usually with nothing
+changed in between. run() is a drop-in for subprocess.run that answers those
+queries from an on-disk cache.
+
+Cache keys combine argv, cwd and a fingerprint of the state the command
+reads, so entries go stale on their own when that state moves:
+    - bd commands: beads.db / -wal / issues.jsonl mtime+size, and the WAL
+      index header from beads.db-shm (which changes with every commit)
+    - git commands: HEAD of every worktree, loose refs and packed-refs
+
+Mutating commands (bd update/close/sync, git merge, ...) going through run()
+also drop the whole cache once they have changed either fingerprint. A
+mutation that turned out to be a no-op (`bd gate eval` with nothing to
+close) leaves the cache intact.
+
+The cache lives in .git/ct/cmdcache/, one <key>.json file per entry, so
+concurrent scripts never rewrite each other's entries. A hit only touches
+its file's mtime, which is the recency the LRU eviction goes by; a store
+writes its own file and evicts the oldest beyond MAX_ENTRIES. Outputs larger
+than MAX_ENTRY_BYTES are never stored. Set CT_NO_CACHE=1 to bypass it.
+"""
+
+import hashlib
+import os
+import subprocess
+from pathlib import Path
+
+from ct_state import find_common_dir, read_json, state_dir, write_json
+
+CACHE_DIR = "cmdcache"
+MAX_ENTRIES = 64
+MAX_ENTRY_BYTES = 256 * 1024
+
+# Read-only commands whose output only depends on the fingerprinted state.
+# `git status`/`git log` are deliberately absent: they read the working tree.
+CACHEABLE: list[tuple[str, ...]] = [
+    ("bd", "list"),
+    ("bd", "show"),
+    ("bd", "ready"),
+    ("bd", "comments"),
+    ("bd", "export"),
+    ("git", "worktree", "list"),
+]
+
+# Commands that change beads or git state. Any of them clears the cache.
+MUTATING: list[tuple[str, ...]] = [
+    ("bd", "update"),
+    ("bd", "close"),
+    ("bd", "reopen"),
+    ("bd", "create"),
+    ("bd", "sync"),
+    ("bd", "comment"),
+    ("bd", "comments", "add"),
+    ("bd", "label"),
+    ("bd", "dep"),
+    ("bd", "gate", "eval"),
+    ("git", "merge"),
+    ("git", "checkout"),
+    ("git", "pull"),
+    ("git", "fetch"),
+    ("git", "rebase"),
+    ("git", "commit"),
+    ("git", "push"),
+    ("git", "branch", "-d"),
+    ("git", "branch", "-D"),
+    ("git", "worktree", "add"),
+    ("git", "worktree", "remove"),
+    ("git", "worktree", "prune"),
+]
+
+
+def normalize(cmd: list[str]) -> tuple[str, ...]:
+    """Strip `git -C <dir>` and `git -c <key=value>` so matching only looks at the subcommand."""
+    words = list(cmd)
+    if words[:1] == ["git"]:
+        while len(words) >= 3 and words[1] in ("-C", "-c"):
+            del words[1:3]
+    return tuple(words)
+
+
+def matches(cmd: list[str], table: list[tuple[str, ...]]) -> bool:
+    words = normalize(cmd)
+    return any(words[:len(prefix)] == prefix for prefix in table)
+
+
+def is_cacheable(cmd: list[str]) -> bool:
+    # Sub-actions like `bd comments add` are mutations even though
+    # `bd comments` is a read
+    return matches(cmd, CACHEABLE) and not matches(cmd, MUTATING)
+
+
+def is_mutating(cmd: list[str]) -> bool:
+    if normalize(cmd)[:2] == ("bd", "sync") and "--status" in cmd:
+        return False  # Status query only
+    return matches(cmd, MUTATING)
+
+
+def _stat_token(path: Path) -> str:
+    try:
+        st = path.stat()
+    except OSError:
+        return "-"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def beads_fingerprint(project_root: Path) -> str:
+    """Cheap token that changes whenever the beads database changes."""
+    beads_dir = project_root / ".beads"
+    parts = [
+        _stat_token(beads_dir / "beads.db"),
+        _stat_token(beads_dir / "beads.db-wal"),
+        _stat_token(beads_dir / "issues.jsonl"),
+    ]
+    # The WAL index header (first 48 bytes of -shm) holds the change counter
+    # and last committed frame, so it moves on every write transaction even
+    # when the WAL file keeps its size.
+    try:
+        with open(beads_dir / "beads.db-shm", "rb") as f:
+            parts.append(f.read(48).hex())
+    except OSError:
+        parts.append("-")
+    return "|".join(parts)
+
+
+def git_fingerprint(common_dir: Path) -> str:
+    """Cheap token that changes whenever a ref or worktree HEAD moves."""
+    parts = [_stat_token(common_dir / "packed-refs")]
+
+    heads = [common_dir / "HEAD"]
+    worktrees_dir = common_dir / "worktrees"
+    if worktrees_dir.is_dir():
+        heads.extend(sorted(worktrees_dir.glob("*/HEAD")))
+    for head in heads:
+        try:
+            parts.append(f"{head.parent.name}={head.read_text().strip()}")
+        except OSError:
+            pass
+
+    refs_dir = common_dir / "refs" / "heads"
+    for root, _, files in os.walk(refs_dir):
+        for name in sorted(files):
+            ref = Path(root) / name
+            try:
+                parts.append(f"{ref.relative_to(refs_dir)}={ref.read_text().strip()}")
+            except OSError:
+                pass
+    return "|".join(parts)
+
+
+def state_fingerprint(cmd: list[str], cwd: Path | None) -> str | None:
+    """Fingerprint of the state a command reads, or None outside a repository."""
+    common_dir = find_common_dir(Path(cwd) if cwd else None)
+    if common_dir is None:
+        return None
+    if cmd[0] == "bd":
+        return beads_fingerprint(common_dir.parent)
+    return git_fingerprint(common_dir)
+
+
+def cache_key(cmd: list[str], cwd: Path | None) -> str | None:
+    """Build the cache key for a command, or None outside a repository."""
+    where = Path(cwd) if cwd else Path.cwd()
+    fingerprint = state_fingerprint(cmd, where)
+    if fingerprint is None:
+        return None
+
+    material = "\0".join([str(where.resolve()), *cmd, fingerprint])
+    return hashlib.sha1(material.encode()).hexdigest()
+
+
+def _cache_dir() -> Path:
+    return state_dir(CACHE_DIR)
+
+
+def _entries(directory: Path) -> list[os.DirEntry]:
+    with os.scandir(directory) as entries:
+        return [entry for entry in entries if entry.name.endswith(".json")]
+
+
+def invalidate() -> None:
+    """Drop every cached result."""
+    for entry in _entries(_cache_dir()):
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _lookup(key: str) -> dict | None:
+    path = _cache_dir() / f"{key}.json"
+    entry = read_json(path)
+    if entry is not None:
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass  # Evicted meanwhile
+    return entry
+
+
+def _store(key: str, stdout: str, stderr: str) -> None:
+    if len(stdout) + len(stderr) > MAX_ENTRY_BYTES:
+        return
+    directory = _cache_dir()
+    write_json(directory / f"{key}.json", {"stdout": stdout, "stderr": stderr})
+
+    entries = _entries(directory)
+    if len(entries) <= MAX_ENTRIES:
+        return
+
+    def mtime(entry: os.DirEntry) -> int:
+        try:
+            return entry.stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    for entry in sorted(entries, key=mtime)[:len(entries) - MAX_ENTRIES]:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def run(
+    cmd: list[str],
+    capture_output: bool = True,
+    text: bool = True,
+    check: bool = False,
+    cwd: Path | None = None,
+    timeout: float | None = None,
+    cache: bool = True,
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run with a read-through cache for read-only queries.
+
+    Only successful results are cached. Commands that are neither cacheable
+    nor mutating pass straight through. cache=False always runs the command
+    (reads that must see the current state, e.g. compare-and-set); its
+    result still refreshes the cache.
+
+    Raises:
+        subprocess.CalledProcessError: If check=True and the command failed
+            (cache hits are always successful results)
+        subprocess.TimeoutExpired: If the command ran past timeout
+    """
+    cacheable = (
+        capture_output and text
+        and is_cacheable(cmd)
+        and not os.environ.get("CT_NO_CACHE")
+    )
+    key = cache_key(cmd, cwd) if cacheable else None
+
+    if key is not None and cache:
+        entry = _lookup(key)
+        if entry is not None:
+            return subprocess.CompletedProcess(cmd, 0, entry["stdout"], entry["stderr"])
+
+    before = state_fingerprint(cmd, cwd) if is_mutating(cmd) else False
+
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=capture_output,
+            text=text,
+            check=check,
+            cwd=cwd,
+            timeout=timeout,
+        )
+    finally:
+        # Also runs when the command failed or timed out: it may have
+        # changed state part-way through
+        if before is not False and (before is None or state_fingerprint(cmd, cwd) != before):
+            invalidate()
+
+    if key is not None and result.returncode == 0:
+        _store(key, result.stdout, result.stderr)
+
+    return result
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Columnar encoding of session-start output.
+
+The default output repeats every key for every task:
+
+    "ready": [{"id": "spacetraders-q4x", "title": "...", "status": "open", ...}, ...]
+
+The columnar form stores one array per field per section, drops the shared
+ID prefix, and replaces low-cardinality values (status, issue_type,
+category) with indexes into a shared dictionary:
+
+    {
+        "format": "columnar/1",
+        "id_prefix": "spacetraders-",
+        "dict": {"status": ["open", "in_progress"], "category": ["game", "meta"], ...},
+        "ready": {"n": 2, "id": ["q4x", "abc"], "title": ["...", "..."], "status": [0, 0],
+                  "priority": [1, 2], "category": [0, 1]},
+        ...
+        "summary": {...}                       // unchanged; per-category counts live here
+    }
+
+Sections that aren't task lists (gates, orphans, summary, ...) are copied
+unchanged. Fields a task lacks are null in their column and dropped again by
+decode(), so decode(encode(state)) == state for bd output (which omits
+empty fields rather than writing null).
+
+Usage:
+    python3 scripts/session-start.py --format columnar
+    python3 scripts/session-start.py | python3 scripts/columnar.py encode
+    python3 scripts/session-start.py --format columnar | python3 scripts/columnar.py decode
+    python3 scripts/columnar.py bench [--tasks 200]
+    python3 scripts/session-start.py | python3 scripts/columnar.py bench --stdin
+"""
+
+import argparse
+import json
+import sys
+
+FORMAT = "columnar/1"
+
+TASK_SECTIONS = ("ready", "in_progress", "review", "drafts")
+
+# Fields stored as indexes into the shared "dict" table
+DICT_FIELDS = ("status", "issue_type", "category")
+
+
+def _id_prefix(ids: list[str]) -> str:
+    """Project prefix shared by every ID ('spacetraders-'), or '' if they differ."""
+    prefixes = {issue_id.rsplit("-", 1)[0] + "-" for issue_id in ids if "-" in issue_id}
+    if len(prefixes) != 1 or any("-" not in issue_id for issue_id in ids):
+        return ""
+    return prefixes.pop()
+
+
+def encode(state: dict) -> dict:
+    """Columnar form of a session-start document."""
+    all_ids = [t["id"] for s in TASK_SECTIONS for t in state.get(s, [])]
+    prefix = _id_prefix(all_ids)
+    dictionary: dict[str, list] = {field: [] for field in DICT_FIELDS}
+    codes: dict[str, dict] = {field: {} for field in DICT_FIELDS}
+
+    def code(field: str, value):
+        if value is None:
+            return None
+        if value not in codes[field]:
+            codes[field][value] = len(dictionary[field])
+            dictionary[field].append(value)
+        return codes[field][value]
+
+    encoded: dict = {"format": FORMAT, "id_prefix": prefix, "dict": dictionary}
+    for key, value in state.items():
+        if key not in TASK_SECTIONS:
+            encoded[key] = value
+            continue
+        columns: dict[str, list] = {}
+        for task in value:
+            for field in task:
+                columns.setdefault(field, [])
+        for field, column in columns.items():
+            for task in value:
+                item = task.get(field)
+                if field == "id":
+                    item = item[len(prefix):]
+                elif field in DICT_FIELDS:
+                    item = code(field, item)
+                column.append(item)
+        encoded[key] = {"n": len(value), **columns}
+    return encoded
+
+
+def decode(encoded: dict) -> dict:
+    """Inverse of encode()."""
+    if encoded.get("format") != FORMAT:
+        raise ValueError(f"Not a {FORMAT} document")
+    prefix = encoded["id_prefix"]
+    dictionary = encoded["dict"]
+
+    state = {}
+    for key, value in encoded.items():
+        if key in ("format", "id_prefix", "dict"):
+            continue
+        if key not in TASK_SECTIONS:
+            state[key] = value
+            continue
+        columns = {field: column for field, column in value.items() if field != "n"}
+        tasks = []
+        for row in range(value["n"]):
+            task = {}
+            for field, column in columns.items():
+                item = column[row]
+                if item is None:
+                    continue
+                if field == "id":
+                    item = prefix + item
+                elif field in DICT_FIELDS:
+                    item = dictionary[field][item]
+                task[field] = item
+            tasks.append(task)
+        state[key] = tasks
+    return state
+
+
+def synthetic_state(tasks: int) -> dict:
+    """A session-start document with `tasks` ready tasks and a few in the other sections."""
+    import random
+
+    rng = random.Random(3)
+    words = "fuel market route ship cargo contract survey mining cache api waypoint trade".split()
+
+    def task(n: int, status: str) -> dict:
+        return {
+            "id": f"spacetraders-{n:03x}",
+            "title": " ".join(rng.sample(words, 4)).capitalize(),
+            "status": status,
+            "priority": rng.randint(0, 4),
+            "issue_type": rng.choice(["task", "task", "bug", "feature"]),
+            "category": rng.choice(["game", "game", "meta"]),
+        }
+
+    state = {
+        "gates": {"evaluated": 0, "closed": [], "message": "No open gates"},
+        "orphans": {"found": False, "count": 0, "message": "No orphaned issues"},
+        "ready": [task(n, "open") for n in range(tasks)],
+        "in_progress": [task(tasks + n, "in_progress") for n in range(tasks // 10)],
+        "review": [task(2 * tasks + n, "review") for n in range(tasks // 20)],
+        "drafts": [task(3 * tasks + n, "draft") for n in range(tasks // 20)],
+    }
+    for draft in state["drafts"]:
+        del draft["category"]  # session-start doesn't categorize drafts
+    state["summary"] = {"total": f"RDY: {tasks}", "draft_count": len(state["drafts"])}
+    return state
+
+
+def bench(state: dict) -> dict:
+    """Byte sizes of the default and columnar encodings (compact and indented)."""
+    encoded = encode(state)
+    if decode(encoded) != state:
+        raise AssertionError("columnar round-trip mismatch")
+
+    sizes = {
+        "json": len(json.dumps(state)),
+        "json_pretty": len(json.dumps(state, indent=2)),
+        "columnar": len(json.dumps(encoded)),
+        "columnar_pretty": len(json.dumps(encoded, indent=2)),
+    }
+    return {
+        "tasks": sum(len(state.get(s, [])) for s in TASK_SECTIONS),
+        "bytes": sizes,
+        "ratio": round(sizes["columnar"] / sizes["json"], 3),
+        "round_trip": True,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Columnar session-start output")
+    parser.add_argument("command", choices=["encode", "decode", "bench"])
+    parser.add_argument("--tasks", type=int, default=200, help="bench: synthetic ready tasks")
+    parser.add_argument("--stdin", action="store_true", help="bench: measure a session-start document from stdin")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        state = json.load(sys.stdin) if args.stdin else synthetic_state(args.tasks)
+        output = bench(state)
+    else:
+        document = json.load(sys.stdin)
+        output = encode(document) if args.command == "encode" else decode(document)
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
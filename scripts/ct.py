@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+ct - single entry point for the Control Tower lifecycle scripts.
+
+Dispatches to the existing scripts without starting a new interpreter per
+step. Only the module behind the chosen subcommand is imported, so
+`ct beads check` never pays for `tarfile`/`urllib`, and `ct --help` imports
+nothing but this file.
+
+Usage:
+    ct.py session-start [--pretty]
+    ct.py begin <task-id> [--review | --research] [--snapshot]
+    ct.py claim-next [--count N]
+    ct.py end <task-id>
+    ct.py review <task-id> [--checks fmt,clippy,test] [--no-attach]
+    ct.py session-end [--pretty]
+    ct.py beads install [--force]
+    ct.py beads check [--quiet]
+    ct.py beads doctor
+    ct.py ids resolve <partial-id>
+    ct.py ids complete <prefix>
+    ct.py search <words> [--status S] [--limit N]
+    ct.py fleet [--stale-hours H]
+    ct.py build-health [--jobs N]
+    ct.py snapshot <rev> [--name NAME]
+    ct.py reconcile [--apply]
+    ct.py gc [--apply] [--force] [--dedupe]
+    ct.py locks [--pretty]
+    ct.py analytics [--days N] [--rebuild]
+    ct.py history [diff [FROM] [TO] | log | show [REF]]
+    ct.py metrics [export | show] [--textfile PATH]
+    ct.py outbox [status | flush]
+    ct.py startup-budget [--budget-ms N]
+
+Arguments after the subcommand are passed through to the underlying script
+unchanged, so `ct begin --review q4x` behaves exactly like
+`begin-work.py --review q4x`.
+
+Zipapp:
+    python3 -m zipapp scripts -m ct:main -p "/usr/bin/env python3" -o ct.pyz
+    ./ct.pyz session-start --pretty
+
+Exit codes:
+    Whatever the dispatched script returns; 2 for an unknown subcommand.
+"""
+
+import sys
+
+# Subcommand -> (module name, argv prefix, summary).
+# Module names are resolved with importlib, so the hyphenated script names
+# work both from the scripts/ directory and from inside a zipapp.
+COMMANDS: dict[str, tuple[str, list[str], str]] = {
+    "session-start": ("session-start", [], "Gather session state for Control Tower"),
+    "begin": ("begin-work", [], "Create or resume a task worktree"),
+    "claim-next": ("begin-work", ["--claim-next"], "Atomically claim top ready task(s) and set up worktrees"),
+    "end": ("end-work", [], "Rebase, merge and close a reviewed task"),
+    "review": ("review", [], "Run cargo fmt/clippy/test on a review worktree and attach results"),
+    "session-end": ("session-end", [], "Sync, pull and push at session close"),
+    "beads install": ("install_beads", [], "Install or upgrade bd"),
+    "beads check": ("install_beads", ["--check"], "Check for a bd update"),
+    "beads doctor": ("install_beads", ["--doctor"], "Run bd doctor with filtered output"),
+    "ids resolve": ("taskids", ["resolve"], "Resolve a short or partial task ID locally"),
+    "ids complete": ("taskids", ["complete"], "List task IDs starting with a prefix (shell completion)"),
+    "fleet": ("fleet", [], "Ahead/behind, last commit and dirty state of every agent branch"),
+    "build-health": ("build_health", [], "cargo check every active worktree merged with master (cached)"),
+    "snapshot": ("materialize", ["snapshot"], "Export a read-only copy of a commit to tmpfs"),
+    "reconcile": ("registry", ["reconcile"], "Check task statuses against worktrees, branches and the registry"),
+    "gc": ("worktree_gc", [], "Find and remove abandoned worktrees, report and reclaim disk"),
+    "search": ("search", [], "Full-text search over all tasks and comments"),
+    "locks": ("locks", [], "Show repository lock queues"),
+    "analytics": ("analytics", [], "Time in status, review bounces, cycle time and throughput from bd history"),
+    "history": ("history", [], "Tasks added, moved or edited between session snapshots"),
+    "metrics": ("metrics", [], "Write lifecycle latency histograms and queue gauges as OpenMetrics"),
+    "outbox": ("outbox", [], "Show or flush pushes queued by end-work"),
+    "startup-budget": ("startup_budget", [], "Fail if ct cold start exceeds its budget"),
+}
+
+
+def usage() -> str:
+    """Build the top-level help text from the command table."""
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: ct <command> [args...]", "", "commands:"]
+    for name, (_, _, summary) in COMMANDS.items():
+        lines.append(f"  {name.ljust(width)}  {summary}")
+    return "\n".join(lines)
+
+
+def resolve(argv: list[str]) -> tuple[str, list[str]] | None:
+    """
+    Match argv against the command table.
+
+    Two-word commands ("beads check") take precedence over one-word ones.
+
+    Returns:
+        Tuple of (command name, remaining args), or None if nothing matches
+    """
+    if len(argv) >= 2 and f"{argv[0]} {argv[1]}" in COMMANDS:
+        return (f"{argv[0]} {argv[1]}", argv[2:])
+    if argv and argv[0] in COMMANDS:
+        return (argv[0], argv[1:])
+    return None
+
+
+def dispatch(command: str, args: list[str]) -> int:
+    """
+    Import the module behind a command and run its main().
+
+    The scripts read sys.argv themselves, so argv is rewritten to look like
+    a direct invocation before main() is called.
+    """
+    import importlib
+
+    module_name, prefix, _ = COMMANDS[command]
+    module = importlib.import_module(module_name)
+
+    sys.argv = [f"ct {command}", *prefix, *args]
+    result = module.main()
+    return result if isinstance(result, int) else 0
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+
+    match = resolve(argv)
+    if match is None:
+        print(f"ct: unknown command: {' '.join(argv[:2])}", file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        return 2
+
+    command, args = match
+    return dispatch(command, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Shared location for Control Tower's local state.
+
+Scripts keep small caches and last-known results between runs. They live
+under the git common directory (`.git/ct/`), so every worktree of the repo
+sees the same state and none of it can be committed by accident.
+
+Repository discovery reads `.git` files directly instead of spawning
+`git rev-parse`, which keeps it usable inside tight deadlines.
+
+Set CT_STATE_DIR to relocate the state directory (benchmarks, scratch repos).
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+
+def find_git_dir(start: Path | None = None) -> Path | None:
+    """
+    Find the git directory for the checkout containing `start`.
+
+    Handles both the main checkout (`.git/` directory) and linked worktrees
+    (`.git` file containing `gitdir: ...`).
+
+    Returns:
+        Path to the (per-worktree) git directory, or None outside a repo
+    """
+    path = (start or Path.cwd()).resolve()
+    for candidate in (path, *path.parents):
+        dot_git = candidate / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            content = dot_git.read_text().strip()
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                if not git_dir.is_absolute():
+                    git_dir = candidate / git_dir
+                return git_dir.resolve()
+    return None
+
+
+def find_common_dir(start: Path | None = None) -> Path | None:
+    """Find the git common directory (shared by all worktrees)."""
+    git_dir = find_git_dir(start)
+    if git_dir is None:
+        return None
+    commondir_file = git_dir / "commondir"
+    if commondir_file.exists():
+        return (git_dir / commondir_file.read_text().strip()).resolve()
+    return git_dir
+
+
+def find_project_root(start: Path | None = None) -> Path | None:
+    """Find the main checkout root (parent of the common `.git` directory)."""
+    common_dir = find_common_dir(start)
+    return common_dir.parent if common_dir else None
+
+
+def state_dir(*parts: str) -> Path:
+    """
+    Return (and create) a directory under the Control Tower state root.
+
+    Falls back to a per-user temp location when not inside a repository,
+    so callers never have to handle a missing state directory.
+    """
+    override = os.environ.get("CT_STATE_DIR")
+    if override:
+        root = Path(override)
+    else:
+        common_dir = find_common_dir()
+        if common_dir is not None:
+            root = common_dir / "ct"
+        else:
+            root = Path(os.environ.get("TMPDIR", "/tmp")) / f"ct-state-{os.getuid()}"
+
+    path = root.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Read a JSON state file, returning default if missing or corrupt."""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path: Path, data: Any) -> None:
+    """
+    Write a JSON state file atomically.
+
+    Concurrent scripts (and threads) may read the file at any time, so write
+    to a sibling temp file and rename over the target.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
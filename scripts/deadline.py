@@ -0,0 +1,98 @@
+"""
+Deadline propagation for subprocess calls.
+
+A Deadline is created once per script run from a millisecond budget and
+handed to every helper that spawns a process. Each call gets whatever is
+left of the budget (or a fraction of it) as its timeout, so a hung `bd`
+is killed when the budget runs out instead of blocking the whole run.
+
+Example:
+    deadline = Deadline(1500)
+    result = deadline.run(["bd", "ready", "--json"])  # timeout = time left
+    gates = deadline.run(["bd", "gate", "eval"], share=0.4)  # at most 40% of it
+"""
+
+import subprocess
+import time
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call was cancelled (or never started) because the budget ran out."""
+
+
+class Deadline:
+    """
+    Wall-clock budget shared by all sub-calls of a script run.
+
+    A budget of None means no deadline: remaining() returns None and calls
+    run without a timeout, matching the scripts' original behaviour.
+    """
+
+    def __init__(self, budget_ms: float | None = None):
+        self.budget_ms = budget_ms
+        self.started_at = time.monotonic()
+        self.expires_at = None if budget_ms is None else self.started_at + budget_ms / 1000
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline, or None if unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """True once the budget is used up."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def elapsed_ms(self) -> int:
+        """Milliseconds since the deadline was created."""
+        return int((time.monotonic() - self.started_at) * 1000)
+
+    def timeout(self, share: float = 1.0, cap: float | None = None) -> float | None:
+        """
+        Timeout for one sub-call.
+
+        Args:
+            share: Fraction of the remaining budget this call may use
+            cap: Upper bound in seconds regardless of budget (e.g. a call's
+                own historical timeout)
+
+        Returns:
+            Seconds, or None if neither a deadline nor a cap applies
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        timeout = remaining * share
+        return min(timeout, cap) if cap is not None else timeout
+
+    def run(
+        self,
+        cmd: list[str],
+        share: float = 1.0,
+        cap: float | None = None,
+        **kwargs,
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a command with a timeout derived from the deadline.
+
+        The child is killed when its timeout elapses (subprocess.run does
+        this for us), so late calls are cancelled rather than abandoned.
+        Read-only queries are answered from cmdcache when nothing changed.
+
+        Raises:
+            DeadlineExceeded: If the budget ran out before or during the call
+            subprocess.TimeoutExpired: If only `cap` was hit
+        """
+        timeout = self.timeout(share, cap)
+        if self.expired():
+            raise DeadlineExceeded(f"No budget left for: {' '.join(cmd)}")
+
+        import cmdcache  # Pulls in hashlib; only needed once a command runs
+
+        try:
+            return cmdcache.run(cmd, timeout=timeout, **kwargs)
+        except subprocess.TimeoutExpired:
+            if self.remaining() is not None and (cap is None or timeout < cap):
+                raise DeadlineExceeded(f"Deadline exceeded: {' '.join(cmd)}")
+            raise
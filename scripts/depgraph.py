@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+In-memory dependency graph of beads issues.
+
+Built once from the local issues.jsonl export (see issue_store), then
+answers the questions the lifecycle scripts used to ask bd one subprocess at
+a time:
+
+    ready()                  Open issues with no open blockers (what `bd ready` lists)
+    descendants(root)        Every issue below root via parent-child edges, any depth
+    unblocked_by_close(id)   Open issues whose last open blocker is id
+    critical_path(id)        Longest chain of open blockers ending at id
+
+Edges are kept in both directions (blockers/dependents, parents/children)
+and each issue's open-blocker count is maintained incrementally, so the
+ready set is updated in place by upsert()/set_status()/remove() rather than
+recomputed. Critical-path depths are memoized; a change drops only the
+memoized depths of the changed issue and of everything it (transitively)
+blocks, the only depths that can depend on it.
+
+Usage:
+    python3 scripts/depgraph.py ready
+    python3 scripts/depgraph.py descendants spacetraders-m7y
+    python3 scripts/depgraph.py unblocks spacetraders-xyz
+    python3 scripts/depgraph.py critical-path [spacetraders-xyz]
+    python3 scripts/depgraph.py bench [--issues 10000]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import issue_store
+
+CLOSED = "closed"
+
+# Epic whose descendants are meta-work (tooling, process) rather than game work
+META_EPIC = "spacetraders-m7y"
+
+
+class DepGraph:
+    """Blocking and parent-child edges of a set of issues, with reverse indexes."""
+
+    def __init__(self):
+        self.status: dict[str, str] = {}
+        self.blockers: dict[str, set[str]] = {}
+        self.dependents: dict[str, set[str]] = {}
+        self.parents: dict[str, set[str]] = {}
+        self.children: dict[str, set[str]] = {}
+        self._open_blockers: dict[str, int] = {}
+        self._ready: set[str] = set()
+        self._depth: dict[str, int] = {}
+
+    @classmethod
+    def from_issues(cls, issues: list[dict]) -> "DepGraph":
+        graph = cls()
+        for issue in issues:
+            graph.upsert(issue)
+        return graph
+
+    @classmethod
+    def load(cls, project_root: Path | None = None, export_fallback: bool = True) -> "DepGraph":
+        """Build the graph from the local issue store (empty if there is none)."""
+        return cls.from_issues(issue_store.load_issues(project_root, export_fallback))
+
+    def __contains__(self, issue_id: str) -> bool:
+        return issue_id in self.status
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def is_open(self, issue_id: str) -> bool:
+        """Whether an issue exists and is not closed (unknown IDs don't block)."""
+        status = self.status.get(issue_id)
+        return status is not None and status != CLOSED
+
+    # --- incremental updates ---
+
+    def _refresh_ready(self, issue_id: str) -> None:
+        if self.status.get(issue_id) == "open" and self._open_blockers.get(issue_id, 0) == 0:
+            self._ready.add(issue_id)
+        else:
+            self._ready.discard(issue_id)
+
+    def _adjust_dependents(self, issue_id: str, delta: int) -> None:
+        """Apply a change in issue_id's openness to everything it blocks."""
+        for dependent in self.dependents.get(issue_id, ()):
+            self._open_blockers[dependent] += delta
+            self._refresh_ready(dependent)
+
+    def _invalidate_depth(self, issue_id: str) -> None:
+        """Forget the memoized depths of issue_id and of everything it blocks."""
+        self._depth.pop(issue_id, None)
+        # A depth is only memoized once those of all its open blockers are, so
+        # a dependent without a memo entry has no memoized dependents either
+        stack = [issue_id]
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if self._depth.pop(dependent, None) is not None:
+                    stack.append(dependent)
+
+    def _unlink(self, issue_id: str) -> None:
+        for blocker in self.blockers.pop(issue_id, set()):
+            self.dependents[blocker].discard(issue_id)
+        for parent in self.parents.pop(issue_id, set()):
+            self.children[parent].discard(issue_id)
+        self._open_blockers.pop(issue_id, None)
+
+    def upsert(self, issue: dict) -> None:
+        """Add an issue or replace its status and edges."""
+        issue_id = issue["id"]
+        was_open = self.is_open(issue_id)
+        self._invalidate_depth(issue_id)
+        self._unlink(issue_id)
+
+        self.status[issue_id] = issue.get("status", "open")
+        blockers = set(issue_store.blocking_ids(issue))
+        self.blockers[issue_id] = blockers
+        for blocker in blockers:
+            self.dependents.setdefault(blocker, set()).add(issue_id)
+        parents = set(issue_store.parent_ids(issue))
+        self.parents[issue_id] = parents
+        for parent in parents:
+            self.children.setdefault(parent, set()).add(issue_id)
+        self._open_blockers[issue_id] = sum(1 for b in blockers if self.is_open(b))
+
+        now_open = self.is_open(issue_id)
+        if now_open != was_open:
+            self._adjust_dependents(issue_id, 1 if now_open else -1)
+        self._refresh_ready(issue_id)
+
+    def set_status(self, issue_id: str, status: str) -> None:
+        """Change one issue's status, updating the ready set of its dependents."""
+        if issue_id not in self.status:
+            raise KeyError(issue_id)
+        was_open = self.is_open(issue_id)
+        self.status[issue_id] = status
+        self._invalidate_depth(issue_id)
+        now_open = self.is_open(issue_id)
+        if now_open != was_open:
+            self._adjust_dependents(issue_id, 1 if now_open else -1)
+        self._refresh_ready(issue_id)
+
+    def remove(self, issue_id: str) -> None:
+        """Drop an issue; it stops blocking its dependents."""
+        if issue_id not in self.status:
+            return
+        if self.is_open(issue_id):
+            self._adjust_dependents(issue_id, -1)
+        self._invalidate_depth(issue_id)
+        self._unlink(issue_id)
+        del self.status[issue_id]
+        self._ready.discard(issue_id)
+
+    # --- queries ---
+
+    def ready(self) -> set[str]:
+        """IDs of open issues with no open blockers."""
+        return set(self._ready)
+
+    def descendants(self, root: str) -> set[str]:
+        """Every issue below root through parent-child edges (root excluded)."""
+        found: set[str] = set()
+        stack = [root]
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        found.discard(root)
+        return found
+
+    def unblocked_by_close(self, issue_id: str) -> list[str]:
+        """Open issues that would become ready if issue_id were closed."""
+        if not self.is_open(issue_id):
+            return []
+        return sorted(
+            dependent for dependent in self.dependents.get(issue_id, ())
+            if self.status.get(dependent) == "open" and self._open_blockers[dependent] == 1
+        )
+
+    def depth(self, issue_id: str) -> int:
+        """
+        Number of open issues on the longest blocker chain ending at issue_id
+        (1 for an open issue with no open blockers, 0 if it is closed).
+
+        Cycles are cut at the first repeated issue.
+        """
+        if issue_id in self._depth:
+            return self._depth[issue_id]
+        if not self.is_open(issue_id):
+            return 0
+
+        # Iterative post-order walk; blocker chains can be thousands deep
+        on_path = {issue_id}
+        stack = [(issue_id, iter(self.blockers.get(issue_id, ())))]
+        while stack:
+            node, pending = stack[-1]
+            for blocker in pending:
+                if blocker not in self._depth and blocker not in on_path and self.is_open(blocker):
+                    on_path.add(blocker)
+                    stack.append((blocker, iter(self.blockers.get(blocker, ()))))
+                    break
+            else:
+                stack.pop()
+                on_path.discard(node)
+                self._depth[node] = 1 + max(
+                    (self._depth.get(b, 0) for b in self.blockers.get(node, ()) if self.is_open(b)),
+                    default=0,
+                )
+        return self._depth[issue_id]
+
+    def critical_path(self, issue_id: str | None = None) -> list[str]:
+        """
+        Longest chain of open blockers ending at issue_id, first blocker first.
+
+        Without an ID, the longest chain among all open issues.
+        """
+        if issue_id is None:
+            open_ids = [i for i in self.status if self.is_open(i)]
+            if not open_ids:
+                return []
+            issue_id = max(open_ids, key=lambda i: (self.depth(i), i))
+        if not self.is_open(issue_id):
+            return []
+
+        path = [issue_id]
+        seen = {issue_id}
+        while True:
+            candidates = [b for b in self.blockers.get(path[-1], ()) if self.is_open(b) and b not in seen]
+            if not candidates:
+                break
+            nxt = max(candidates, key=lambda b: (self.depth(b), b))
+            seen.add(nxt)
+            path.append(nxt)
+        path.reverse()
+        return path
+
+
+def synthetic_issues(count: int) -> list[dict]:
+    """A reproducible issue set shaped like a large beads project."""
+    import random
+
+    rng = random.Random(7)
+    issues = []
+    for n in range(count):
+        issue_id = f"bench-{n}"
+        dependencies = []
+        if n >= 10:
+            for blocker in rng.sample(range(max(0, n - 200), n), k=rng.randint(0, 3)):
+                dependencies.append({"issue_id": issue_id, "depends_on_id": f"bench-{blocker}", "type": "blocks"})
+            dependencies.append({"issue_id": issue_id, "depends_on_id": f"bench-{n // 10}", "type": "parent-child"})
+        issues.append({
+            "id": issue_id,
+            "status": rng.choice(["open", "open", "in_progress", "closed", "closed", "closed"]),
+            "dependencies": dependencies,
+        })
+    return issues
+
+
+def bench(count: int) -> dict:
+    """Time graph construction and each query on a synthetic project."""
+    issues = synthetic_issues(count)
+
+    def timed(fn, repeat: int) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1e6
+
+    start = time.perf_counter()
+    graph = DepGraph.from_issues(issues)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    open_ids = [i for i in graph.status if graph.is_open(i)]
+    probe = open_ids[len(open_ids) // 2]
+    flip = {"id": probe, "status": "closed", "dependencies": issues[int(probe.split("-")[1])]["dependencies"]}
+    reopen = {**flip, "status": "open"}
+
+    def update():
+        graph.upsert(flip)
+        graph.upsert(reopen)
+
+    def cold_critical_path():
+        graph._depth.clear()
+        graph.critical_path()
+
+    def critical_path_after_upsert():
+        graph.upsert(flip)
+        graph.upsert(reopen)
+        graph.critical_path()
+
+    def check_memo() -> bool:
+        """Depths after incremental invalidation match a from-scratch rebuild."""
+        for issue in issues[::97]:
+            graph.upsert({**issue, "status": "closed" if graph.is_open(issue["id"]) else "open"})
+            graph.critical_path()
+        fresh = DepGraph.from_issues([{**i, "status": graph.status[i["id"]]} for i in issues])
+        return all(graph.depth(i) == fresh.depth(i) for i in graph.status)
+
+    return {
+        "issues": count,
+        "edges": sum(len(b) for b in graph.blockers.values()) + sum(len(p) for p in graph.parents.values()),
+        "build_ms": round(build_ms, 1),
+        "us_per_op": {
+            "ready": round(timed(graph.ready, 200), 2),
+            "descendants_child": round(timed(lambda: graph.descendants("bench-50"), 2000), 2),
+            "unblocked_by_close": round(timed(lambda: graph.unblocked_by_close(probe), 2000), 2),
+            "critical_path_memoized": round(timed(lambda: graph.critical_path(probe), 2000), 2),
+            "critical_path_cold": round(timed(cold_critical_path, 5), 2),
+            "critical_path_after_upsert": round(timed(critical_path_after_upsert, 200), 2),
+            "upsert_pair": round(timed(update, 2000), 2),
+        },
+        "ready": len(graph.ready()),
+        "critical_path_length": len(graph.critical_path()),
+        "memo_consistent": check_memo(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the local beads dependency graph")
+    parser.add_argument("command", choices=["ready", "descendants", "unblocks", "critical-path", "bench"])
+    parser.add_argument("issue_id", nargs="?", help="Issue ID (descendants, unblocks, critical-path)")
+    parser.add_argument("--issues", type=int, default=10000, help="bench: synthetic issue count")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        output = bench(args.issues)
+    else:
+        if args.command in ("descendants", "unblocks") and not args.issue_id:
+            parser.error(f"{args.command} needs an issue ID")
+        graph = DepGraph.load()
+        if args.command == "ready":
+            output = {"ready": sorted(graph.ready())}
+        elif args.command == "descendants":
+            output = {"root": args.issue_id, "descendants": sorted(graph.descendants(args.issue_id))}
+        elif args.command == "unblocks":
+            output = {"id": args.issue_id, "unblocked": graph.unblocked_by_close(args.issue_id)}
+        else:
+            path = graph.critical_path(args.issue_id)
+            output = {"length": len(path), "path": path}
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
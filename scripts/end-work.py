@@ -4,8 +4,20 @@ end-work.py - Clean merge workflow for completed tasks
 
 Handles rebase-then-merge workflow with conflict detection for beads tasks.
 
+Once master is merged, the remaining steps run as two concurrent chains:
+worktree removal + branch deletion, and gate evaluation -> close -> bd sync
+(ordered, so unblocked tasks appear in suggested_next). The push is queued
+in the outbox and sent by a background flusher with retries (see outbox.py),
+so the result is printed as soon as local state is consistent and a push
+failure no longer fails a merge that already happened. The push is queued
+as soon as the close chain is done, whatever the close or the cleanup
+did: a merged master is never left unqueued. A failed cleanup doesn't fail
+the run; it is reported in "cleanup_error" (`ct reconcile` / `ct gc` finish
+it).
+
 Usage:
     end-work.py <task-id>
+    end-work.py <task-id> --wait-push   # Flush the outbox before returning
 
 Output JSON on success:
     {
@@ -18,13 +30,17 @@ Output JSON on success:
             "pulled": true,
             "rebased": true,
             "merged": true,
-            "worktree_removed": true,
+            "worktree_removed": true,           // false when cleanup_error is set
             "branch_deleted": true,
             "task_closed": true,
             "synced": true,
-            "pushed": true
+            "pushed": false                     // true only with --wait-push
         },
-        "suggested_next": ["spacetraders-abc"]  // Newly unblocked tasks (may be empty)
+        "push": {"queued": true, "entry": "1767600000000000000-4242.json"},
+                                                // --wait-push: outbox.flush() result instead
+        "pushed_refs": [],                      // Branches pushed (--wait-push only)
+        "suggested_next": ["spacetraders-abc"], // Newly unblocked tasks (may be empty)
+        "cleanup_error": "..."                  // Only when the worktree or branch remains
     }
 
 Output JSON on conflict:
@@ -48,8 +64,29 @@ import argparse
 import json
 import subprocess
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 
+import cmdcache
+import locks
+import netsync
+import outbox
+import taskids
+import timing
+import trash
+from beads_sync import SyncCoordinator
+
+# Coalesces the bd sync requests of one run (and across concurrent runs).
+# --no-push: beads-sync goes out with master in the outbox's atomic push.
+BEADS_SYNC = SyncCoordinator(["--json", "--no-push"])
+
+# Rebase/merge rounds before giving up when other agents keep moving master
+MERGE_ATTEMPTS = 3
+
+
+class CleanupFailed(Exception):
+    """Raised when the merged worktree or its branch could not be removed."""
+
 
 def error_exit(message: str, details: str = "") -> None:
     """Exit with error JSON on stderr and non-zero exit code."""
@@ -63,7 +100,7 @@ def error_exit(message: str, details: str = "") -> None:
 def run_command(cmd: list[str], capture_output: bool = True, check: bool = True, cwd: Path = None) -> subprocess.CompletedProcess:
     """Run a command and return the result."""
     try:
-        return subprocess.run(
+        return cmdcache.run(
             cmd,
             capture_output=capture_output,
             text=True,
@@ -79,6 +116,16 @@ def run_command(cmd: list[str], capture_output: bool = True, check: bool = True,
         error_exit(f"Command not found: {cmd[0]}")
 
 
+@contextmanager
+def hold_locks(*requests: tuple[str, str]):
+    """Hold repository locks (see locks.py), exiting with an error on timeout."""
+    try:
+        with locks.hold(*requests):
+            yield
+    except locks.LockTimeout as e:
+        error_exit(str(e), "Another agent holds the lock; inspect with `ct locks`")
+
+
 def get_task_info(task_id: str) -> dict:
     """
     Fetch task information from beads.
@@ -86,9 +133,17 @@ def get_task_info(task_id: str) -> dict:
     Args:
         task_id: Task ID (short or full form)
 
+    Short and partial IDs are resolved against the local ID index first
+    (a partial ID is confirmed with a cached `bd show`, see taskids.py).
+
     Returns:
         Task information dict
     """
+    try:
+        task_id = taskids.resolve(task_id) or task_id
+    except taskids.AmbiguousId as e:
+        error_exit(str(e), "Candidates: " + ", ".join(e.candidates[:taskids.MAX_CANDIDATES]))
+
     result = run_command(["bd", "show", task_id, "--json"])
 
     try:
@@ -110,10 +165,9 @@ def get_project_root() -> Path:
 
 def extract_short_id(full_id: str) -> str:
     """Extract short ID from full ID (e.g., 'spacetraders-q4x' -> 'q4x')."""
-    parts = full_id.split("-", 1)
-    if len(parts) != 2:
+    if "-" not in full_id:
         error_exit(f"Invalid task ID format: {full_id}")
-    return parts[1]
+    return taskids.short_id(full_id)
 
 
 def validate_task_status(task: dict) -> None:
@@ -164,26 +218,42 @@ def validate_no_uncommitted_changes(worktree_path: Path) -> None:
         )
 
 
+@timing.timed
 def pull_master(project_root: Path) -> None:
     """
-    Pull latest master from remote with rebase.
+    Bring local master up to date with the remote (fetch, then rebase).
+
+    Reuses a fetch made earlier in the session (see netsync.FETCH_TTL) and
+    skips the rebase when the remote has nothing new.
 
     Args:
         project_root: Project root directory
     """
-    # Ensure we're on master
-    run_command(
-        ["git", "checkout", "master"],
-        cwd=project_root
-    )
+    # Fetching only touches remote-tracking refs; no lock needed
+    fetch_result = netsync.fetch(project_root)
+    if not fetch_result["ok"]:
+        error_exit("Command failed: git fetch", fetch_result.get("details", ""))
+
+    with hold_locks((locks.MAIN_CHECKOUT, locks.EXCLUSIVE), (locks.MASTER, locks.EXCLUSIVE)):
+        # Ensure we're on master
+        run_command(
+            ["git", "checkout", "master"],
+            cwd=project_root
+        )
 
-    # Pull with rebase to update local master
-    run_command(
-        ["git", "pull", "--rebase"],
-        cwd=project_root
-    )
+        # Rebase local master onto the fetched remote master
+        try:
+            success, conflicting_files = netsync.integrate(project_root)
+        except RuntimeError as e:
+            error_exit("Command failed: git rebase origin/master", str(e))
+    if not success:
+        error_exit(
+            "Rebase of master onto origin/master has conflicts",
+            "Conflicting files:\n" + "\n".join(conflicting_files)
+        )
 
 
+@timing.timed
 def rebase_onto_master(worktree_path: Path) -> tuple[bool, list[str]]:
     """
     Rebase worktree branch onto master.
@@ -244,6 +314,17 @@ def get_branch_name(worktree_path: Path) -> str:
     return result.stdout.strip()
 
 
+def branch_contains_master(project_root: Path, branch_name: str) -> bool:
+    """Check whether master is an ancestor of branch (i.e. --ff-only will work)."""
+    result = run_command(
+        ["git", "merge-base", "--is-ancestor", "master", branch_name],
+        check=False,
+        cwd=project_root
+    )
+    return result.returncode == 0
+
+
+@timing.timed
 def merge_branch(project_root: Path, branch_name: str) -> None:
     """
     Fast-forward merge branch into master.
@@ -265,37 +346,83 @@ def merge_branch(project_root: Path, branch_name: str) -> None:
     )
 
 
+def _cleanup_git(args: list[str]) -> None:
+    """Run a cleanup git command, raising CleanupFailed instead of exiting."""
+    result = cmdcache.run(["git", *args], capture_output=True, text=True, cwd=get_project_root())
+    if result.returncode != 0:
+        raise CleanupFailed(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+
+
+@timing.timed
 def remove_worktree(worktree_path: Path) -> None:
     """
-    Remove the worktree.
+    Remove the worktree without waiting for its files to be deleted.
+
+    The directory is renamed into worktrees/.trash and its git metadata
+    pruned; a detached process deletes it (see trash.py). Falls back to
+    `git worktree remove` if the rename fails.
 
     Args:
         worktree_path: Path to worktree
-    """
-    run_command(["git", "worktree", "remove", str(worktree_path)])
-
 
+    Raises:
+        CleanupFailed: The worktree could not be removed
+    """
+    try:
+        with locks.hold((locks.worktree(worktree_path.name), locks.EXCLUSIVE)):
+            # Same safety check `git worktree remove` makes
+            status = cmdcache.run(["git", "-C", str(worktree_path), "status", "--porcelain"],
+                                  capture_output=True, text=True)
+            if status.returncode != 0 or status.stdout.strip():
+                raise CleanupFailed(
+                    f"Worktree {worktree_path.name} has uncommitted changes: {status.stdout.strip() or status.stderr.strip()}"
+                )
+
+            project_root = get_project_root()
+            try:
+                trashed = trash.move_to_trash(worktree_path, project_root)
+            except OSError:
+                _cleanup_git(["worktree", "remove", str(worktree_path)])
+                return
+            _cleanup_git(["worktree", "prune"])
+    except locks.LockTimeout as e:
+        raise CleanupFailed(str(e)) from e
+
+    trash.reap_in_background(trashed)
+
+
+@timing.timed
 def delete_branch(branch_name: str) -> None:
     """
     Delete the task branch.
 
     Args:
         branch_name: Branch to delete
+
+    Raises:
+        CleanupFailed: git refused
     """
-    run_command(["git", "branch", "-d", branch_name])
+    _cleanup_git(["branch", "-d", branch_name])
 
 
+@timing.timed
 def close_task(task_id: str) -> dict:
     """
     Close the task in beads and get suggested next tasks.
 
+    bd answers --suggest-next from the database, which already has the
+    gates evaluate_gates just closed; the local issues.jsonl export may not
+    (so the dependency graph is not used here).
+
     Args:
         task_id: Task ID to close
 
     Returns:
         Dict with 'suggested_next' list of newly unblocked task IDs (may be empty)
     """
-    result = run_command(["bd", "close", task_id, "-r", "Merged to master", "--suggest-next", "--json"])
+    with hold_locks((locks.BEADS_DB, locks.EXCLUSIVE)):
+        result = run_command(["bd", "close", task_id, "-r", "Merged to master", "--suggest-next", "--json"])
+    BEADS_SYNC.mark_dirty()
 
     try:
         data = json.loads(result.stdout)
@@ -306,11 +433,15 @@ def close_task(task_id: str) -> dict:
         return {"suggested_next": []}
 
 
+@timing.timed
 def sync_beads() -> None:
-    """Sync beads changes to git."""
-    run_command(["bd", "sync", "--json"])
+    """Sync beads changes to git (skipped when nothing is pending)."""
+    result = BEADS_SYNC.sync()
+    if not result["ok"]:
+        error_exit("Command failed: bd sync --json", result.get("details", ""))
 
 
+@timing.timed
 def evaluate_gates() -> dict:
     """
     Evaluate timer gates and return results.
@@ -319,11 +450,12 @@ def evaluate_gates() -> dict:
         - evaluated: number of gates checked
         - closed: list of gate IDs that were closed
     """
-    result = subprocess.run(
-        ["bd", "gate", "eval"],
-        capture_output=True,
-        text=True,
-    )
+    with hold_locks((locks.BEADS_DB, locks.EXCLUSIVE)):
+        result = subprocess.run(
+            ["bd", "gate", "eval"],
+            capture_output=True,
+            text=True,
+        )
 
     output = result.stdout.strip()
 
@@ -387,19 +519,66 @@ def handle_uncommitted_changes(project_root: Path) -> bool:
     return True
 
 
-def push_changes(project_root: Path) -> None:
+def cleanup_worktree(worktree_path: Path, branch_name: str) -> dict:
+    """
+    Remove the merged worktree, then its branch and registry entry.
+
+    Never exits: the merge already happened, so a failure here must not stop
+    the close or the push.
+
+    Returns:
+        Dict with worktree_removed, branch_deleted and error (None on success)
+    """
+    import registry
+
+    outcome = {"worktree_removed": False, "branch_deleted": False, "error": None}
+    try:
+        remove_worktree(worktree_path)
+        outcome["worktree_removed"] = True
+        registry.unregister(worktree_path.name)
+        delete_branch(branch_name)
+        outcome["branch_deleted"] = True
+    except (CleanupFailed, OSError) as e:
+        outcome["error"] = str(e)
+    return outcome
+
+
+def finish_task(task_id: str) -> tuple[dict, dict]:
+    """
+    Evaluate gates, close the task and sync beads, in that order.
+
+    Gates go first so tasks they unblock appear in suggested_next.
+
+    Returns:
+        Tuple of (gates result, close result)
+    """
+    gates_result = evaluate_gates()
+    close_result = close_task(task_id)
+    sync_beads()
+    return gates_result, close_result
+
+
+@timing.timed
+def queue_push(project_root: Path, task_id: str, wait: bool) -> dict:
     """
-    Push changes to remote.
+    Queue master and beads-sync for pushing.
 
     Args:
         project_root: Project root directory
+        task_id: Task the push is for (shown in `ct outbox status`)
+        wait: Flush in this process instead of in the background
+
+    Returns:
+        {"queued": True, "entry": ...}, or the outbox.flush() result when waiting
     """
-    run_command(
-        ["git", "push"],
-        cwd=project_root
-    )
+    entry = outbox.enqueue(f"end-work {task_id}")
+    if wait:
+        return outbox.flush(project_root)
+    outbox.flush_in_background(project_root)
+    return {"queued": True, "entry": entry}
 
 
+@timing.timed("end_work")
 def main():
     parser = argparse.ArgumentParser(
         description="Merge completed task with rebase workflow"
@@ -409,6 +588,12 @@ def main():
         help="Beads task ID (short form like 'q4x' or full form like 'spacetraders-q4x')"
     )
 
+    parser.add_argument(
+        "--wait-push",
+        action="store_true",
+        help="Push before returning instead of in the background"
+    )
+
     args = parser.parse_args()
 
     # Get task information
@@ -436,31 +621,51 @@ def main():
     # Pull latest master from remote
     pull_master(project_root)
 
-    # Rebase onto master
-    rebase_success, conflicting_files = rebase_onto_master(worktree_path)
-
-    if not rebase_success:
-        # Output conflict info and exit with special code
-        conflict_output = {
-            "result": "conflict",
-            "task": {
-                "id": full_id,
-                "title": task["title"]
-            },
-            "conflicting_files": conflicting_files,
-            "message": "Resolve conflicts in worktree, commit resolution, then run end-work again"
-        }
-        print(json.dumps(conflict_output, indent=2))
-        sys.exit(2)
-
-    # Rebase successful - proceed with merge and cleanup
-    merge_branch(project_root, branch_name)
-    remove_worktree(worktree_path)
-    delete_branch(branch_name)
-    gates_result = evaluate_gates()  # Before close_task so unblocked tasks appear in suggested_next
-    close_result = close_task(full_id)
-    sync_beads()
-    push_changes(project_root)
+    # Rebase onto master (in the worktree, so other agents' rebases run in
+    # parallel), then fast-forward master while holding it exclusively. If
+    # another agent merged in between, master moved and we rebase again.
+    for _ in range(MERGE_ATTEMPTS):
+        with hold_locks((locks.MASTER, locks.SHARED), (locks.worktree(short_id), locks.EXCLUSIVE)):
+            rebase_success, conflicting_files = rebase_onto_master(worktree_path)
+
+        if not rebase_success:
+            # Output conflict info and exit with special code
+            conflict_output = {
+                "result": "conflict",
+                "task": {
+                    "id": full_id,
+                    "title": task["title"]
+                },
+                "conflicting_files": conflicting_files,
+                "message": "Resolve conflicts in worktree, commit resolution, then run end-work again"
+            }
+            print(json.dumps(conflict_output, indent=2))
+            sys.exit(2)
+
+        with hold_locks((locks.MAIN_CHECKOUT, locks.EXCLUSIVE), (locks.MASTER, locks.EXCLUSIVE)):
+            if branch_contains_master(project_root, branch_name):
+                # Rebase successful - proceed with merge and cleanup
+                merge_branch(project_root, branch_name)
+                break
+    else:
+        error_exit(
+            "Master kept moving during rebase",
+            f"Other agents merged {MERGE_ATTEMPTS} times while this branch was rebasing; run end-work again"
+        )
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Independent local steps. master is merged, so its push is queued once
+    # the close chain is done (its bd sync goes out with it), even if that
+    # chain exits with an error; cleanup reports failures instead of exiting.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cleanup = pool.submit(cleanup_worktree, worktree_path, branch_name)
+        beads = pool.submit(finish_task, full_id)
+        try:
+            gates_result, close_result = beads.result()
+        finally:
+            push_result = queue_push(project_root, full_id, args.wait_push)
+        cleanup_result = cleanup.result()
 
     # Output success JSON
     success_output = {
@@ -473,16 +678,20 @@ def main():
             "pulled": True,
             "rebased": True,
             "merged": True,
-            "worktree_removed": True,
-            "branch_deleted": True,
+            "worktree_removed": cleanup_result["worktree_removed"],
+            "branch_deleted": cleanup_result["branch_deleted"],
             "task_closed": True,
             "synced": True,
             "gates_evaluated": True,
-            "pushed": True
+            "pushed": push_result.get("state") in ("pushed", "empty")
         },
+        "push": push_result,
+        "pushed_refs": push_result.get("pushed", []),
         "suggested_next": close_result.get("suggested_next", []),
         "gates_closed": gates_result.get("closed", [])
     }
+    if cleanup_result["error"]:
+        success_output["cleanup_error"] = cleanup_result["error"]
     print(json.dumps(success_output, indent=2))
 
 
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Fleet report: every agent branch and worktree at a glance.
+
+Control Tower used to see branch progress one worktree at a time (two git
+calls each in begin-work's resume context). This builds the whole picture
+from:
+
+    - one `git for-each-ref refs/heads/task refs/heads/bug refs/heads/feature`
+      for tip, last commit time, author and subject (and ahead/behind counts
+      via %(ahead-behind:master) on git >= 2.41)
+    - on older git, `git rev-list --left-right --count master...<branch>`
+      per branch, run in parallel
+    - one `git worktree list --porcelain` (cached) to map branches to worktrees
+    - `git status --porcelain` per worktree, run in parallel, for dirty files
+
+Task status comes from the local issues.jsonl export. A claim is flagged
+stale when its task is in_progress (or unknown) and the branch has had no
+new commit for --stale-hours (default 24); a branch with no commits of its
+own counts from when its worktree was created.
+
+Usage:
+    python3 scripts/fleet.py [--stale-hours 24] [--pretty]
+    python3 scripts/fleet.py bench [--worktrees 50]
+    ct fleet --pretty
+
+Output JSON:
+    {
+        "branches": [
+            {
+                "branch": "task/q4x",
+                "task_id": "spacetraders-q4x",
+                "status": "in_progress",
+                "worktree": "worktrees/q4x",      // null if the branch has none
+                "ahead": 3, "behind": 12,
+                "last_commit": {"time": "2026-01-05T10:12:00Z", "age_hours": 30.5,
+                                "author": "agent", "subject": "..."},
+                "dirty": 2,                        // changed/untracked files, null without worktree
+                "stale": true
+            }
+        ],
+        "stale": ["spacetraders-q4x"],
+        "elapsed_ms": 180.2
+    }
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cmdcache
+import issue_store
+import taskids
+from ct_state import find_project_root
+
+BRANCH_NAMESPACES = ("refs/heads/task", "refs/heads/bug", "refs/heads/feature", "refs/heads/chore")
+BASE = "master"
+DEFAULT_STALE_HOURS = 24.0
+MAX_WORKERS = 16
+
+_FIELDS = ["%(refname:short)", "%(objectname)", "%(committerdate:unix)", "%(authorname)", "%(contents:subject)"]
+
+
+def git(args: list[str], cwd: Path) -> subprocess.CompletedProcess:
+    return cmdcache.run(["git", *args], cwd=cwd)
+
+
+def list_branches(project_root: Path) -> list[dict]:
+    """
+    Agent branches with tip details, in one for-each-ref call.
+
+    Asks for %(ahead-behind:master) first; git before 2.41 rejects the atom,
+    in which case the counts are left as None for the caller to fill in.
+    """
+    for with_counts in (True, False):
+        fields = _FIELDS + ([f"%(ahead-behind:{BASE})"] if with_counts else [])
+        result = git(["for-each-ref", "--format=" + "%00".join(fields), *BRANCH_NAMESPACES], project_root)
+        if result.returncode == 0:
+            break
+    else:
+        raise RuntimeError(result.stderr.strip() or "git for-each-ref failed")
+
+    branches = []
+    for line in result.stdout.splitlines():
+        parts = line.split("\0")
+        ahead = behind = None
+        if with_counts:
+            ahead, behind = (int(n) for n in parts[5].split())
+        branches.append({
+            "branch": parts[0],
+            "sha": parts[1],
+            "time": int(parts[2] or 0),
+            "author": parts[3],
+            "subject": parts[4],
+            "ahead": ahead,
+            "behind": behind,
+        })
+    return branches
+
+
+def ahead_behind(project_root: Path, branch: str) -> tuple[int, int]:
+    """Commits on branch not on master, and on master not on branch."""
+    result = subprocess.run(
+        ["git", "rev-list", "--left-right", "--count", f"{branch}...{BASE}"],
+        cwd=project_root, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return (0, 0)
+    ahead, behind = result.stdout.split()
+    return (int(ahead), int(behind))
+
+
+def worktree_paths(project_root: Path) -> dict[Path, str | None]:
+    """
+    Every worktree git knows -> its branch (None on a detached HEAD).
+
+    From `git worktree list --porcelain`; worktrees mid-rebase or bisect,
+    or with a commit checked out, have no `branch` line but are included.
+    """
+    result = git(["worktree", "list", "--porcelain"], project_root)
+    mapping: dict[Path, str | None] = {}
+    path = None
+    for line in result.stdout.splitlines():
+        if line.startswith("worktree "):
+            path = Path(line.split(" ", 1)[1])
+            mapping[path] = None
+        elif line.startswith("branch refs/heads/") and path is not None:
+            mapping[path] = line[len("branch refs/heads/"):]
+        elif not line:
+            path = None
+    return mapping
+
+
+def worktree_branches(project_root: Path) -> dict[str, Path]:
+    """Branch name -> worktree path, from `git worktree list --porcelain`."""
+    return {branch: path for path, branch in worktree_paths(project_root).items() if branch is not None}
+
+
+def dirty_count(worktree: Path) -> int | None:
+    """Changed and untracked files in a worktree, None if git can't tell."""
+    result = subprocess.run(
+        ["git", "-C", str(worktree), "status", "--porcelain"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return sum(1 for line in result.stdout.splitlines() if line)
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def report(project_root: Path, stale_hours: float = DEFAULT_STALE_HOURS) -> dict:
+    """Build the fleet report (see module docstring for the format)."""
+    start = time.perf_counter()
+    now = time.time()
+
+    branches = list_branches(project_root)
+    worktrees = worktree_branches(project_root)
+    issues = {taskids.short_id(i["id"]): i for i in issue_store.load_issues(project_root, export_fallback=False)}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        counts = {
+            b["branch"]: pool.submit(ahead_behind, project_root, b["branch"])
+            for b in branches if b["ahead"] is None
+        }
+        dirty = {
+            b["branch"]: pool.submit(dirty_count, worktrees[b["branch"]])
+            for b in branches if b["branch"] in worktrees
+        }
+        for b in branches:
+            if b["branch"] in counts:
+                b["ahead"], b["behind"] = counts[b["branch"]].result()
+
+    entries = []
+    stale_ids = []
+    for b in branches:
+        short_id = b["branch"].split("/", 1)[1]
+        issue = issues.get(short_id)
+        worktree = worktrees.get(b["branch"])
+
+        # Without own commits, the branch tip is master's; use the worktree's age instead
+        last_activity = b["time"]
+        if b["ahead"] == 0 and worktree is not None:
+            try:
+                last_activity = worktree.stat().st_mtime
+            except OSError:
+                pass
+        idle_hours = (now - last_activity) / 3600
+
+        status = issue.get("status") if issue else None
+        stale = status in ("in_progress", None) and idle_hours > stale_hours
+        task_id = issue["id"] if issue else None
+        if stale:
+            stale_ids.append(task_id or b["branch"])
+
+        entries.append({
+            "branch": b["branch"],
+            "task_id": task_id,
+            "status": status,
+            "worktree": os.path.relpath(worktree, project_root) if worktree else None,
+            "ahead": b["ahead"],
+            "behind": b["behind"],
+            "last_commit": {
+                "time": _iso(b["time"]),
+                "age_hours": round((now - b["time"]) / 3600, 1),
+                "author": b["author"],
+                "subject": b["subject"],
+            },
+            "dirty": dirty[b["branch"]].result() if b["branch"] in dirty else None,
+            "stale": stale,
+        })
+
+    return {
+        "branches": entries,
+        "stale": stale_ids,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def bench(worktree_count: int) -> dict:
+    """Time the report on a scratch repo with worktree_count agent worktrees."""
+    import tempfile
+
+    def sh(args: list[str], cwd: Path) -> None:
+        subprocess.run(args, cwd=cwd, check=True, capture_output=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "repo"
+        repo.mkdir()
+        sh(["git", "init", "-q", "-b", BASE], repo)
+        sh(["git", "config", "user.email", "bench@example.com"], repo)
+        sh(["git", "config", "user.name", "bench"], repo)
+        for n in range(20):
+            (repo / f"f{n}").write_text(str(n) * 1000)
+        sh(["git", "add", "."], repo)
+        sh(["git", "commit", "-qm", "base"], repo)
+
+        for n in range(worktree_count):
+            path = repo / "worktrees" / f"w{n:02d}"
+            sh(["git", "worktree", "add", "-q", "-b", f"task/w{n:02d}", str(path)], repo)
+            if n % 2:
+                (path / "work").write_text(str(n))
+                sh(["git", "add", "work"], path)
+                sh(["git", "commit", "-qm", f"work {n}"], path)
+            if n % 3 == 0:
+                (path / "scratch").write_text("dirty")
+        (repo / "f0").write_text("moved on")
+        sh(["git", "commit", "-qam", "master moves"], repo)
+
+        previous = os.environ.get("CT_STATE_DIR")
+        os.environ["CT_STATE_DIR"] = str(Path(tmp) / "state")
+        try:
+            report(repo)  # Warm the filesystem cache
+            timings = []
+            for _ in range(3):
+                result = report(repo)
+                timings.append(result["elapsed_ms"])
+        finally:
+            if previous is None:
+                del os.environ["CT_STATE_DIR"]
+            else:
+                os.environ["CT_STATE_DIR"] = previous
+
+    return {
+        "worktrees": worktree_count,
+        "branches": len(result["branches"]),
+        "dirty": sum(1 for b in result["branches"] if b["dirty"]),
+        "ms": {"min": min(timings), "max": max(timings)},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Status of every agent branch and worktree")
+    parser.add_argument("command", nargs="?", default="report", choices=["report", "bench"])
+    parser.add_argument("--stale-hours", type=float, default=DEFAULT_STALE_HOURS,
+                        help=f"Flag in-progress claims idle this long (default {DEFAULT_STALE_HOURS:g})")
+    parser.add_argument("--worktrees", type=int, default=50, help="bench: number of worktrees")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        output = bench(args.worktrees)
+    else:
+        project_root = find_project_root()
+        if project_root is None:
+            print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+            return 1
+        output = report(project_root, args.stale_hours)
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
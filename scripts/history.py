@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Session snapshot history, and cheap diffs between any two snapshots.
+
+session-start and session-end each append a snapshot to a local store in
+.git/ct/history/:
+
+    objects/ab/cdef...   zlib-compressed JSON, named by the blake2b hash of
+                         its content (snapshots and session reports)
+    log.jsonl            one line per snapshot, oldest first:
+                         {"n": 41, "id": "ab12...", "kind": "session-start",
+                          "at": "2026-01-05T10:12:00Z", "changes": 3,
+                          "stat": [<issues.jsonl path>, <size>, <mtime_ns>]}
+    head.json            the task table of the latest snapshot (a cache; it
+                         is rebuilt from the objects when missing)
+
+Every task in issues.jsonl is keyed by ID and summarized by its status,
+title and a short hash of each field (updated_at aside, which every write
+bumps), e.g.
+
+    ["review", "Fix jump gate cooldown", "description=1f0c9a2e,notes=..."]
+
+A snapshot object stores only what changed since its parent:
+
+    {"parent": "<id>", "n": 41, "kind": "session-start", "at": "...",
+     "report": "<object id of the script's summary>",
+     "delta": {"spacetraders-q4x": [<before or null>, <after or null>]}}
+
+so an idle session costs a few hundred bytes, and the first snapshot holds
+the whole table. Recording only parses the issues.jsonl lines whose hash
+changed, and nothing at all (not even head.json) when the file's size and
+mtime match the last snapshot's.
+
+`diff A B` folds the deltas of the snapshots after A up to B: the first
+`before` and last `after` of each task touched in between. It reads
+neither issues.jsonl nor the table, so its cost follows the number of
+changes (and snapshots) in the range, not the number of tasks:
+
+    added      task created (or first seen)
+    removed    task gone from issues.jsonl
+    moved      status changed (with the fields edited along the way)
+    edited     same status, other fields changed
+
+A task changed and changed back drops out of the diff.
+
+Snapshots are named by position (0 is the first, -1 the latest, -2 the one
+before), by ID prefix (6+ hex characters), or by `start`/`end` for the
+latest session-start/session-end snapshot.
+
+Usage:
+    python3 scripts/history.py diff [FROM] [TO] [--pretty]   # default: -2 -1
+    python3 scripts/history.py log [--limit 20]
+    python3 scripts/history.py show [REF]
+    python3 scripts/history.py record [--kind manual]
+    python3 scripts/history.py bench [--issues 20000]
+    ct history diff end start
+
+Output JSON (diff):
+    {
+        "from": {"n": 40, "id": "9f3c2a1b0d4e", "kind": "session-end", "at": "..."},
+        "to": {"n": 41, "id": "ab12cd34ef56", "kind": "session-start", "at": "..."},
+        "added": [{"id": "spacetraders-x1y", "title": "...", "status": "open"}],
+        "removed": [],
+        "moved": [{"id": "spacetraders-q4x", "title": "...", "from": "review", "to": "closed", "edited": ["notes"]}],
+        "edited": [{"id": "spacetraders-k2m", "title": "...", "status": "open", "fields": ["description"]}],
+        "snapshots": 1,     // deltas folded
+        "entries": 4,       // delta entries read
+        "elapsed_ms": 0.4
+    }
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+LOG_FILE = "log.jsonl"
+HEAD_FILE = "head.json"
+HEAD_VERSION = 1
+
+# Bumped by every bd write, so it would make every touched task look edited
+VOLATILE_FIELDS = ("id", "updated_at")
+
+# Seconds to wait for another run's snapshot before skipping this one
+LOCK_TIMEOUT = 5.0
+
+KINDS = {"start": "session-start", "end": "session-end"}
+
+_INDEX_RE = re.compile(r"^-?\d{1,5}$")
+
+
+class UnknownSnapshot(Exception):
+    """Raised when a snapshot reference matches nothing (or more than one)."""
+
+
+def _dir(*parts: str) -> Path:
+    return state_dir("history", *parts)
+
+
+def _digest(data: bytes, size: int = 16) -> str:
+    return hashlib.blake2b(data, digest_size=size).hexdigest()
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def put(value) -> str:
+    """Store a JSON value as a compressed object; returns its ID."""
+    data = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    object_id = _digest(data)
+    path = _dir("objects", object_id[:2]) / object_id[2:]
+    if not path.exists():
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(zlib.compress(data, 6))
+        os.replace(tmp, path)
+    return object_id
+
+
+def get(object_id: str):
+    """Load an object stored by put()."""
+    path = _dir("objects", object_id[:2]) / object_id[2:]
+    return json.loads(zlib.decompress(path.read_bytes()))
+
+
+def summarize(issue: dict) -> list:
+    """
+    [status, title, "field=hash,..."] of an issue.
+
+    The field hashes are one string: tens of thousands of small dicts would
+    make head.json several times slower to load.
+    """
+    fields = ",".join(
+        f"{name}={_digest(json.dumps(issue[name], sort_keys=True).encode(), 4)}"
+        for name in sorted(issue) if name not in VOLATILE_FIELDS
+    )
+    return [issue.get("status"), issue.get("title", ""), fields]
+
+
+def _field_hashes(summary: list) -> dict[str, str]:
+    return dict(item.split("=", 1) for item in summary[2].split(",") if item)
+
+
+def read_log() -> list[dict]:
+    """Every snapshot's log line, oldest first."""
+    try:
+        lines = (_dir() / LOG_FILE).read_text().splitlines()
+    except OSError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return entries
+
+
+def _rebuild_head(log: list[dict]) -> dict:
+    """Task table of the latest snapshot, folded from every delta."""
+    tasks = {}
+    for entry in log:
+        for task_id, (_, after) in get(entry["id"])["delta"].items():
+            if after is None:
+                tasks.pop(task_id, None)
+            else:
+                tasks[task_id] = [None, *after]
+    return {"version": HEAD_VERSION, "id": log[-1]["id"] if log else None, "tasks": tasks}
+
+
+def _signature(store: Path | None) -> list | None:
+    """[path, size, mtime_ns] of issues.jsonl, or None if there is none."""
+    try:
+        stat = store.stat() if store is not None else None
+    except OSError:
+        return None
+    return [str(store), stat.st_size, stat.st_mtime_ns] if stat else None
+
+
+def _load_head(log: list[dict]) -> dict:
+    """
+    Task table of the latest snapshot: head.json if it belongs to the last
+    snapshot with changes, else folded from every delta.
+    """
+    head = read_json(_dir() / HEAD_FILE, default=None)
+    if head and head.get("version") == HEAD_VERSION:
+        for entry in reversed(log):
+            if entry["id"] == head.get("id"):
+                return head
+            if entry.get("changes"):
+                break
+        if not log and head.get("id") is None:
+            return head
+    return _rebuild_head(log)
+
+
+def scan(head: dict, store: Path) -> dict:
+    """
+    Bring head's task table up to date with issues.jsonl.
+
+    Only lines whose hash isn't in the table are parsed.
+
+    Args:
+        head: Table of the previous snapshot (updated in place)
+        store: issues.jsonl
+
+    Returns:
+        Delta: task ID -> [before, after] for every task that changed
+    """
+    tasks = head["tasks"]
+    by_line = {row[0]: task_id for task_id, row in tasks.items() if row[0] is not None}
+    seen = set()
+    delta = {}
+    with open(store, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            line_hash = _digest(line, 8)
+            task_id = by_line.get(line_hash)
+            if task_id is not None:
+                seen.add(task_id)
+                continue
+            try:
+                issue = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            task_id = issue.get("id")
+            if not isinstance(task_id, str):
+                continue
+            seen.add(task_id)
+            after = summarize(issue)
+            before = tasks[task_id][1:] if task_id in tasks else None
+            if before != after:
+                delta[task_id] = [before, after]
+            tasks[task_id] = [line_hash, *after]
+    for task_id in set(tasks) - seen:
+        delta[task_id] = [tasks.pop(task_id)[1:], None]
+    return delta
+
+
+def append(
+    store: Path | None, kind: str, report: dict | None = None, timeout: float = LOCK_TIMEOUT
+) -> dict | None:
+    """
+    Append a snapshot of every task in `store` (and the run's report) to the history.
+
+    Args:
+        store: issues.jsonl (None records an empty delta)
+        kind: What took it ("session-start", "session-end", ...)
+        report: Summary of the run, stored alongside
+        timeout: Seconds to wait for another run's snapshot
+
+    Returns:
+        The snapshot's log line, or None if another run held the store
+        for longer than timeout
+    """
+    import locks
+
+    try:
+        with locks.hold((locks.HISTORY, locks.EXCLUSIVE), timeout=timeout):
+            log = read_log()
+            signature = _signature(store)
+            head = None
+            delta = {}
+            # Same file as last time: nothing can have changed
+            if signature is not None and (not log or log[-1].get("stat") != signature):
+                head = _load_head(log)
+                delta = scan(head, store)
+            snapshot = {
+                "parent": log[-1]["id"] if log else None,
+                "n": len(log),
+                "kind": kind,
+                "at": _iso(time.time()),
+                "report": put(report) if report is not None else None,
+                "delta": delta,
+            }
+            entry = {"n": len(log), "id": put(snapshot), "kind": kind, "at": snapshot["at"],
+                     "changes": len(delta), "stat": signature}
+            with open(_dir() / LOG_FILE, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            if head is not None:
+                head["id"] = entry["id"]
+                write_json(_dir() / HEAD_FILE, head)
+    except locks.LockTimeout:
+        return None
+    return entry
+
+
+def record(
+    kind: str, report: dict | None = None, project_root: Path | None = None, timeout: float = LOCK_TIMEOUT
+) -> dict | None:
+    """
+    Snapshot the project's issues.jsonl (see append). An unreadable store
+    or history skips the snapshot: history must not fail the session scripts.
+
+    Args:
+        kind: What took it ("session-start", "session-end", ...)
+        report: Summary of the run, stored alongside
+        project_root: Main checkout (default: found from the cwd)
+        timeout: Seconds to wait for another run's snapshot
+    """
+    import issue_store
+
+    project_root = project_root or find_project_root()
+    try:
+        return append(issue_store.find_store(project_root) if project_root else None, kind, report, timeout)
+    except (OSError, ValueError, zlib.error):
+        return None
+
+
+def resolve(ref: str, log: list[dict]) -> int:
+    """
+    Position in the log of a snapshot reference (see module docstring).
+
+    Raises:
+        UnknownSnapshot: Nothing (or several snapshots) matched
+    """
+    if _INDEX_RE.match(ref):
+        index = int(ref)
+        if -len(log) <= index < len(log):
+            return index % len(log)
+        raise UnknownSnapshot(f"No snapshot {ref} ({len(log)} recorded)")
+    if ref in KINDS:
+        for entry in reversed(log):
+            if entry["kind"] == KINDS[ref]:
+                return entry["n"]
+        raise UnknownSnapshot(f"No {KINDS[ref]} snapshot recorded")
+    if len(ref) < 6 or not re.fullmatch(r"[0-9a-f]+", ref):
+        raise UnknownSnapshot(f"Not a snapshot position, kind or ID prefix: {ref}")
+    matches = [entry["n"] for entry in log if entry["id"].startswith(ref)]
+    if len(matches) != 1:
+        raise UnknownSnapshot(f"{len(matches) or 'No'} snapshots match {ref}")
+    return matches[0]
+
+
+def _describe(entry: dict) -> dict:
+    return {"n": entry["n"], "id": entry["id"][:12], "kind": entry["kind"], "at": entry["at"]}
+
+
+def diff(from_ref: str = "-2", to_ref: str = "-1") -> dict:
+    """
+    Tasks added, removed, moved or edited between two snapshots.
+
+    Args:
+        from_ref: Older snapshot (see resolve); a newer one reverses the diff
+        to_ref: Newer snapshot
+
+    Returns:
+        Dict with from, to, added, removed, moved, edited, snapshots and entries
+    """
+    start = time.perf_counter()
+    log = read_log()
+    if not log:
+        raise UnknownSnapshot("No snapshots recorded yet")
+    old, new = resolve(from_ref, log), resolve(to_ref, log)
+    low, high = sorted((old, new))
+
+    folded = {}
+    entries = 0
+    for entry in log[low + 1:high + 1]:
+        delta = get(entry["id"])["delta"]
+        entries += len(delta)
+        for task_id, (before, after) in delta.items():
+            if task_id in folded:
+                folded[task_id][1] = after
+            else:
+                folded[task_id] = [before, after]
+
+    output = {"from": _describe(log[old]), "to": _describe(log[new]),
+              "added": [], "removed": [], "moved": [], "edited": []}
+    for task_id, (before, after) in sorted(folded.items()):
+        if old > new:
+            before, after = after, before
+        if before == after:
+            continue
+        if before is None:
+            output["added"].append({"id": task_id, "title": after[1], "status": after[0]})
+        elif after is None:
+            output["removed"].append({"id": task_id, "title": before[1], "status": before[0]})
+        else:
+            old_fields, new_fields = _field_hashes(before), _field_hashes(after)
+            changed = sorted(
+                name for name in old_fields.keys() | new_fields.keys()
+                if name != "status" and old_fields.get(name) != new_fields.get(name)
+            )
+            if before[0] != after[0]:
+                output["moved"].append({"id": task_id, "title": after[1], "from": before[0], "to": after[0],
+                                        "edited": changed})
+            else:
+                output["edited"].append({"id": task_id, "title": after[1], "status": after[0], "fields": changed})
+
+    output["snapshots"] = high - low
+    output["entries"] = entries
+    output["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return output
+
+
+def show(ref: str = "-1") -> dict:
+    """A snapshot's log line, parent and report (delta reduced to its task IDs)."""
+    log = read_log()
+    if not log:
+        raise UnknownSnapshot("No snapshots recorded yet")
+    entry = log[resolve(ref, log)]
+    snapshot = get(entry["id"])
+    return {
+        **entry,
+        "parent": snapshot["parent"],
+        "changed": sorted(snapshot["delta"]),
+        "report": get(snapshot["report"]) if snapshot["report"] else None,
+    }
+
+
+def synthetic_store(path: Path, issue_count: int, edits: int = 0, seed: int = 0) -> None:
+    """Write an issues.jsonl of issue_count issues; the first `edits` differ by seed."""
+    statuses = ["closed"] * 6 + ["open", "open", "in_progress", "review"]
+    with open(path, "w") as f:
+        for n in range(issue_count):
+            changed = n < edits
+            f.write(json.dumps({
+                "id": f"spacetraders-{n:05x}",
+                "title": f"Task {n}",
+                "description": f"Implement part {n} of the fleet automation. " * 8,
+                "status": statuses[(n + (seed if changed else 0)) % len(statuses)],
+                "priority": n % 4,
+                "issue_type": "task",
+                "notes": f"COMPLETED: step {seed if changed and n % 2 else 0}",
+                "labels": ["game"],
+                "created_at": "2026-01-05T10:12:00Z",
+                "updated_at": f"2026-01-{5 + (seed if changed else 0):02d}T10:12:00Z",
+            }) + "\n")
+
+
+def bench(issue_count: int) -> dict:
+    """Time a first snapshot, one after 50 edits, an idle one, and diffs across them."""
+    import tempfile
+
+    def timed(fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, round((time.perf_counter() - start) * 1000, 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CT_STATE_DIR"] = tmp
+        store = Path(tmp) / "issues.jsonl"
+        head_path = _dir() / HEAD_FILE
+
+        synthetic_store(store, issue_count)
+        _, full_ms = timed(append, store, "session-start")
+        synthetic_store(store, issue_count, edits=50, seed=1)
+        _, incremental_ms = timed(append, store, "session-end")
+        _, idle_ms = timed(append, store, "session-start")
+        result, diff_ms = timed(diff, "0", "-1")
+        _, rebuild_ms = timed(_rebuild_head, read_log())
+
+        objects = [p for p in _dir("objects").rglob("*") if p.is_file()]
+        return {
+            "issues": issue_count,
+            "store_bytes": store.stat().st_size,
+            "history_bytes": sum(p.stat().st_size for p in objects),
+            "head_bytes": head_path.stat().st_size,
+            "ms": {"first": full_ms, "incremental": incremental_ms, "idle": idle_ms,
+                   "diff": diff_ms, "rebuild_head": rebuild_ms},
+            "diff": {key: len(result[key]) for key in ("added", "removed", "moved", "edited")},
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Session snapshot history and diffs")
+    parser.add_argument("command", nargs="?", default="log", choices=["diff", "log", "show", "record", "bench"])
+    parser.add_argument("refs", nargs="*", help="diff: FROM [TO] (default -2 -1); show: REF (default -1)")
+    parser.add_argument("--limit", type=int, default=20, help="log: latest N snapshots (default 20)")
+    parser.add_argument("--kind", default="manual", help="record: snapshot kind (default manual)")
+    parser.add_argument("--issues", type=int, default=20000, help="bench: synthetic issues")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        output = bench(args.issues)
+    else:
+        project_root = find_project_root()
+        if project_root is None:
+            print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+            return 1
+        try:
+            if args.command == "diff":
+                output = diff(*(args.refs[:2] if args.refs else ["-2", "-1"]))
+            elif args.command == "show":
+                output = show(*args.refs[:1])
+            elif args.command == "record":
+                output = record(args.kind, project_root=project_root)
+                if output is None:
+                    print(json.dumps({"error": "History store busy, snapshot skipped"}), file=sys.stderr)
+                    return 1
+            else:
+                output = read_log()[-max(1, args.limit):]
+        except UnknownSnapshot as e:
+            print(json.dumps({"error": str(e)}), file=sys.stderr)
+            return 1
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,15 +16,14 @@ Usage:
 import argparse
 import json
 import os
-import platform
-import shutil
 import subprocess
 import sys
-import tarfile
-import tempfile
-import urllib.request
 from pathlib import Path
 
+# platform, shutil, tarfile, tempfile and urllib are imported inside the
+# functions that need them: --check and --doctor run on every session start
+# (via `ct`), and those modules are dead weight for both.
+
 
 GITHUB_API_URL = "https://api.github.com/repos/steveyegge/beads/releases/latest"
 INSTALL_DIR = Path.home() / ".local" / "bin"
@@ -44,6 +43,8 @@ IGNORED_DOCTOR_WARNINGS = {
 
 def get_platform() -> str:
     """Detect OS and architecture, return platform string like 'linux_amd64'."""
+    import platform
+
     system = platform.system().lower()
     if system not in ("linux", "darwin"):
         raise RuntimeError(f"Unsupported OS: {system}")
@@ -64,6 +65,9 @@ def fetch_latest_release(quiet: bool = False) -> dict:
     if not quiet:
         print("Fetching latest release info...")
 
+    import urllib.error
+    import urllib.request
+
     request = urllib.request.Request(
         GITHUB_API_URL,
         headers={"Accept": "application/vnd.github.v3+json", "User-Agent": "beads-installer"}
@@ -105,6 +109,8 @@ def download_file(url: str, dest: Path) -> None:
     """Download a file with progress indication."""
     print(f"Downloading {url}...")
 
+    import urllib.request
+
     request = urllib.request.Request(url, headers={"User-Agent": "beads-installer"})
 
     with urllib.request.urlopen(request, timeout=60) as response:
@@ -132,6 +138,10 @@ def extract_and_install(archive_path: Path) -> None:
     """Extract archive and install binary to INSTALL_DIR."""
     print(f"Extracting and installing to {INSTALL_DIR}...")
 
+    import shutil
+    import tarfile
+    import tempfile
+
     INSTALL_DIR.mkdir(parents=True, exist_ok=True)
 
     with tempfile.TemporaryDirectory() as tmp_extract:
@@ -265,13 +275,13 @@ def run_doctor() -> int:
         return 1
 
 
-def main() -> int:
+def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Install or update beads (bd)")
     parser.add_argument("--check", action="store_true", help="Only check if update available")
     parser.add_argument("--quiet", action="store_true", help="With --check, output JSON snippet only")
     parser.add_argument("--force", action="store_true", help="Force reinstall even if up to date")
     parser.add_argument("--doctor", action="store_true", help="Run bd doctor with filtered output")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Handle --doctor separately (standalone operation)
     if args.doctor:
@@ -344,6 +354,8 @@ def main() -> int:
             )
 
         # Download and install
+        import tempfile
+
         with tempfile.TemporaryDirectory() as tmp_dir:
             archive_path = Path(tmp_dir) / archive_name
             download_file(download_url, archive_path)
@@ -0,0 +1,99 @@
+"""
+Local read access to the beads issue store.
+
+bd keeps a JSONL export of every issue (one JSON object per line, including
+dependencies, labels and comments) next to its SQLite database. With the
+sync-branch workflow the committed copy lives in the beads-sync worktree, so
+both locations are checked and the fresher one wins. Reading the file is far
+cheaper than a `bd list` round-trip when a script needs the whole graph.
+
+If no export exists, `bd export` is used instead (through cmdcache).
+"""
+
+import json
+from pathlib import Path
+
+import cmdcache
+from ct_state import find_common_dir, find_project_root
+
+SYNC_BRANCH = "beads-sync"
+
+
+def store_paths(project_root: Path, name: str = "issues.jsonl") -> list[Path]:
+    """Candidate locations of issues.jsonl (or another .beads file), in no particular order."""
+    paths = [project_root / ".beads" / name]
+    common_dir = find_common_dir(project_root)
+    if common_dir is not None:
+        paths.append(common_dir / "beads-worktrees" / SYNC_BRANCH / ".beads" / name)
+    return paths
+
+
+def find_store(project_root: Path | None = None, name: str = "issues.jsonl") -> Path | None:
+    """Most recently written issues.jsonl (or `name`), or None if there is none."""
+    project_root = project_root or find_project_root()
+    if project_root is None:
+        return None
+    existing = []
+    for path in store_paths(project_root, name):
+        try:
+            existing.append((path.stat().st_mtime_ns, path))
+        except OSError:
+            pass
+    return max(existing)[1] if existing else None
+
+
+def parse_lines(lines) -> list[dict]:
+    """Parse JSONL issue records, skipping blank or malformed lines."""
+    issues = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            issues.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return issues
+
+
+def load_issues(project_root: Path | None = None, export_fallback: bool = True) -> list[dict]:
+    """
+    Load every issue (all statuses) from the local store.
+
+    Args:
+        project_root: Repository root (discovered from cwd if None)
+        export_fallback: Run `bd export` when no issues.jsonl exists
+
+    Returns:
+        List of issue dicts, empty if neither the export nor bd is available
+    """
+    store = find_store(project_root)
+    if store is not None:
+        with open(store) as f:
+            return parse_lines(f)
+    if not export_fallback:
+        return []
+
+    try:
+        result = cmdcache.run(["bd", "export"], cwd=project_root)
+    except FileNotFoundError:
+        return []
+    if result.returncode != 0:
+        return []
+    return parse_lines(result.stdout.splitlines())
+
+
+def blocking_ids(issue: dict) -> list[str]:
+    """IDs this issue is blocked by (`blocks` dependencies)."""
+    return [
+        dep["depends_on_id"] for dep in issue.get("dependencies") or []
+        if dep.get("type", "blocks") == "blocks" and dep.get("depends_on_id")
+    ]
+
+
+def parent_ids(issue: dict) -> list[str]:
+    """IDs of this issue's parents (`parent-child` dependencies)."""
+    return [
+        dep["depends_on_id"] for dep in issue.get("dependencies") or []
+        if dep.get("type") == "parent-child" and dep.get("depends_on_id")
+    ]
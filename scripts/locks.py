@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Repository-wide lock manager for concurrent agents.
+
+Several agents run begin-work/end-work at once against one repository. Locks
+are scoped per resource so only operations that touch the same thing wait
+for each other:
+
+    main-checkout     The main repo's working tree and index (checkout, rebase)
+    master            The master ref (pull, merge; shared while rebasing onto it)
+    beads-db          Beads database writes (bd update/close)
+    beads-sync        bd sync runs
+    outbox            The push outbox flusher (one per repository)
+    metrics           Folding metric samples into the histogram store
+    history           Appending a session snapshot (history.py)
+    worktree-<id>     One task worktree
+
+Each resource has a FIFO ticket queue in .git/ct/locks/<resource>.queue,
+edited under a short flock on <resource>.guard. A ticket is granted when:
+    - exclusive: it is first in the queue
+    - shared: every ticket ahead of it is shared too
+so a waiting writer blocks readers that arrive after it (no starvation) and
+readers that queue together run together.
+
+Tickets of processes that died (same host) or that have been held longer
+than STALE_AFTER seconds are purged by the next process to touch the queue.
+
+Every resource has a global rank (RANKS, outermost first), and locks are
+only ever taken in rank order: within one hold() call they are sorted by
+it, and a nested hold() may only ask for resources ranked above every lock
+the thread already holds. Any two code paths therefore take overlapping
+locks in the same order, so agents can't deadlock each other. Taking a lock
+out of order, or one the thread already holds (locks are not re-entrant),
+raises LockOrderError instead of waiting.
+
+Usage:
+    python3 scripts/locks.py status           # Show every queue
+    ct locks --pretty
+
+Example:
+    with locks.hold((locks.MAIN_CHECKOUT, locks.EXCLUSIVE), (locks.MASTER, locks.EXCLUSIVE)):
+        ...
+"""
+
+import argparse
+import fcntl
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from ct_state import read_json, state_dir, write_json
+
+SHARED = "shared"
+EXCLUSIVE = "exclusive"
+
+MAIN_CHECKOUT = "main-checkout"
+MASTER = "master"
+BEADS_DB = "beads-db"
+BEADS_SYNC = "beads-sync"
+OUTBOX = "outbox"
+METRICS = "metrics"
+HISTORY = "history"
+
+# Acquisition order, outermost first. worktree-<id> locks share a rank and
+# are ordered by name among themselves.
+RANKS = {
+    OUTBOX: 0,
+    MAIN_CHECKOUT: 1,
+    MASTER: 2,
+    "worktree-": 3,
+    BEADS_SYNC: 4,
+    BEADS_DB: 5,
+    HISTORY: 6,
+    METRICS: 7,
+}
+
+# Seconds to wait for a lock before giving up (CT_LOCK_TIMEOUT overrides)
+DEFAULT_TIMEOUT = float(os.environ.get("CT_LOCK_TIMEOUT", "300"))
+
+# A ticket older than this is treated as abandoned, even if its pid is alive
+STALE_AFTER = 3600.0
+
+POLL_MIN = 0.01
+POLL_MAX = 0.2
+
+HOSTNAME = os.uname().nodename
+_ticket_counter = itertools.count()
+_held = threading.local()
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be acquired within its timeout."""
+
+
+class LockOrderError(RuntimeError):
+    """Raised when a lock is requested out of rank order or while already held."""
+
+
+def worktree(short_id: str) -> str:
+    """Resource name for a task worktree."""
+    return f"worktree-{short_id}"
+
+
+def rank(resource: str) -> tuple[int, str]:
+    """Sort key giving a resource's place in the acquisition order."""
+    if resource.startswith("worktree-"):
+        return (RANKS["worktree-"], resource)
+    return (RANKS[resource], resource)
+
+
+def _lock_dir() -> Path:
+    return state_dir("locks")
+
+
+@contextmanager
+def _guard(resource: str):
+    """Short exclusive flock protecting a resource's queue file."""
+    with open(_lock_dir() / f"{resource}.guard", "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield _lock_dir() / f"{resource}.queue"
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _is_stale(ticket: dict, now: float) -> bool:
+    if now - ticket["since"] > STALE_AFTER:
+        return True
+    if ticket["host"] != HOSTNAME:
+        return False  # Can't check liveness of a remote pid
+    try:
+        os.kill(ticket["pid"], 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # Alive, owned by another user
+    return False
+
+
+def _purge(queue: list[dict]) -> list[dict]:
+    now = time.time()
+    return [t for t in queue if not _is_stale(t, now)]
+
+
+def _grantable(queue: list[dict], ticket_id: str) -> bool:
+    for position, ticket in enumerate(queue):
+        if ticket["id"] == ticket_id:
+            if ticket["mode"] == EXCLUSIVE:
+                return position == 0
+            return all(t["mode"] == SHARED for t in queue[:position])
+    return False
+
+
+def acquire(resource: str, mode: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+    """
+    Queue for a lock and wait until it is granted.
+
+    Args:
+        resource: Resource name (see module docstring)
+        mode: SHARED or EXCLUSIVE
+        timeout: Seconds to wait before raising LockTimeout
+
+    Returns:
+        Ticket ID, to pass to release()
+    """
+    ticket = {
+        "id": f"{HOSTNAME}:{os.getpid()}:{next(_ticket_counter)}",
+        "pid": os.getpid(),
+        "host": HOSTNAME,
+        "mode": mode,
+        "since": time.time(),
+    }
+    with _guard(resource) as queue_path:
+        queue = _purge(read_json(queue_path, default=[]))
+        queue.append(ticket)
+        write_json(queue_path, queue)
+
+    deadline = time.monotonic() + timeout
+    poll = POLL_MIN
+    while True:
+        with _guard(resource) as queue_path:
+            queue = read_json(queue_path, default=[])
+            purged = _purge(queue)
+            if len(purged) != len(queue):
+                write_json(queue_path, purged)
+            if _grantable(purged, ticket["id"]):
+                return ticket["id"]
+
+        if time.monotonic() >= deadline:
+            release(resource, ticket["id"])
+            raise LockTimeout(f"Timed out after {timeout:.0f}s waiting for {mode} lock on {resource}")
+        time.sleep(poll)
+        poll = min(poll * 2, POLL_MAX)
+
+
+def release(resource: str, ticket_id: str) -> None:
+    """Remove a ticket from its queue (granted or still waiting)."""
+    with _guard(resource) as queue_path:
+        queue = read_json(queue_path, default=[])
+        write_json(queue_path, [t for t in queue if t["id"] != ticket_id])
+
+
+@contextmanager
+def hold(*requests: tuple[str, str], timeout: float = DEFAULT_TIMEOUT):
+    """
+    Hold several locks for the duration of a with-block.
+
+    Locks are taken in rank order (see RANKS); inside another hold() of the
+    same thread, every requested resource must rank above the locks already
+    held.
+
+    Args:
+        requests: (resource, mode) pairs
+        timeout: Per-lock wait limit
+
+    Raises:
+        LockTimeout: A lock was not granted within timeout
+        LockOrderError: A resource is already held by this thread, or ranks
+            below one that is
+    """
+    stack: list[str] = _held.__dict__.setdefault("resources", [])
+    ordered = sorted(requests, key=lambda request: rank(request[0]))
+    for resource, _ in ordered:
+        if resource in stack:
+            raise LockOrderError(f"{resource} is already held by this thread (locks are not re-entrant)")
+    if stack and ordered and rank(ordered[0][0]) < rank(stack[-1]):
+        raise LockOrderError(f"{ordered[0][0]} requested while holding {stack[-1]}, which ranks above it")
+
+    held = []
+    try:
+        for resource, mode in ordered:
+            held.append((resource, acquire(resource, mode, timeout)))
+            stack.append(resource)
+        yield
+    finally:
+        for resource, ticket_id in reversed(held):
+            release(resource, ticket_id)
+            stack.remove(resource)
+
+
+def status() -> dict[str, list[dict]]:
+    """Current (purged) queue of every resource that has one."""
+    queues = {}
+    for queue_path in sorted(_lock_dir().glob("*.queue")):
+        resource = queue_path.stem
+        with _guard(resource):
+            queue = _purge(read_json(queue_path, default=[]))
+        if queue:
+            now = time.time()
+            queues[resource] = [
+                {
+                    "mode": t["mode"],
+                    "pid": t["pid"],
+                    "host": t["host"],
+                    "age_s": round(now - t["since"], 1),
+                    "granted": _grantable(queue, t["id"]),
+                }
+                for t in queue
+            ]
+    return queues
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect Control Tower lock queues")
+    parser.add_argument("command", nargs="?", default="status", choices=["status"])
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    print(json.dumps({"locks": status()}, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
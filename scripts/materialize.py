@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Fast worktree and snapshot materialization.
+
+Creating a worktree used to mean a full, single-threaded `git worktree add`
+checkout, and review/research had no cheap way to get a copy of the code.
+Three ways to keep that time flat as the repo grows:
+
+    parallel   Every checkout runs with `checkout.workers=0` (one worker per
+               core), via PARALLEL_CHECKOUT.
+    sparse     Opt-in per task: a `sparse:<profile>` label picks a
+               cone-mode sparse-checkout profile (SPARSE_PROFILES); the
+               worktree is added with --no-checkout, the profile set, then
+               checked out. Top-level files are always included. Tasks
+               without the label get a full checkout, since most chores
+               still need src/ to build and review.
+    snapshot   A read-only export of one commit (files 0444) into tmpfs
+               (/dev/shm, or CT_SNAPSHOT_DIR), written from a private index
+               with parallel checkout-index. No worktree metadata, no branch,
+               nothing to clean up in git. A snapshot of the same commit is
+               reused; older snapshots under the same name are removed.
+
+Usage:
+    python3 scripts/materialize.py snapshot <rev> [--name NAME]
+    python3 scripts/materialize.py bench [--files 5000]
+    python3 scripts/begin-work.py --review <task-id> --snapshot
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ct_state import find_project_root, state_dir
+
+# git config for one checkout worker per core
+PARALLEL_CHECKOUT = ["-c", "checkout.workers=0"]
+
+# Cone-mode directories per profile, chosen with a `sparse:<profile>` label
+SPARSE_LABEL = "sparse:"
+SPARSE_PROFILES: dict[str, list[str]] = {
+    "tooling": [".claude", "plans", "scripts"],
+}
+
+SNAPSHOT_ROOTS = ("/dev/shm",)
+
+
+def sparse_profile(labels: list[str]) -> list[str] | None:
+    """Sparse-checkout directories a task's labels opt into (None: full checkout)."""
+    for label in labels:
+        if label.startswith(SPARSE_LABEL):
+            profile = SPARSE_PROFILES.get(label[len(SPARSE_LABEL):])
+            if profile is not None:
+                return profile
+    return None
+
+
+def git(args: list[str], cwd: Path, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, **kwargs)
+
+
+def export_tree(project_root: Path, rev: str, dest: Path, read_only: bool = False) -> None:
+    """
+    Write the files of rev to dest (which must not exist).
+
+    Goes through a private index, so no checkout, index or ref of the repo
+    is touched, and checks files out in parallel.
+
+    Raises:
+        RuntimeError: git failed (unknown rev, disk full, ...)
+    """
+    index = dest.with_name(f".{dest.name}.index")
+    env = {**os.environ, "GIT_INDEX_FILE": str(index)}
+    steps = [
+        ("read-tree", ["read-tree", rev], -1),
+        ("checkout-index", [*PARALLEL_CHECKOUT, "checkout-index", "--all", "--force", f"--prefix={dest}/"],
+         0o222 if read_only else -1),
+    ]
+    try:
+        for name, args, umask in steps:
+            result = git(args, project_root, env=env, umask=umask)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or f"git {name} failed")
+    finally:
+        index.unlink(missing_ok=True)
+    if read_only:
+        # Directories stay writable, so removal needs no chmod pass
+        for root, _, _ in os.walk(dest):
+            os.chmod(root, 0o755)
+
+
+def snapshot_root(project_root: Path) -> Path:
+    """
+    Where snapshots live: CT_SNAPSHOT_DIR, else tmpfs, else .git/ct/snapshots.
+
+    Per repository, so two clones never share snapshots.
+    """
+    override = os.environ.get("CT_SNAPSHOT_DIR")
+    if override:
+        root = Path(override)
+    else:
+        tmpfs = next((Path(p) for p in SNAPSHOT_ROOTS if os.access(p, os.W_OK)), None)
+        if tmpfs is None:
+            return state_dir("snapshots")
+        repo = hashlib.blake2b(str(project_root).encode(), digest_size=6).hexdigest()
+        root = tmpfs / f"ct-snapshots-{os.getuid()}" / repo
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def snapshot(project_root: Path, rev: str, name: str) -> tuple[Path, str]:
+    """
+    Read-only copy of rev, reused while rev points at the same commit.
+
+    Args:
+        project_root: Main checkout
+        rev: Branch, tag or SHA
+        name: Snapshot family (e.g. task short ID); older snapshots of the
+            same family are removed
+
+    Returns:
+        Tuple of (snapshot path, commit SHA)
+
+    Raises:
+        RuntimeError: rev doesn't resolve, or the export failed
+    """
+    resolved = git(["rev-parse", "--verify", f"{rev}^{{commit}}"], project_root)
+    if resolved.returncode != 0:
+        raise RuntimeError(f"Unknown revision: {rev}")
+    sha = resolved.stdout.strip()
+
+    root = snapshot_root(project_root)
+    dest = root / f"{name}-{sha[:12]}"
+    if dest.is_dir():
+        return dest, sha
+
+    partial = root / f".{dest.name}.{os.getpid()}"
+    shutil.rmtree(partial, ignore_errors=True)
+    try:
+        export_tree(project_root, sha, partial, read_only=True)
+        os.rename(partial, dest)
+    except OSError:
+        shutil.rmtree(partial, ignore_errors=True)
+        if not dest.is_dir():  # Lost a race with an identical snapshot otherwise
+            raise
+    except RuntimeError:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+    for old in root.glob(f"{name}-*"):
+        suffix = old.name[len(name) + 1:]
+        if old != dest and len(suffix) == 12 and all(c in "0123456789abcdef" for c in suffix):
+            shutil.rmtree(old, ignore_errors=True)
+    return dest, sha
+
+
+def bench(file_count: int) -> dict:
+    """Time full, parallel, sparse and snapshot materialization on a scratch repo."""
+    import tempfile
+
+    def sh(args: list[str], cwd: Path) -> None:
+        subprocess.run(args, cwd=cwd, check=True, capture_output=True)
+
+    def timed(action) -> float:
+        start = time.perf_counter()
+        action()
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "repo"
+        for n in range(file_count):
+            area = "src" if n % 4 else "plans"
+            path = repo / area / f"m{n % 50}" / f"f{n}.rs"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"// file {n}\n" + "fn x() {}\n" * 40)
+        sh(["git", "init", "-q", "-b", "master"], repo)
+        sh(["git", "add", "."], repo)
+        sh(["git", "-c", "user.email=b@b", "-c", "user.name=b", "commit", "-qm", "base"], repo)
+
+        wt = repo / "worktrees"
+        timings = {
+            "full": timed(lambda: sh(["git", "-c", "checkout.workers=1", "worktree", "add", "-q", "-b", "t/a", str(wt / "a")], repo)),
+            "parallel": timed(lambda: sh(["git", *PARALLEL_CHECKOUT, "worktree", "add", "-q", "-b", "t/b", str(wt / "b")], repo)),
+        }
+
+        def sparse() -> None:
+            sh(["git", "worktree", "add", "-q", "--no-checkout", "-b", "t/c", str(wt / "c")], repo)
+            sh(["git", "sparse-checkout", "set", "--cone", "plans"], wt / "c")
+            sh(["git", *PARALLEL_CHECKOUT, "checkout", "-q"], wt / "c")
+
+        timings["sparse"] = timed(sparse)
+
+        previous = os.environ.get("CT_SNAPSHOT_DIR")
+        os.environ["CT_SNAPSHOT_DIR"] = str(Path(tmp) / "snapshots")
+        try:
+            timings["snapshot"] = timed(lambda: snapshot(repo, "master", "bench"))
+            timings["snapshot_reused"] = timed(lambda: snapshot(repo, "master", "bench"))
+        finally:
+            if previous is None:
+                del os.environ["CT_SNAPSHOT_DIR"]
+            else:
+                os.environ["CT_SNAPSHOT_DIR"] = previous
+
+    return {"files": file_count, "cores": os.cpu_count(), "ms": timings}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parallel, sparse and snapshot checkouts")
+    parser.add_argument("command", choices=["snapshot", "bench"])
+    parser.add_argument("rev", nargs="?", default="master", help="snapshot: revision to export")
+    parser.add_argument("--name", default=None, help="snapshot: family name (default: the revision)")
+    parser.add_argument("--files", type=int, default=5000, help="bench: files in the scratch repo")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        output = bench(args.files)
+    else:
+        project_root = find_project_root()
+        if project_root is None:
+            print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+            return 1
+        name = args.name or args.rev.replace("/", "-")
+        try:
+            path, sha = snapshot(project_root, args.rev, name)
+        except (RuntimeError, OSError) as e:
+            print(json.dumps({"error": "Snapshot failed", "details": str(e)}), file=sys.stderr)
+            return 1
+        output = {"snapshot_path": str(path), "rev": sha}
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
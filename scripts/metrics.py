@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Lifecycle latency histograms and queue gauges, exported as OpenMetrics.
+
+Lifecycle phases are timed with timing.py's `timed` decorator (pull_master,
+rebase_onto_master, create_worktree, check_beads_update, ...). Each process
+keeps its samples in memory and, at exit, writes them as one file to
+.git/ct/metrics/samples/ (one file per process, so concurrent agents never
+race on a shared file and a script pays a single small write). The scripts
+only import timing.py; this module is loaded when samples are folded.
+
+`metrics.py export` folds the sample files into persistent HDR-style
+histograms in .git/ct/metrics/store.json and writes an OpenMetrics text
+file for node-exporter's textfile collector. A histogram keeps log-linear
+buckets: exact below 64 µs, then 32 sub-buckets per power of two, so any
+recorded latency is known to within ~3% and p50/p95 stay accurate across
+months of samples in a few hundred integers per phase.
+
+Queue gauges:
+    ready, in_progress, review, draft, open gates   recorded by session-start
+    worktrees, worktree bytes, outbox, lock queues  measured at export
+
+Usage:
+    python3 scripts/metrics.py export [--textfile PATH] [--no-disk]
+    python3 scripts/metrics.py show [--pretty]     # Quantiles per phase (JSON)
+    ct metrics --textfile /var/lib/node_exporter/textfile/ct.prom
+
+The textfile defaults to CT_METRICS_TEXTFILE, else .git/ct/metrics/ct.prom.
+Run export from cron (every minute is fine; it only touches local state).
+
+Output JSON (show):
+    {
+        "phases": {
+            "pull_master": {"count": 214, "p50_ms": 410.2, "p95_ms": 1650.0, "p99_ms": 2900.0,
+                            "max_ms": 4100.3, "mean_ms": 530.9}
+        },
+        "gauges": {"queue_ready": {"value": 7, "at": "2026-01-05T10:12:00Z"}}
+    }
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import timing
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+STORE_FILE = "store.json"
+TEXTFILE = "ct.prom"
+PREFIX = "ct"
+
+# Log-linear buckets (see module docstring)
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF = SUB_BUCKETS // 2
+
+# Exported histogram bucket bounds, seconds
+EXPORT_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def bucket_index(micros: int) -> int:
+    """Log-linear bucket of a value in microseconds."""
+    if micros < SUB_BUCKETS:
+        return max(0, micros)
+    shift = micros.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF + (micros >> shift) - HALF
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """Lowest and highest microsecond value in a bucket."""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = (index - SUB_BUCKETS) // HALF + 1
+    mantissa = (index - SUB_BUCKETS) % HALF + HALF
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+def empty_histogram() -> dict:
+    return {"count": 0, "sum_us": 0, "min_us": None, "max_us": None, "buckets": {}}
+
+
+def add_samples(histogram: dict, samples: list[int]) -> None:
+    """Record microsecond samples into a stored histogram (in place)."""
+    buckets = histogram["buckets"]
+    for micros in samples:
+        key = str(bucket_index(micros))
+        buckets[key] = buckets.get(key, 0) + 1
+    histogram["count"] += len(samples)
+    histogram["sum_us"] += sum(samples)
+    histogram["min_us"] = min(samples + ([histogram["min_us"]] if histogram["min_us"] is not None else []))
+    histogram["max_us"] = max(samples + ([histogram["max_us"]] if histogram["max_us"] is not None else []))
+
+
+def quantile(histogram: dict, q: float) -> float | None:
+    """Value at quantile q in microseconds (bucket midpoint), None if empty."""
+    if not histogram["count"]:
+        return None
+    rank = max(1, round(q * histogram["count"]))
+    seen = 0
+    for key in sorted(histogram["buckets"], key=int):
+        seen += histogram["buckets"][key]
+        if seen >= rank:
+            low, high = bucket_bounds(int(key))
+            return min(max((low + high) / 2, histogram["min_us"]), histogram["max_us"])
+    return histogram["max_us"]
+
+
+def cumulative(histogram: dict, bounds: tuple[float, ...]) -> list[int]:
+    """Count of samples <= each bound (seconds); a bucket counts if it ends at or below it."""
+    counts = [0] * len(bounds)
+    for key, n in histogram["buckets"].items():
+        _, high = bucket_bounds(int(key))
+        for i, bound in enumerate(bounds):
+            if high <= bound * 1_000_000:
+                counts[i] += n
+    return counts
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def load_store() -> dict:
+    store = read_json(state_dir("metrics") / STORE_FILE, default={})
+    store.setdefault("phases", {})
+    store.setdefault("gauges", {})
+    store.setdefault("folded", [])
+    return store
+
+
+def fold(wait: bool = True) -> dict:
+    """
+    Merge pending sample files into the store and delete them.
+
+    The names of the folded files are saved with the store before the files
+    are deleted, so a crash in between can't count them twice.
+
+    Args:
+        wait: Wait for a fold running in another process (else skip)
+
+    Returns:
+        The store
+    """
+    import locks
+
+    try:
+        with locks.hold((locks.METRICS, locks.EXCLUSIVE), timeout=locks.DEFAULT_TIMEOUT if wait else 0):
+            store = load_store()
+            directory = timing.samples_dir()
+            for name in store["folded"]:
+                (directory / name).unlink(missing_ok=True)
+
+            names = sorted(p.name for p in directory.glob("*-*.json"))
+            for name in names:
+                data = read_json(directory / name, default=None)
+                if not data:
+                    continue
+                for phase, samples in data.get("phases", {}).items():
+                    add_samples(store["phases"].setdefault(phase, empty_histogram()), samples)
+                for gauge_name, value in data.get("gauges", {}).items():
+                    current = store["gauges"].get(gauge_name)
+                    if current is None or current["at"] <= data["at"]:
+                        store["gauges"][gauge_name] = {"value": value, "at": data["at"]}
+
+            store["folded"] = names
+            write_json(state_dir("metrics") / STORE_FILE, store)
+            for name in names:
+                (directory / name).unlink(missing_ok=True)
+            return store
+    except locks.LockTimeout:
+        return load_store()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def live_gauges(project_root: Path, with_disk: bool) -> dict[str, list[tuple[dict, float]]]:
+    """Gauges measured now: worktrees, their disk use, outbox and lock queues."""
+    import locks
+    import outbox
+    import trash
+
+    worktrees_dir = project_root / "worktrees"
+    paths = [
+        p for p in (worktrees_dir.iterdir() if worktrees_dir.is_dir() else [])
+        if p.is_dir() and p.name != trash.TRASH_DIR
+    ]
+    gauges = {"worktrees": [({}, len(paths))], "outbox_pending": [({}, len(outbox.pending()))]}
+
+    if with_disk:
+        from concurrent.futures import ThreadPoolExecutor
+
+        import worktree_gc
+
+        with ThreadPoolExecutor(max_workers=worktree_gc.MAX_WORKERS) as pool:
+            sizes = list(pool.map(worktree_gc.disk_usage, paths))
+            trash_bytes = sum(pool.map(worktree_gc.disk_usage, trash.contents(project_root)))
+        gauges["worktree_bytes"] = [({}, sum(sizes))]
+        gauges["worktree_trash_bytes"] = [({}, trash_bytes)]
+
+    holders, waiters = [], []
+    for resource, queue in locks.status().items():
+        kind = "worktree" if resource.startswith("worktree-") else resource
+        holders.append(({"resource": kind}, sum(1 for t in queue if t["granted"])))
+        waiters.append(({"resource": kind}, sum(1 for t in queue if not t["granted"])))
+    gauges["lock_holders"] = _sum_by_labels(holders)
+    gauges["lock_waiters"] = _sum_by_labels(waiters)
+    return gauges
+
+
+def _sum_by_labels(series: list[tuple[dict, float]]) -> list[tuple[dict, float]]:
+    totals: dict[tuple, float] = {}
+    for labels, value in series:
+        key = tuple(sorted(labels.items()))
+        totals[key] = totals.get(key, 0) + value
+    return [(dict(key), value) for key, value in sorted(totals.items())]
+
+
+GAUGE_HELP = {
+    "queue_ready": "Ready tasks at the last session-start",
+    "queue_in_progress": "In-progress tasks at the last session-start",
+    "queue_review": "Tasks in review at the last session-start",
+    "queue_draft": "Draft tasks at the last session-start",
+    "open_gates": "Gates still open after the last evaluation",
+    "worktrees": "Task worktrees on disk",
+    "worktree_bytes": "Disk used by task worktrees",
+    "worktree_trash_bytes": "Disk used by worktrees waiting for background deletion",
+    "outbox_pending": "Pushes queued by end-work and not yet pushed",
+    "lock_holders": "Lock tickets granted, per resource",
+    "lock_waiters": "Lock tickets waiting, per resource",
+}
+
+
+def render(store: dict, live: dict[str, list[tuple[dict, float]]]) -> str:
+    """OpenMetrics text for the store's histograms and all gauges."""
+    lines = []
+    family = f"{PREFIX}_phase_duration_seconds"
+    phases = sorted(store["phases"].items())
+    if phases:
+        lines += [
+            f"# TYPE {family} histogram",
+            f"# UNIT {family} seconds",
+            f"# HELP {family} Duration of lifecycle script phases.",
+        ]
+        for phase, histogram in phases:
+            for bound, count in zip(EXPORT_BOUNDS, cumulative(histogram, EXPORT_BOUNDS)):
+                lines.append(f"{family}_bucket{_labels(phase=phase, le=_number(float(bound)))} {count}")
+            lines.append(f"{family}_bucket{_labels(phase=phase, le='+Inf')} {histogram['count']}")
+            lines.append(f"{family}_count{_labels(phase=phase)} {histogram['count']}")
+            lines.append(f"{family}_sum{_labels(phase=phase)} {_number(histogram['sum_us'] / 1_000_000)}")
+
+        quantiles = f"{PREFIX}_phase_duration_quantile_seconds"
+        lines += [
+            f"# TYPE {quantiles} gauge",
+            f"# UNIT {quantiles} seconds",
+            f"# HELP {quantiles} All-time phase duration quantiles from the HDR histograms.",
+        ]
+        for phase, histogram in phases:
+            for q in QUANTILES:
+                value = quantile(histogram, q)
+                if value is not None:
+                    lines.append(f"{quantiles}{_labels(phase=phase, quantile=_number(q))} {_number(value / 1_000_000)}")
+
+    gauges = {name: [({}, entry["value"])] for name, entry in store["gauges"].items()}
+    gauges.update(live)
+    for name in sorted(gauges):
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        if name.endswith("_bytes"):
+            lines.append(f"# UNIT {metric} bytes")
+        if name in GAUGE_HELP:
+            lines.append(f"# HELP {metric} {GAUGE_HELP[name]}.")
+        for labels, value in gauges[name]:
+            lines.append(f"{metric}{_labels(**labels) if labels else ''} {_number(value)}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: Path, text: str) -> None:
+    """Write atomically, so the collector never reads half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def summary(store: dict) -> dict:
+    phases = {}
+    for phase, histogram in sorted(store["phases"].items()):
+        if not histogram["count"]:
+            continue
+        phases[phase] = {
+            "count": histogram["count"],
+            **{f"p{round(q * 100)}_ms": round(quantile(histogram, q) / 1000, 1) for q in QUANTILES},
+            "max_ms": round(histogram["max_us"] / 1000, 1),
+            "mean_ms": round(histogram["sum_us"] / histogram["count"] / 1000, 1),
+        }
+    gauges = {name: {"value": e["value"], "at": _iso(e["at"])} for name, e in sorted(store["gauges"].items())}
+    return {"phases": phases, "gauges": gauges}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Lifecycle latency histograms and queue gauges")
+    parser.add_argument("command", nargs="?", default="export", choices=["export", "show"])
+    parser.add_argument("--textfile", default=None, help="export: output path (default CT_METRICS_TEXTFILE or .git/ct/metrics/ct.prom)")
+    parser.add_argument("--no-disk", action="store_true", help="export: skip measuring worktree disk use")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    project_root = find_project_root()
+    if project_root is None:
+        print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+        return 1
+
+    store = fold()
+    if args.command == "show":
+        print(json.dumps(summary(store), indent=2 if args.pretty else None))
+        return 0
+
+    textfile = Path(args.textfile or os.environ.get("CT_METRICS_TEXTFILE") or state_dir("metrics") / TEXTFILE)
+    text = render(store, live_gauges(project_root, not args.no_disk))
+    try:
+        write_textfile(textfile, text)
+    except OSError as e:
+        print(json.dumps({"error": f"Could not write {textfile}", "details": str(e)}), file=sys.stderr)
+        return 1
+    samples = sum(1 for line in text.splitlines() if not line.startswith("#"))
+    output = {"textfile": str(textfile), "phases": len(store["phases"]), "samples": samples}
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Network layer for the lifecycle scripts: one fetch, one atomic push.
+
+Every round-trip to the remote costs latency, and end-work/session-end used
+to make several per run (`git pull --rebase`, `git push`, plus bd sync
+pushing beads-sync on its own). This module keeps it to at most two:
+
+    - fetch(): one `git fetch` per session. A fetch younger than FETCH_TTL
+      seconds (CT_FETCH_TTL) is reused, even if another script made it.
+    - integrate(): replaces `git pull --rebase` with a local rebase onto the
+      fetched remote-tracking ref, skipped when there is nothing new.
+    - push(): pushes master and beads-sync together with
+      `git push --atomic`, only the refs strictly ahead of their
+      remote-tracking counterparts, and nothing at all if none are.
+      beads-sync behind (or diverged from) the remote is brought up to it
+      first, so another agent's bd sync never blocks the master push.
+
+bd sync is then run with --no-push, so its commits to beads-sync go out with
+the same push as master.
+
+Usage:
+    python3 scripts/netsync.py bench          # Compare against pull/push against a local bare remote
+    python3 scripts/netsync.py bench --pretty
+    python3 scripts/netsync.py check          # Reproduce behind/diverged pushes; exit 1 on failure
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import cmdcache
+from ct_state import read_json, state_dir, write_json
+
+REMOTE = "origin"
+BRANCHES = ("master", "beads-sync")
+FETCH_STAMP_FILE = "fetch.json"
+FETCH_TTL = float(os.environ.get("CT_FETCH_TTL", "120"))
+
+
+def git(args: list[str], cwd: Path):
+    """Run a git command in cwd (through cmdcache, so mutations invalidate it)."""
+    return cmdcache.run(["git", *args], cwd=cwd)
+
+
+def fetch(project_root: Path, ttl: float = FETCH_TTL) -> dict:
+    """
+    Fetch from the remote unless a recent enough fetch can be reused.
+
+    Returns dict with:
+        - fetched: whether a network fetch happened
+        - ok: False if the fetch failed
+        - age: seconds since the reused fetch (when not fetched)
+        - details: stderr of a failed fetch
+    """
+    stamp_path = state_dir() / FETCH_STAMP_FILE
+    stamp = read_json(stamp_path, default={})
+    age = time.time() - stamp.get(REMOTE, 0)
+    if age < ttl:
+        return {"fetched": False, "ok": True, "age": round(age, 1)}
+
+    result = git(["fetch", REMOTE], project_root)
+    if result.returncode != 0:
+        return {"fetched": True, "ok": False, "details": result.stderr}
+
+    stamp[REMOTE] = time.time()
+    write_json(stamp_path, stamp)
+    return {"fetched": True, "ok": True}
+
+
+def ref_shas(project_root: Path) -> dict[str, str]:
+    """
+    Local and remote-tracking SHAs for BRANCHES in a single git call.
+
+    Returns:
+        Dict like {"refs/heads/master": "abc...", "refs/remotes/origin/master": "abc...", ...}
+        (refs that don't exist are absent)
+    """
+    refs = []
+    for branch in BRANCHES:
+        refs.extend([f"refs/heads/{branch}", f"refs/remotes/{REMOTE}/{branch}"])
+    result = git(["for-each-ref", "--format=%(refname) %(objectname)", *refs], project_root)
+    shas = {}
+    for line in result.stdout.splitlines():
+        name, _, sha = line.partition(" ")
+        shas[name] = sha
+    return shas
+
+
+def integrate(project_root: Path, branch: str = "master") -> tuple[bool, list[str]]:
+    """
+    Rebase branch, which must be checked out, onto its fetched remote-tracking ref.
+
+    Equivalent to the rebase half of `git pull --rebase`, without the fetch.
+    Does nothing when the remote has no commits we lack.
+
+    Returns:
+        Tuple of (success, conflicting_files). On conflict the rebase is left
+        in progress, exactly like a failed `git pull --rebase`.
+
+    Raises:
+        RuntimeError: HEAD is not on branch (nothing is rebased), or the
+            rebase failed for another reason than a conflict
+    """
+    upstream = f"{REMOTE}/{branch}"
+    shas = ref_shas(project_root)
+    remote_sha = shas.get(f"refs/remotes/{upstream}")
+    if remote_sha is None or remote_sha == shas.get(f"refs/heads/{branch}"):
+        return (True, [])
+
+    # Remote already contained in local: nothing to replay
+    ancestor = git(["merge-base", "--is-ancestor", upstream, branch], project_root)
+    if ancestor.returncode == 0:
+        return (True, [])
+
+    # `git pull --rebase` only ever rebased the current branch onto its own
+    # upstream; never replay onto origin/<branch> whatever else is checked out
+    head = git(["symbolic-ref", "-q", "HEAD"], project_root).stdout.strip()
+    if head != f"refs/heads/{branch}":
+        raise RuntimeError(f"{project_root} is on {head or 'a detached HEAD'}, not {branch}; check out {branch} first")
+
+    result = git(["rebase", upstream], project_root)
+    if result.returncode == 0:
+        return (True, [])
+
+    conflicts = git(["diff", "--name-only", "--diff-filter=U"], project_root)
+    conflicting_files = conflicts.stdout.strip().split("\n") if conflicts.stdout.strip() else []
+    if not conflicting_files:
+        # Not a conflict; surface the rebase error to the caller
+        raise RuntimeError(result.stderr.strip() or f"git rebase {upstream} failed")
+    return (False, conflicting_files)
+
+
+def _is_ancestor(project_root: Path, older: str, newer: str) -> bool:
+    return git(["merge-base", "--is-ancestor", older, newer], project_root).returncode == 0
+
+
+def _catch_up_sync_branch(project_root: Path, branch: str, behind: bool) -> str | None:
+    """
+    Bring beads-sync up to its remote-tracking ref before a push.
+
+    Fast-forwards when it is only behind. When it diverged, rebases it in its
+    worktree (bd's sync worktree, or wherever it is checked out; a failed
+    rebase is aborted), or, when it isn't checked out, merges the remote
+    into it in memory (`git merge-tree`, no checkout touched).
+
+    Returns:
+        None when the branch now contains the remote, otherwise why not
+    """
+    import fleet
+
+    upstream = f"{REMOTE}/{branch}"
+    checkout = fleet.worktree_branches(project_root).get(branch)
+    if checkout is None and behind:
+        result = git(["update-ref", f"refs/heads/{branch}", upstream], project_root)
+    elif checkout is None:
+        merged = git(["merge-tree", "--write-tree", branch, upstream], project_root)
+        if merged.returncode != 0:
+            return f"{branch} conflicts with {upstream}"
+        tree = merged.stdout.split("\n", 1)[0].strip()
+        result = git(["commit-tree", tree, "-p", branch, "-p", upstream, "-m", f"Merge {upstream}"], project_root)
+        if result.returncode == 0:
+            result = git(["update-ref", f"refs/heads/{branch}", result.stdout.strip()], project_root)
+    elif behind:
+        result = git(["merge", "--ff-only", "-q", upstream], checkout)
+    else:
+        result = git(["rebase", upstream], checkout)
+        if result.returncode != 0:
+            git(["rebase", "--abort"], checkout)
+    if result.returncode != 0:
+        return result.stderr.strip() or f"could not bring {branch} up to {upstream}"
+    return None
+
+
+def push(project_root: Path) -> dict:
+    """
+    Push every branch in BRANCHES that is ahead of its remote-tracking ref,
+    in one atomic push.
+
+    A branch is only pushed when its remote-tracking ref is a strict
+    ancestor of it (or doesn't exist): one that is behind would be rejected
+    and, the push being atomic, take the others down with it. beads-sync is
+    written by every agent's bd sync, so when it is behind it is
+    fast-forwarded, and when it diverged it is rebased first; if that fails
+    it is left out (reported in `skipped`) and master still goes out.
+    master behind its remote has nothing to push; master diverged from it
+    is reported as a non-fast-forward rejection without pushing, so callers
+    integrate it (see integrate()) and retry.
+
+    Returns dict with:
+        - pushed: list of branches pushed (empty if all were up to date)
+        - skipped: {branch: reason} for beads-sync left out of the push
+        - ok: False if the push was rejected or failed
+        - details: stderr of a failed push
+    """
+    shas = ref_shas(project_root)
+    pending = []
+    skipped = {}
+    for branch in BRANCHES:
+        local = shas.get(f"refs/heads/{branch}")
+        remote = shas.get(f"refs/remotes/{REMOTE}/{branch}")
+        if local is None or local == remote:
+            continue
+        if remote is None or _is_ancestor(project_root, remote, local):
+            pending.append(branch)
+            continue
+        behind = _is_ancestor(project_root, local, remote)
+        if branch == "master":
+            if behind:
+                continue
+            return {"pushed": [], "skipped": skipped, "ok": False,
+                    "details": f"! [rejected] master -> master (non-fast-forward): diverged from {REMOTE}/master"}
+        reason = _catch_up_sync_branch(project_root, branch, behind)
+        if reason is not None:
+            skipped[branch] = reason
+        elif not behind:
+            pending.append(branch)
+
+    if not pending:
+        return {"pushed": [], "skipped": skipped, "ok": True}
+
+    result = git(["push", "--atomic", REMOTE, *pending], project_root)
+    if result.returncode != 0:
+        return {"pushed": [], "skipped": skipped, "ok": False, "details": result.stderr}
+    return {"pushed": pending, "skipped": skipped, "ok": True}
+
+
+def _sh(args: list[str], cwd: Path) -> None:
+    import subprocess
+
+    subprocess.run(args, cwd=cwd, check=True, capture_output=True)
+
+
+def _commit(repo: Path, branch: str | None, name: str) -> None:
+    if branch:
+        _sh(["git", "checkout", "-q", branch], repo)
+    (repo / name).write_text(name)
+    _sh(["git", "add", name], repo)
+    _sh(["git", "commit", "-qm", name], repo)
+
+
+def _clone(remote: Path, path: Path) -> Path:
+    """Clone with identity set and a local beads-sync tracking the remote's."""
+    _sh(["git", "clone", "-q", str(remote), str(path)], path.parent)
+    _sh(["git", "config", "user.email", "bench@example.com"], path)
+    _sh(["git", "config", "user.name", "bench"], path)
+    _sh(["git", "branch", "beads-sync", "origin/beads-sync"], path)
+    return path
+
+
+def _scratch_remote(tmp_path: Path) -> tuple[Path, Path]:
+    """A bare remote with master and beads-sync, and a seed clone that pushes to it."""
+    remote = tmp_path / "remote.git"
+    seed = tmp_path / "seed"
+    _sh(["git", "init", "-q", "--bare", "-b", "master", str(remote)], tmp_path)
+    _sh(["git", "clone", "-q", str(remote), str(seed)], tmp_path)
+    _sh(["git", "config", "user.email", "bench@example.com"], seed)
+    _sh(["git", "config", "user.name", "bench"], seed)
+    _commit(seed, None, "base")  # Empty clone: first commit creates master
+    _sh(["git", "branch", "beads-sync"], seed)
+    _sh(["git", "push", "-q", "origin", "master", "beads-sync"], seed)
+    return remote, seed
+
+
+def _upstream_commit(seed: Path, branch: str, name: str) -> None:
+    """Another agent pushes a commit to branch."""
+    _sh(["git", "checkout", "-q", branch], seed)
+    _sh(["git", "pull", "-q", "--rebase", "origin", branch], seed)
+    _commit(seed, None, name)
+    _sh(["git", "push", "-q", "origin", branch], seed)
+
+
+def check() -> dict:
+    """
+    Reproduce the push cases against a local bare remote.
+
+    Each case fetches, then pushes with push(); a case fails when the
+    outcome or the remote's refs are not what the case expects.
+    """
+    import subprocess
+    import tempfile
+
+    def remote_sha(remote: Path, branch: str) -> str:
+        return subprocess.run(["git", "rev-parse", branch], cwd=remote, capture_output=True, text=True).stdout.strip()
+
+    def local_sha(clone: Path, branch: str) -> str:
+        return subprocess.run(["git", "rev-parse", branch], cwd=clone, capture_output=True, text=True).stdout.strip()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        remote, seed = _scratch_remote(tmp_path)
+
+        # beads-sync behind (another agent's bd sync), master ahead
+        clone = _clone(remote, tmp_path / "behind")
+        _upstream_commit(seed, "beads-sync", "other-beads")
+        _commit(clone, "master", "behind-work")
+        _sh(["git", "fetch", "-q", "origin"], clone)
+        result = push(clone)
+        cases.append({
+            "case": "beads_sync_behind",
+            "result": result,
+            "passed": result["ok"] and result["pushed"] == ["master"]
+            and remote_sha(remote, "master") == local_sha(clone, "master")
+            and local_sha(clone, "beads-sync") == remote_sha(remote, "beads-sync"),
+        })
+
+        # beads-sync diverged (both sides synced), master ahead: rebased, both pushed
+        clone = _clone(remote, tmp_path / "diverged")
+        _upstream_commit(seed, "beads-sync", "other-beads-2")
+        _commit(clone, "beads-sync", "diverged-beads")
+        _commit(clone, "master", "diverged-work")
+        _sh(["git", "fetch", "-q", "origin"], clone)
+        result = push(clone)
+        cases.append({
+            "case": "beads_sync_diverged",
+            "result": result,
+            "passed": result["ok"] and result["pushed"] == ["master", "beads-sync"]
+            and remote_sha(remote, "beads-sync") == local_sha(clone, "beads-sync"),
+        })
+
+        # Same, with beads-sync checked out in its own worktree as bd keeps it
+        clone = _clone(remote, tmp_path / "worktree")
+        _upstream_commit(seed, "beads-sync", "other-beads-3")
+        _commit(clone, "beads-sync", "worktree-beads")
+        _commit(clone, "master", "worktree-work")
+        _sh(["git", "worktree", "add", "-q", str(tmp_path / "sync-worktree"), "beads-sync"], clone)
+        _sh(["git", "fetch", "-q", "origin"], clone)
+        result = push(clone)
+        cases.append({
+            "case": "beads_sync_diverged_worktree",
+            "result": result,
+            "passed": result["ok"] and result["pushed"] == ["master", "beads-sync"]
+            and remote_sha(remote, "beads-sync") == local_sha(tmp_path / "sync-worktree", "HEAD"),
+        })
+
+        # master diverged: rejected without pushing, so the caller integrates
+        clone = _clone(remote, tmp_path / "master")
+        _upstream_commit(seed, "master", "other-work")
+        _commit(clone, "master", "master-work")
+        _sh(["git", "fetch", "-q", "origin"], clone)
+        before = remote_sha(remote, "master")
+        result = push(clone)
+        cases.append({
+            "case": "master_diverged",
+            "result": result,
+            "passed": not result["ok"] and "non-fast-forward" in result["details"]
+            and remote_sha(remote, "master") == before,
+        })
+
+    return {"passed": all(case["passed"] for case in cases), "cases": cases}
+
+
+def bench() -> dict:
+    """
+    Compare the legacy pull/push sequence with netsync against a local bare remote.
+
+    Both runs start from identical clones with one new commit on master and
+    one on beads-sync, and a fresh upstream commit to pull in. Round-trips
+    are counted at the remote: each clone's upload-pack and receive-pack
+    (one per fetch/pull and per push connection) append a line to a log.
+    """
+    import tempfile
+
+    def count_round_trips(clone: Path, log: Path) -> None:
+        # git runs these through the shell with the repository path appended
+        for key, program in (("uploadpack", "git-upload-pack"), ("receivepack", "git-receive-pack")):
+            _sh(["git", "config", f"remote.origin.{key}", f"echo {program} >> '{log}'; {program}"], clone)
+
+    def round_trips(log: Path) -> int:
+        return len(log.read_text().splitlines()) if log.exists() else 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        remote, seed = _scratch_remote(tmp_path)
+
+        def prepare(name: str) -> Path:
+            clone = _clone(remote, tmp_path / name)
+            _commit(clone, "beads-sync", f"{name}-beads")
+            _commit(clone, "master", f"{name}-work")
+            # Someone else pushed in the meantime
+            _upstream_commit(seed, "master", f"{name}-upstream")
+            count_round_trips(clone, tmp_path / f"{name}.trips")
+            return clone
+
+        legacy = prepare("legacy")
+        start = time.perf_counter()
+        _sh(["git", "pull", "-q", "--rebase"], legacy)
+        _sh(["git", "push", "-q"], legacy)
+        _sh(["git", "push", "-q", "origin", "beads-sync"], legacy)
+        legacy_ms = (time.perf_counter() - start) * 1000
+        legacy_trips = round_trips(tmp_path / "legacy.trips")
+
+        clone = prepare("netsync")
+        previous_state_dir = os.environ.get("CT_STATE_DIR")
+        os.environ["CT_STATE_DIR"] = str(tmp_path / "state")
+        start = time.perf_counter()
+        fetch(clone, ttl=0)
+        integrate(clone)
+        first = push(clone)
+        netsync_ms = (time.perf_counter() - start) * 1000
+        netsync_trips = round_trips(tmp_path / "netsync.trips")
+
+        # Second session step within the TTL: fetch reused, nothing to push
+        start = time.perf_counter()
+        fetch(clone)
+        integrate(clone)
+        second = push(clone)
+        repeat_ms = (time.perf_counter() - start) * 1000
+        repeat_trips = round_trips(tmp_path / "netsync.trips") - netsync_trips
+
+        if previous_state_dir is None:
+            del os.environ["CT_STATE_DIR"]
+        else:
+            os.environ["CT_STATE_DIR"] = previous_state_dir
+
+    return {
+        "legacy": {"round_trips": legacy_trips, "ms": round(legacy_ms, 1)},
+        "netsync": {"round_trips": netsync_trips, "ms": round(netsync_ms, 1), "pushed": first["pushed"]},
+        "netsync_repeat": {"round_trips": repeat_trips, "ms": round(repeat_ms, 1), "pushed": second["pushed"]},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Single round-trip network sync")
+    parser.add_argument(
+        "command", choices=["bench", "check"],
+        help="bench: compare against pull/push on a local bare remote; check: reproduce the push cases",
+    )
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        print(json.dumps(bench(), indent=2 if args.pretty else None))
+        return 0
+    output = check()
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0 if output["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Deferred pushes for end-work.
+
+end-work used to finish with a synchronous `git push`, so every merge waited
+on a network round-trip, and a push failure after the task was already
+closed failed the whole run. Now end-work only records that a push is owed
+and hands it to a background flusher:
+
+    1. enqueue() writes one entry file to .git/ct/outbox/ (new file per
+       request, so concurrent end-work runs never race on a shared file)
+    2. flush_in_background() starts a detached `outbox flush`
+    3. flush() takes the outbox lock (a second flusher just exits, the
+       running one picks up its entries), pushes with netsync.push() and
+       deletes the entries it covered
+
+A failed push is retried up to MAX_ATTEMPTS times with exponential backoff.
+When the remote rejects master because another agent pushed first, the
+flusher fetches and rebases master onto it (under the main-checkout and
+master locks) before retrying; a rebase conflict is aborted and leaves the
+outbox "blocked" for session-end to resolve. Entries survive crashes, so
+session-end (or `ct outbox flush`) always pushes what a flusher didn't.
+
+Usage:
+    python3 scripts/outbox.py status [--pretty]
+    python3 scripts/outbox.py flush [--attempts N]
+    ct outbox status --pretty
+
+Output JSON (status):
+    {
+        "pending": [{"entry": "1767600000000000000-4242.json", "reason": "end-work spacetraders-q4x",
+                     "queued_at": "2026-01-05T10:12:00Z"}],
+        "flusher": {"state": "retrying", "attempts": 2, "last_error": "...",
+                    "next_attempt": "2026-01-05T10:12:08Z", "pushed": []}
+    }
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import locks
+import netsync
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 120.0
+
+FLUSHER_FILE = "flusher.json"
+
+# Run by the detached flusher; sys.argv[1] is the scripts dir (or ct.pyz)
+_FLUSHER = "import sys; sys.path.insert(0, sys.argv[1]); import outbox; sys.exit(outbox.main(['flush']))"
+
+
+def _dir() -> Path:
+    return state_dir("outbox")
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def enqueue(reason: str) -> str:
+    """
+    Record that master/beads-sync need pushing.
+
+    Args:
+        reason: Free text shown by `ct outbox status` (e.g. "end-work <task-id>")
+
+    Returns:
+        Entry name
+    """
+    name = f"{time.time_ns()}-{os.getpid()}.json"
+    write_json(_dir() / name, {"reason": reason, "queued_at": _iso(time.time())})
+    return name
+
+
+def pending() -> list[dict]:
+    """Queued entries, oldest first."""
+    entries = []
+    for path in sorted(_dir().glob("*-*.json")):
+        entries.append({"entry": path.name, **read_json(path, default={})})
+    return entries
+
+
+def clear(names: list[str] | None = None) -> None:
+    """Drop the given entries (all of them if None), e.g. after a successful push."""
+    if names is None:
+        names = [entry["entry"] for entry in pending()]
+    for name in names:
+        try:
+            (_dir() / name).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def status() -> dict:
+    return {"pending": pending(), "flusher": read_json(_dir() / FLUSHER_FILE, default={})}
+
+
+def _record(**fields) -> None:
+    write_json(_dir() / FLUSHER_FILE, {**fields, "updated_at": _iso(time.time())})
+
+
+def _rejected(details: str) -> bool:
+    return any(marker in details for marker in ("rejected", "fetch first", "non-fast-forward"))
+
+
+def _catch_up(project_root: Path) -> str | None:
+    """
+    Fetch and rebase master onto the remote after a rejected push.
+
+    Returns:
+        None when master can be pushed again, otherwise why not
+    """
+    fetched = netsync.fetch(project_root, ttl=0)
+    if not fetched["ok"]:
+        return fetched.get("details", "git fetch failed").strip()
+
+    with locks.hold((locks.MAIN_CHECKOUT, locks.EXCLUSIVE), (locks.MASTER, locks.EXCLUSIVE)):
+        try:
+            success, conflicts = netsync.integrate(project_root)
+        except RuntimeError as e:
+            return str(e)
+        if not success:
+            netsync.git(["rebase", "--abort"], project_root)
+            return "conflict:" + ",".join(conflicts)
+    return None
+
+
+def flush(project_root: Path, attempts: int = MAX_ATTEMPTS) -> dict:
+    """
+    Push until the outbox is empty or attempts run out.
+
+    Returns dict with:
+        - state: "empty", "pushed", "busy" (another flusher holds the lock),
+          "blocked" (rebase conflict) or "failed"
+        - pushed: branches pushed
+        - attempts: push attempts made
+        - last_error: stderr of the last failure, if any
+    """
+    try:
+        with locks.hold((locks.OUTBOX, locks.EXCLUSIVE), timeout=0):
+            return _flush_locked(project_root, attempts)
+    except locks.LockTimeout:
+        return {"state": "busy", "pushed": [], "attempts": 0}
+
+
+def _flush_locked(project_root: Path, attempts: int) -> dict:
+    pushed: set[str] = set()
+    attempt = 0
+    last_error = None
+    state = "empty"
+
+    while True:
+        # Entries listed before the push are covered by it; later ones get another pass
+        names = [entry["entry"] for entry in pending()]
+        if not names:
+            break
+        if attempt >= attempts:
+            state = "failed"
+            break
+
+        attempt += 1
+        result = netsync.push(project_root)
+        if result["ok"]:
+            clear(names)
+            pushed.update(result["pushed"])
+            state = "pushed"
+            attempt = 0
+            last_error = None
+            continue
+
+        last_error = result.get("details", "").strip()
+        if _rejected(last_error):
+            reason = _catch_up(project_root)
+            if reason and reason.startswith("conflict:"):
+                state = "blocked"
+                last_error = f"master conflicts with the remote ({reason[len('conflict:'):]}); run session-end"
+                break
+            if reason:
+                last_error = reason
+
+        delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+        _record(state="retrying", attempts=attempt, last_error=last_error,
+                next_attempt=_iso(time.time() + delay), pushed=sorted(pushed))
+        time.sleep(delay)
+
+    outcome = {"state": state, "pushed": sorted(pushed), "attempts": attempt, "last_error": last_error}
+    _record(**outcome)
+    return outcome
+
+
+def flush_in_background(project_root: Path) -> None:
+    """Start a detached flusher that outlives this process."""
+    subprocess.Popen(
+        [sys.executable, "-c", _FLUSHER, str(Path(__file__).resolve().parent)],
+        cwd=project_root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Deferred push queue")
+    parser.add_argument("command", nargs="?", default="status", choices=["status", "flush"])
+    parser.add_argument("--attempts", type=int, default=MAX_ATTEMPTS, help="flush: push attempts before giving up")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        output = status()
+    else:
+        project_root = find_project_root()
+        if project_root is None:
+            print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+            return 1
+        output = flush(project_root, args.attempts)
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0 if output.get("state") not in ("failed", "blocked") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
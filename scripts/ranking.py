@@ -0,0 +1,105 @@
+"""
+Top-K ranking of ready tasks.
+
+Scores each ready task from four signals and keeps the best K with a heap
+(O(n log k)), so a large backlog never has to be fully sorted or fully
+printed into an agent's context.
+
+    priority   (4 - priority) * PRIORITY_WEIGHT   P0 scores highest
+    age        log2(1 + days since created) * AGE_WEIGHT
+    unblocks   open tasks that become ready if this one closes * UNBLOCK_WEIGHT
+               (DepGraph.unblocked_by_close)
+    category   CATEGORY_WEIGHTS["meta" | "game"]
+
+Every ranked task carries a short explanation of how its score was built:
+    {"score": 42.1, "why": "P1 +30, 12d +7.4, unblocks 1 +5, game +2"}
+"""
+
+import heapq
+import math
+import time
+from datetime import datetime
+
+from depgraph import DepGraph
+
+PRIORITY_WEIGHT = 10.0
+AGE_WEIGHT = 2.0
+UNBLOCK_WEIGHT = 5.0
+CATEGORY_WEIGHTS = {"game": 2.0, "meta": 0.0}
+
+DEFAULT_PRIORITY = 2
+
+
+def age_days(created_at: str | None, now: float) -> float:
+    """Days since an ISO-8601 timestamp (timezone ignored; day precision is enough)."""
+    if not created_at:
+        return 0.0
+    try:
+        created = datetime.fromisoformat(created_at[:19]).timestamp()
+    except ValueError:
+        return 0.0
+    return max(0.0, (now - created) / 86400)
+
+
+def score_task(
+    task: dict,
+    category: str,
+    unblocks: int,
+    now: float,
+) -> tuple[float, str]:
+    """
+    Score one task.
+
+    Returns:
+        Tuple of (score, explanation)
+    """
+    priority = task.get("priority")
+    if not isinstance(priority, int):
+        priority = DEFAULT_PRIORITY
+    days = age_days(task.get("created_at"), now)
+
+    parts = [
+        (f"P{priority}", (4 - priority) * PRIORITY_WEIGHT),
+        (f"{days:.0f}d", math.log2(1 + days) * AGE_WEIGHT),
+        (f"unblocks {unblocks}", unblocks * UNBLOCK_WEIGHT),
+        (category, CATEGORY_WEIGHTS.get(category, 0.0)),
+    ]
+    score = sum(value for _, value in parts)
+    why = ", ".join(f"{label} {value:+.1f}" for label, value in parts if value)
+    return (round(score, 2), why or "no signals")
+
+
+def rank(
+    tasks: list[dict],
+    meta_ids: set[str],
+    graph: DepGraph | None = None,
+    k: int | None = None,
+) -> list[dict]:
+    """
+    Rank tasks and return the top K (all if k is None), best first.
+
+    Args:
+        tasks: Ready tasks (bd issue dicts)
+        meta_ids: IDs in the meta-work category
+        graph: Dependency graph for unblock counts (optional)
+        k: Number of tasks to keep
+
+    Returns:
+        Copies of the tasks with 'score' and 'why' added
+    """
+    now = time.time()
+
+    scored = []
+    for index, task in enumerate(tasks):
+        category = "meta" if task["id"] in meta_ids else "game"
+        unblocks = len(graph.unblocked_by_close(task["id"])) if graph else 0
+        score, why = score_task(task, category, unblocks, now)
+        # index breaks ties in input order and keeps dicts out of comparisons
+        scored.append((score, -index, task, why))
+
+    if k is None:
+        best = sorted(scored, key=lambda entry: entry[:2], reverse=True)
+    else:
+        best = heapq.nlargest(k, scored, key=lambda entry: entry[:2])
+
+    return [{**task, "score": score, "why": why} for score, _, task, why in best]
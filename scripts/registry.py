@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Registry of task worktrees, and a reconciler for drift against beads and git.
+
+begin-work records every worktree it creates as one file per task in
+.git/ct/registry/<short-id>.json (one file each, so concurrent agents never
+race on a shared file, and a lookup is a single read):
+
+    {"task_id": "spacetraders-q4x", "path": "worktrees/q4x", "branch": "task/q4x",
+     "base": "<master SHA it was branched from>", "created_at": "2026-01-05T10:12:00Z"}
+
+end-work and `ct gc --apply` drop the entry with the worktree.
+
+`reconcile` joins every task status, worktree, agent branch and registry
+entry in one pass (every in_progress/review task is visited, even one with
+nothing on disk) (one `git worktree list`, one `for-each-ref`, one read of
+issues.jsonl) and reports what disagrees:
+
+    unregistered         worktree without a registry entry       repair: register it
+    entry_mismatch       entry's path or branch is wrong          repair: rewrite it
+    stale_entry          entry without worktree or branch         repair: drop it
+    missing_dir          git lists a worktree whose directory is gone   repair: git worktree prune
+    missing_worktree     in_progress/review task, branch but no worktree repair: re-add the worktree
+    orphaned_dir         directory under worktrees/ git doesn't know    report (ct gc removes it)
+    open_with_worktree   task open but a worktree exists          report
+    closed_with_worktree task closed but its worktree remains     report (ct gc removes it)
+    review_without_branch task in review with nothing to review   report
+    in_progress_without_branch task claimed, no worktree or branch  report (expected for research)
+    leftover_branch      open/closed task's branch without worktree     report
+    unknown_task         worktree or branch for no known task     report
+
+Without --apply nothing is changed.
+
+Usage:
+    python3 scripts/registry.py list [--pretty]
+    python3 scripts/registry.py show <task-id>
+    python3 scripts/registry.py reconcile [--apply] [--pretty]
+    ct reconcile --apply
+
+Output JSON (reconcile):
+    {
+        "drift": [
+            {"short_id": "q4x", "task_id": "spacetraders-q4x", "status": "in_progress",
+             "kind": "missing_worktree", "details": "branch task/q4x has no worktree",
+             "repaired": true}
+        ],
+        "checked": 12,         // task IDs with a worktree, branch or entry
+        "repaired": 1,
+        "registered": 11       // registry entries after the run
+    }
+
+Exit codes (reconcile):
+    0: No drift, or all of it repaired
+    1: Error (with JSON error message on stderr)
+    2: Drift left to resolve by hand
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+WORKTREES_DIR = "worktrees"
+
+# Task statuses that own a worktree
+ACTIVE_STATUSES = ("in_progress", "review")
+
+
+def _dir() -> Path:
+    return state_dir("registry")
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def lookup(short_id: str) -> dict | None:
+    """Registry entry for a task's short ID, or None."""
+    return read_json(_dir() / f"{short_id}.json", default=None)
+
+
+def register(task_id: str | None, short_id: str, branch: str, base: str | None,
+             created_at: float | None = None) -> dict:
+    """
+    Record a worktree at worktrees/<short_id>.
+
+    Args:
+        task_id: Full task ID (None if no such task is known)
+        short_id: Worktree name
+        branch: Branch checked out in it
+        base: master SHA the branch was created from
+        created_at: Creation time (default: now)
+
+    Returns:
+        The entry written
+    """
+    entry = {
+        "task_id": task_id,
+        "path": f"{WORKTREES_DIR}/{short_id}",
+        "branch": branch,
+        "base": base,
+        "created_at": _iso(time.time() if created_at is None else created_at),
+    }
+    write_json(_dir() / f"{short_id}.json", entry)
+    return entry
+
+
+def unregister(short_id: str) -> None:
+    """Drop a task's entry (no-op if there is none)."""
+    (_dir() / f"{short_id}.json").unlink(missing_ok=True)
+
+
+def entries() -> dict[str, dict]:
+    """Every entry, keyed by short ID."""
+    return {path.stem: read_json(path, default={}) for path in sorted(_dir().glob("*.json"))}
+
+
+def _git(args: list[str], project_root: Path) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=project_root, capture_output=True, text=True)
+
+
+def merge_base(project_root: Path, branch: str) -> str | None:
+    """Best guess at the master SHA a branch started from."""
+    result = _git(["merge-base", "master", branch], project_root)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _agent_branches(project_root: Path) -> dict[str, str]:
+    """Short ID -> branch for every branch in the agent namespaces."""
+    import fleet
+
+    result = _git(["for-each-ref", "--format=%(refname:short)", *fleet.BRANCH_NAMESPACES], project_root)
+    return {branch.split("/", 1)[1]: branch for branch in result.stdout.split()}
+
+
+def _known_worktrees(project_root: Path) -> dict[str, tuple[Path, str | None]]:
+    """Short ID -> (path, branch) for every worktree git lists under worktrees/."""
+    result = _git(["worktree", "list", "--porcelain"], project_root)
+    base = (project_root / WORKTREES_DIR).resolve()
+    known = {}
+    path = None
+    for line in result.stdout.splitlines() + [""]:
+        if line.startswith("worktree "):
+            path = Path(line.split(" ", 1)[1])
+            branch = None
+        elif line.startswith("branch refs/heads/"):
+            branch = line[len("branch refs/heads/"):]
+        elif not line and path is not None:
+            if path.resolve().parent == base:
+                known[path.name] = (path, branch)
+            path = None
+    return known
+
+
+def reconcile(project_root: Path, apply: bool = False) -> dict:
+    """
+    Compare task statuses, worktrees, branches and the registry (see module docstring).
+
+    Args:
+        project_root: Main checkout
+        apply: Repair what can be repaired
+
+    Returns:
+        Dict with drift, checked, repaired and registered
+    """
+    import issue_store
+    import locks
+    import taskids
+    import trash
+
+    issues = {taskids.short_id(i["id"]): i for i in issue_store.load_issues(project_root, export_fallback=False)}
+    known = _known_worktrees(project_root)
+    branches = _agent_branches(project_root)
+    registry = entries()
+    worktrees_dir = project_root / WORKTREES_DIR
+    dirs = {
+        p.name for p in (worktrees_dir.iterdir() if worktrees_dir.is_dir() else [])
+        if p.is_dir() and p.name != trash.TRASH_DIR
+    }
+
+    drift = []
+
+    # Metadata of deleted worktrees must go before any can be re-added
+    missing = set(known) - dirs
+    if apply and missing:
+        _git(["worktree", "prune"], project_root)
+
+    def report(short_id: str, kind: str, details: str) -> dict:
+        issue = issues.get(short_id)
+        item = {
+            "short_id": short_id,
+            "task_id": issue["id"] if issue else None,
+            "status": issue.get("status") if issue else None,
+            "kind": kind,
+            "details": details,
+            "repaired": False,
+        }
+        drift.append(item)
+        return item
+
+    active = {short_id for short_id, issue in issues.items() if issue.get("status") in ACTIVE_STATUSES}
+    ids = sorted(set(known) | set(dirs) | set(branches) | set(registry) | active)
+    for short_id in ids:
+        issue = issues.get(short_id)
+        status = issue.get("status") if issue else None
+        task_id = issue["id"] if issue else None
+        entry = registry.get(short_id)
+        path = worktrees_dir / short_id
+        has_dir = short_id in dirs
+        worktree_branch = known[short_id][1] if short_id in known else None
+        branch = worktree_branch or branches.get(short_id)
+
+        if has_dir and short_id not in known:
+            report(short_id, "orphaned_dir", f"{WORKTREES_DIR}/{short_id} is not a git worktree")
+            continue
+
+        if short_id in missing:
+            item = report(short_id, "missing_dir", f"git still lists {WORKTREES_DIR}/{short_id}")
+            item["repaired"] = apply
+
+        if issue is None:
+            report(short_id, "unknown_task", f"no task with short ID {short_id}")
+        elif has_dir and status == "open":
+            report(short_id, "open_with_worktree", "worktree exists but the task was never claimed")
+        elif has_dir and status == "closed":
+            report(short_id, "closed_with_worktree", "run `ct gc` to remove it")
+        elif not has_dir and status in ACTIVE_STATUSES and branch:
+            item = report(short_id, "missing_worktree", f"branch {branch} has no worktree")
+            if apply:
+                with locks.hold((locks.worktree(short_id), locks.EXCLUSIVE)):
+                    added = _git(["worktree", "add", str(path), branch], project_root)
+                if added.returncode == 0:
+                    item["repaired"] = True
+                    has_dir = True
+                else:
+                    item["details"] += f" ({added.stderr.strip()})"
+        elif not has_dir and status == "review":
+            report(short_id, "review_without_branch", "nothing to review: no worktree and no branch")
+        elif not has_dir and status == "in_progress":
+            report(short_id, "in_progress_without_branch",
+                   "claimed but no worktree and no branch (begin-work can't resume it; fine for research)")
+        elif not has_dir and branch and status not in ACTIVE_STATUSES:
+            report(short_id, "leftover_branch", f"branch {branch} outlived its worktree")
+
+        if has_dir and branch:
+            if entry is None:
+                item = report(short_id, "unregistered", f"{WORKTREES_DIR}/{short_id} on {branch}")
+                if apply:
+                    register(task_id, short_id, branch, merge_base(project_root, branch), path.stat().st_mtime)
+                    item["repaired"] = True
+            elif entry.get("branch") != branch or entry.get("path") != f"{WORKTREES_DIR}/{short_id}" \
+                    or entry.get("task_id") != task_id:
+                item = report(short_id, "entry_mismatch", f"registry says {entry.get('branch')}, worktree is on {branch}")
+                if apply:
+                    register(task_id, short_id, branch, entry.get("base") or merge_base(project_root, branch))
+                    item["repaired"] = True
+        elif entry is not None and not has_dir and not (status in ACTIVE_STATUSES and branch):
+            item = report(short_id, "stale_entry", f"registered {entry.get('path')} no longer exists")
+            if apply:
+                unregister(short_id)
+                item["repaired"] = True
+
+    return {
+        "drift": drift,
+        "checked": len(ids),
+        "repaired": sum(1 for item in drift if item["repaired"]),
+        "registered": len(entries()),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Task worktree registry and reconciler")
+    parser.add_argument("command", nargs="?", default="list", choices=["list", "show", "reconcile"])
+    parser.add_argument("task_id", nargs="?", help="show: task ID (short, partial or full)")
+    parser.add_argument("--apply", action="store_true", help="reconcile: repair what can be repaired")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    project_root = find_project_root()
+    if project_root is None:
+        print(json.dumps({"error": "Not inside a git repository"}), file=sys.stderr)
+        return 1
+
+    if args.command == "list":
+        output = entries()
+    elif args.command == "show":
+        import taskids
+
+        if not args.task_id:
+            print(json.dumps({"error": "show requires a task ID"}), file=sys.stderr)
+            return 1
+        try:
+            task_id = taskids.resolve(args.task_id) or args.task_id
+        except taskids.AmbiguousId as e:
+            print(json.dumps({"error": str(e), "candidates": e.candidates[:taskids.MAX_CANDIDATES]}), file=sys.stderr)
+            return 1
+        output = lookup(taskids.short_id(task_id))
+        if output is None:
+            print(json.dumps({"error": f"No registered worktree for {task_id}"}), file=sys.stderr)
+            return 1
+    else:
+        output = reconcile(project_root, args.apply)
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    if args.command == "reconcile":
+        return 0 if all(item["repaired"] for item in output["drift"]) else 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
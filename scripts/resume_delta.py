@@ -0,0 +1,168 @@
+"""
+Delta-only resume payloads for begin-work.
+
+Agents that checkpoint and yield call `begin-work` on the same worktree many
+times, and each call used to resend the full task text, every comment and
+the whole commit list. Each resume/review payload now comes with a token
+naming a snapshot of what was sent:
+
+    field:<name>       hash of a task field (title, description, design, ...)
+    notes:<SECTION>    hash of one notes section (text before the first section is "_")
+    comment:<id>       hash of a comment
+    commit:<line>      one `git log --oneline master..HEAD` entry
+    status             hash of the `git status --short` list
+
+Passing that token back with `--since` returns only the parts whose hash
+changed, and a new token. Snapshots live per worktree in
+.git/ct/resume/<short-id>.json (the last MAX_SNAPSHOTS, so an implementer and
+a reviewer on the same worktree don't invalidate each other). An unknown
+token falls back to the full payload.
+"""
+
+import hashlib
+import json
+import re
+
+from ct_state import read_json, state_dir, write_json
+
+NOTES_SECTIONS = [
+    "COMPLETED",
+    "IN_PROGRESS",
+    "NEXT",
+    "BLOCKERS",
+    "KEY_DECISIONS",
+    "CRITERIA",
+    "VAULT_DOCS",
+    "DISCOVERED",
+]
+
+TASK_FIELDS = ("title", "description", "design", "acceptance_criteria")
+
+MAX_SNAPSHOTS = 8
+
+_SECTION_RE = re.compile(rf"^({'|'.join(NOTES_SECTIONS)}):", re.MULTILINE)
+
+
+def _hash(value) -> str:
+    data = value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()
+
+
+def split_notes(notes: str) -> dict[str, str]:
+    """
+    Split notes into known sections ("COMPLETED: ..." at the start of a line).
+
+    Returns:
+        Dict of section name -> text (header included); text before the
+        first section is keyed "_" when not blank
+    """
+    sections = {}
+    matches = list(_SECTION_RE.finditer(notes))
+    preamble = notes[:matches[0].start()] if matches else notes
+    if preamble.strip():
+        sections["_"] = preamble
+    for match, following in zip(matches, [*matches[1:], None]):
+        end = following.start() if following else len(notes)
+        sections[match.group(1)] = notes[match.start():end]
+    return sections
+
+
+def snapshot(task: dict, comments: list, context: dict) -> dict[str, str]:
+    """Hash every resumable part of a payload."""
+    parts = {f"field:{name}": _hash(task.get(name, "")) for name in TASK_FIELDS}
+    for section, text in split_notes(task.get("notes", "")).items():
+        parts[f"notes:{section}"] = _hash(text)
+    for comment in comments:
+        parts[f"comment:{comment.get('id')}"] = _hash(comment)
+    for line in context.get("commits", []):
+        parts[f"commit:{line}"] = ""
+    parts["status"] = _hash(context.get("uncommitted_changes", []))
+    return parts
+
+
+def token_for(parts: dict[str, str]) -> str:
+    return _hash(sorted(parts.items()))[:12]
+
+
+def _store_path(short_id: str):
+    return state_dir("resume") / f"{short_id}.json"
+
+
+def save(short_id: str, parts: dict[str, str]) -> str:
+    """Remember a snapshot for a worktree and return its token."""
+    token = token_for(parts)
+    path = _store_path(short_id)
+    stored = read_json(path, default={})
+    snapshots = stored.get("snapshots", {})
+    snapshots.pop(token, None)
+    snapshots[token] = parts  # Most recent last
+    while len(snapshots) > MAX_SNAPSHOTS:
+        snapshots.pop(next(iter(snapshots)))
+    try:
+        write_json(path, {"snapshots": snapshots})
+    except OSError:
+        pass  # Next resume just gets a full payload
+    return token
+
+
+def load(short_id: str, token: str) -> dict[str, str] | None:
+    """Snapshot for a token, or None if it is unknown or expired."""
+    return read_json(_store_path(short_id), default={}).get("snapshots", {}).get(token)
+
+
+def delta(
+    task: dict,
+    comments: list,
+    context: dict,
+    previous: dict[str, str],
+    current: dict[str, str],
+) -> tuple[dict, dict]:
+    """
+    The parts of a resume payload that changed since a snapshot.
+
+    Returns:
+        Tuple of (task delta, resume_context delta). Unchanged parts are
+        omitted; removed comments/commits are listed by ID/count.
+    """
+    def changed(key: str) -> bool:
+        return previous.get(key) != current.get(key)
+
+    task_delta: dict = {"id": task["id"]}
+    for name in TASK_FIELDS:
+        if changed(f"field:{name}"):
+            task_delta[name] = task.get(name, "")
+
+    sections = split_notes(task.get("notes", ""))
+    changed_sections = {s: text for s, text in sections.items() if changed(f"notes:{s}")}
+    removed_sections = [
+        key.split(":", 1)[1] for key in previous
+        if key.startswith("notes:") and key not in current
+    ]
+    if changed_sections:
+        task_delta["notes_changed"] = changed_sections
+    if removed_sections:
+        task_delta["notes_removed"] = removed_sections
+
+    added_comments = [c for c in comments if changed(f"comment:{c.get('id')}")]
+    removed_comments = [
+        key.split(":", 1)[1] for key in previous
+        if key.startswith("comment:") and key not in current
+    ]
+    if added_comments:
+        task_delta["comments_changed"] = added_comments
+    if removed_comments:
+        task_delta["comments_removed"] = removed_comments
+
+    context_delta: dict = {}
+    new_commits = [line for line in context.get("commits", []) if f"commit:{line}" not in previous]
+    dropped = sum(1 for key in previous if key.startswith("commit:") and key not in current)
+    if new_commits:
+        context_delta["commits_added"] = new_commits
+    if dropped:
+        context_delta["commits_removed"] = dropped
+    if changed("status"):
+        context_delta["uncommitted_changes"] = context.get("uncommitted_changes", [])
+    if changed_sections or removed_sections:
+        context_delta["notes_sections"] = context.get("notes_sections", [])
+
+    return (task_delta, context_delta)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Mechanical review runner (Gate 1 build/test checks).
+
+Runs the three cargo checks of a mechanical review concurrently in a task's
+worktree (normally right after `begin-work --review`):
+
+    fmt      cargo fmt --check
+    clippy   cargo clippy --all-targets --message-format=json
+    test     cargo test --no-fail-fast
+
+clippy and test use target dirs shared by all worktrees (see cargo_env.py)
+and split the CPU budget between them. The structured results are attached
+to the task as a comment (author "ct-review").
+
+Results are cached in .git/ct/review/ by the worktree's git tree hash and
+toolchain, so reviewing an unchanged tree again (e.g. after a rebase that
+touched no files) returns at once. A worktree with uncommitted changes is
+never cached and never passes.
+
+Usage:
+    python3 scripts/review.py <task-id> [--checks fmt,clippy,test] [--no-attach] [--no-cache]
+    ct review q4x --pretty
+
+Output JSON:
+    {
+        "task_id": "spacetraders-q4x",
+        "worktree": "worktrees/q4x",
+        "tree": "4b825dc...",
+        "toolchain": "1.90.0-1159e78c4-x86_64-unknown-linux-gnu",
+        "cached": false,
+        "clean": true,                         // no uncommitted changes
+        "ok": false,
+        "checks": {
+            "fmt": {"ok": true, "exit_code": 0, "seconds": 0.4, "files": []},
+            "clippy": {"ok": false, "exit_code": 0, "seconds": 21.3, "errors": 0, "warnings": 1,
+                       "diagnostics": [{"level": "warning", "code": "clippy::needless_return",
+                                        "message": "unneeded `return` statement",
+                                        "file": "src/agent.rs", "line": 42}]},
+            "test": {"ok": true, "exit_code": 0, "seconds": 30.1, "passed": 41, "failed": 0,
+                     "ignored": 0, "failures": []}
+        },
+        "attached": true,
+        "elapsed_ms": 30512.0
+    }
+
+Exit codes:
+    0: All checks passed
+    1: Error (with JSON error message on stderr)
+    2: Review ran and found problems
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cargo_env
+import cmdcache
+import locks
+import taskids
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+CHECKS = ("fmt", "clippy", "test")
+COMMENT_AUTHOR = "ct-review"
+
+# Diagnostics kept per check; the counts always cover all of them
+MAX_DIAGNOSTICS = 50
+STDERR_TAIL_LINES = 20
+
+# Cached reviews kept (oldest dropped first)
+MAX_CACHE_ENTRIES = 256
+
+_FMT_DIFF_RE = re.compile(r"^Diff in (.+?)(?::(\d+))?:?$", re.MULTILINE)
+_TEST_RESULT_RE = re.compile(r"^test result: \w+\. (\d+) passed; (\d+) failed; (\d+) ignored", re.MULTILINE)
+_TEST_FAILED_RE = re.compile(r"^test (\S+) \.\.\. FAILED$", re.MULTILINE)
+
+
+def error_exit(message: str, details: str = "") -> None:
+    """Print JSON error to stderr and exit."""
+    error = {"error": message}
+    if details:
+        error["details"] = details
+    print(json.dumps(error), file=sys.stderr)
+    sys.exit(1)
+
+
+def _tail(text: str) -> str:
+    return "\n".join(text.strip().splitlines()[-STDERR_TAIL_LINES:])
+
+
+def _cargo(args: list[str], worktree: Path, target_dir: Path | None) -> tuple[subprocess.CompletedProcess, float]:
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(
+            ["cargo", *args],
+            cwd=worktree,
+            capture_output=True,
+            text=True,
+            env=cargo_env.env(target_dir) if target_dir else None,
+        )
+    except OSError as e:
+        result = subprocess.CompletedProcess(["cargo", *args], 127, "", str(e))
+    return result, round(time.perf_counter() - start, 2)
+
+
+def run_fmt(worktree: Path, toolchain: str, jobs: int) -> dict:
+    """cargo fmt --check; lists the files that need formatting."""
+    result, seconds = _cargo(["fmt", "--check"], worktree, None)
+    files = sorted({
+        str(Path(m.group(1)).relative_to(worktree)) if Path(m.group(1)).is_relative_to(worktree) else m.group(1)
+        for m in _FMT_DIFF_RE.finditer(result.stdout)
+    })
+    output = {"ok": result.returncode == 0, "exit_code": result.returncode, "seconds": seconds, "files": files}
+    if result.returncode != 0 and not files:
+        output["stderr"] = _tail(result.stderr)
+    return output
+
+
+def run_clippy(worktree: Path, toolchain: str, jobs: int) -> dict:
+    """cargo clippy with JSON messages; passes only without errors or warnings."""
+    target = cargo_env.shared_target(toolchain, "clippy")
+    result, seconds = _cargo(
+        ["clippy", "--all-targets", "--message-format=json", "-j", str(jobs)], worktree, target
+    )
+
+    counts, diagnostics = cargo_env.parse_messages(result.stdout, MAX_DIAGNOSTICS)
+
+    output = {
+        "ok": result.returncode == 0 and not counts["error"] and not counts["warning"],
+        "exit_code": result.returncode,
+        "seconds": seconds,
+        "errors": counts["error"],
+        "warnings": counts["warning"],
+        "diagnostics": diagnostics,
+    }
+    if result.returncode != 0 and not counts["error"]:
+        output["stderr"] = _tail(result.stderr)
+    return output
+
+
+def run_test(worktree: Path, toolchain: str, jobs: int) -> dict:
+    """cargo test --no-fail-fast; totals over every test binary."""
+    target = cargo_env.shared_target(toolchain, "test")
+    result, seconds = _cargo(
+        ["test", "--no-fail-fast", "-j", str(jobs), "--", f"--test-threads={jobs}"], worktree, target
+    )
+
+    passed = failed = ignored = 0
+    for match in _TEST_RESULT_RE.finditer(result.stdout):
+        passed += int(match.group(1))
+        failed += int(match.group(2))
+        ignored += int(match.group(3))
+    failures = _TEST_FAILED_RE.findall(result.stdout)[:MAX_DIAGNOSTICS]
+
+    output = {
+        "ok": result.returncode == 0,
+        "exit_code": result.returncode,
+        "seconds": seconds,
+        "passed": passed,
+        "failed": failed,
+        "ignored": ignored,
+        "failures": failures,
+    }
+    if result.returncode != 0 and not failed:
+        output["stderr"] = _tail(result.stderr)  # Build failure
+    return output
+
+
+RUNNERS = {"fmt": run_fmt, "clippy": run_clippy, "test": run_test}
+
+
+def cache_key(tree: str, toolchain: str, checks: list[str]) -> str:
+    return hashlib.blake2b(json.dumps([tree, toolchain, checks]).encode(), digest_size=12).hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return state_dir("review") / f"{key}.json"
+
+
+def _prune_cache() -> None:
+    entries = sorted(state_dir("review").glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in entries[:-MAX_CACHE_ENTRIES]:
+        path.unlink(missing_ok=True)
+
+
+def run_checks(worktree: Path, toolchain: str, checks: list[str]) -> dict[str, dict]:
+    """Run the checks concurrently; the cargo builds split the CPU budget."""
+    builds = sum(1 for check in checks if check != "fmt")
+    jobs = cargo_env.split_budget(builds)
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        futures = {check: pool.submit(RUNNERS[check], worktree, toolchain, jobs) for check in checks}
+        return {check: future.result() for check, future in futures.items()}
+
+
+def summarize(review: dict) -> str:
+    """Comment text: one line per check, then the full result as JSON."""
+    checks = review["checks"]
+    lines = [f"Mechanical review: {'PASS' if review['ok'] else 'FAIL'} (tree {review['tree'][:10]})"]
+    if not review["clean"]:
+        lines.append("worktree: uncommitted changes")
+    if "fmt" in checks:
+        fmt = checks["fmt"]
+        lines.append("fmt: ok" if fmt["ok"] else f"fmt: {len(fmt['files'])} files need formatting")
+    if "clippy" in checks:
+        clippy = checks["clippy"]
+        lines.append(f"clippy: {clippy['errors']} errors, {clippy['warnings']} warnings")
+    if "test" in checks:
+        test = checks["test"]
+        lines.append(f"test: {test['passed']} passed, {test['failed']} failed, {test['ignored']} ignored")
+    details = {k: review[k] for k in ("tree", "toolchain", "checks")}
+    lines.extend(["", "```json", json.dumps(details), "```"])
+    return "\n".join(lines)
+
+
+def attach(task_id: str, review: dict) -> bool:
+    """Add the results to the task as a comment."""
+    with locks.hold((locks.BEADS_DB, locks.EXCLUSIVE)):
+        result = cmdcache.run(["bd", "comments", "add", task_id, summarize(review), "-a", COMMENT_AUTHOR])
+    return result.returncode == 0
+
+
+def review(project_root: Path, task_id: str, checks: list[str], use_cache: bool, attach_results: bool) -> dict:
+    start = time.perf_counter()
+    short_id = taskids.short_id(task_id)
+    worktree = project_root / "worktrees" / short_id
+    if not worktree.is_dir():
+        error_exit(f"Worktree not found: worktrees/{short_id}", "Run begin-work --review first")
+
+    with locks.hold((locks.worktree(short_id), locks.SHARED)):
+        tree = cargo_env.tree_hash(worktree)
+        if tree is None:
+            error_exit(f"Could not read HEAD of worktrees/{short_id}")
+        toolchain = cargo_env.toolchain(worktree)
+        status = subprocess.run(
+            ["git", "-C", str(worktree), "status", "--porcelain"], capture_output=True, text=True
+        )
+        clean = not status.stdout.strip()
+
+        key = cache_key(tree, toolchain, checks)
+        cached = read_json(_cache_path(key), default=None) if use_cache and clean else None
+        if cached:
+            results = cached["checks"]
+        else:
+            results = run_checks(worktree, toolchain, checks)
+
+    output = {
+        "task_id": task_id,
+        "worktree": f"worktrees/{short_id}",
+        "tree": tree,
+        "toolchain": toolchain,
+        "cached": cached is not None,
+        "clean": clean,
+        "ok": clean and all(r["ok"] for r in results.values()),
+        "checks": results,
+        "attached": False,
+    }
+
+    attached_to = set(cached.get("attached_to", [])) if cached else set()
+    if attach_results:
+        if task_id in attached_to:
+            output["attached"] = True  # Same results are already on the task
+        elif attach(task_id, output):
+            output["attached"] = True
+            attached_to.add(task_id)
+
+    if clean:
+        try:
+            write_json(_cache_path(key), {"checks": results, "attached_to": sorted(attached_to)})
+            _prune_cache()
+        except OSError:
+            pass
+
+    output["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return output
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run cargo fmt/clippy/test for a task under review")
+    parser.add_argument("task_id", help="Task ID (short, partial or full)")
+    parser.add_argument("--checks", default=",".join(CHECKS), help="Comma-separated subset of fmt,clippy,test")
+    parser.add_argument("--no-cache", action="store_true", help="Run even if this tree was reviewed before")
+    parser.add_argument("--no-attach", action="store_true", help="Don't add the results to the task")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    checks = [c for c in CHECKS if c in args.checks.split(",")]
+    unknown = set(args.checks.split(",")) - set(CHECKS)
+    if unknown or not checks:
+        error_exit(f"Unknown checks: {', '.join(sorted(unknown)) or args.checks}", f"Choose from {', '.join(CHECKS)}")
+
+    project_root = find_project_root()
+    if project_root is None:
+        error_exit("Not inside a git repository")
+
+    try:
+        task_id = taskids.resolve(args.task_id) or args.task_id
+    except taskids.AmbiguousId as e:
+        error_exit(str(e), "Candidates: " + ", ".join(e.candidates[:taskids.MAX_CANDIDATES]))
+
+    try:
+        output = review(project_root, task_id, checks, not args.no_cache, not args.no_attach)
+    except locks.LockTimeout as e:
+        error_exit(str(e), "Another agent is holding the worktree; retry later")
+
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0 if output["ok"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
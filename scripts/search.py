@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Full-text search over every task, including closed history.
+
+Indexes title, description, design, acceptance criteria, notes and comments
+of each issue in the local issues.jsonl export into a SQLite FTS5 table at
+.git/ct/search.sqlite. Each search first brings the index up to date:
+
+    - export unchanged (same mtime and size): nothing is read
+    - otherwise: every issue's content hash is compared with the indexed one,
+      and only new or changed issues are re-indexed; deleted ones are dropped
+
+Results are ranked with BM25 (title matches weigh most) and carry a snippet
+around the best match.
+
+Usage:
+    python3 scripts/search.py "rate limit retry"
+    python3 scripts/search.py "market cache" --status closed --limit 5
+    python3 scripts/search.py 'navigat* NOT docs' --raw     # FTS5 query syntax
+    ct search "fuel routing" --pretty
+
+Output JSON:
+    {
+        "query": "rate limit retry",
+        "results": [
+            {"id": "spacetraders-abc", "title": "...", "status": "closed",
+             "score": 12.3, "snippet": "...handle [rate] [limit] with [retry]..."}
+        ],
+        "index": {"issues": 812, "updated": 3, "removed": 0},
+        "elapsed_ms": 4.1
+    }
+
+Exit codes:
+    0: Success (including no results)
+    1: Error (with JSON error message on stderr)
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import issue_store
+from ct_state import find_project_root, state_dir
+
+INDEX_FILE = "search.sqlite"
+
+# Indexed text fields, in column order, with their BM25 weights
+FIELDS = {
+    "title": 10.0,
+    "description": 4.0,
+    "design": 2.0,
+    "acceptance_criteria": 2.0,
+    "notes": 2.0,
+    "comments": 1.0,
+}
+
+SNIPPET_TOKENS = 16
+DEFAULT_LIMIT = 10
+
+
+def error_exit(message: str, details: str = "") -> None:
+    """Print JSON error to stderr and exit."""
+    error = {"error": message}
+    if details:
+        error["details"] = details
+    print(json.dumps(error), file=sys.stderr)
+    sys.exit(1)
+
+
+def connect(path: Path | None = None) -> sqlite3.Connection:
+    """Open (and if needed create) the search index."""
+    conn = sqlite3.connect(path or state_dir() / INDEX_FILE, timeout=30)
+    columns = ", ".join(FIELDS)
+    conn.executescript(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+            id UNINDEXED, status UNINDEXED, {columns},
+            tokenize = 'porter unicode61'
+        );
+        CREATE TABLE IF NOT EXISTS indexed (id TEXT PRIMARY KEY, hash TEXT NOT NULL, rowid_ INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """)
+    return conn
+
+
+def document(issue: dict) -> dict[str, str]:
+    """Text of one issue, per indexed field."""
+    doc = {field: issue.get(field) or "" for field in FIELDS if field != "comments"}
+    doc["comments"] = "\n".join(c.get("text", "") for c in issue.get("comments") or [])
+    return doc
+
+
+def content_hash(issue: dict, doc: dict[str, str]) -> str:
+    payload = json.dumps([issue.get("status"), doc], sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def refresh(conn: sqlite3.Connection, project_root: Path | None = None) -> dict:
+    """
+    Bring the index in line with the export.
+
+    Returns:
+        Dict with 'issues', 'updated' and 'removed' counts
+    """
+    store = issue_store.find_store(project_root or find_project_root())
+    total = conn.execute("SELECT count(*) FROM indexed").fetchone()[0]
+    if store is None:
+        return {"issues": total, "updated": 0, "removed": 0}
+
+    stat = store.stat()
+    signature = json.dumps([str(store), stat.st_mtime_ns, stat.st_size])
+    row = conn.execute("SELECT value FROM state WHERE key = 'signature'").fetchone()
+    if row and row[0] == signature:
+        return {"issues": total, "updated": 0, "removed": 0}
+
+    with open(store) as f:
+        issues = {issue["id"]: issue for issue in issue_store.parse_lines(f) if "id" in issue}
+    known = dict(conn.execute("SELECT id, hash FROM indexed"))
+
+    updated = 0
+    with conn:
+        for issue_id, issue in issues.items():
+            doc = document(issue)
+            digest = content_hash(issue, doc)
+            if known.get(issue_id) == digest:
+                continue
+            _delete(conn, issue_id)
+            cursor = conn.execute(
+                f"INSERT INTO docs (id, status, {', '.join(FIELDS)}) VALUES (?, ?{', ?' * len(FIELDS)})",
+                (issue_id, issue.get("status", ""), *doc.values()),
+            )
+            conn.execute(
+                "INSERT INTO indexed (id, hash, rowid_) VALUES (?, ?, ?)",
+                (issue_id, digest, cursor.lastrowid),
+            )
+            updated += 1
+
+        removed = [issue_id for issue_id in known if issue_id not in issues]
+        for issue_id in removed:
+            _delete(conn, issue_id)
+
+        conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('signature', ?)", (signature,))
+
+    return {"issues": len(issues), "updated": updated, "removed": len(removed)}
+
+
+def _delete(conn: sqlite3.Connection, issue_id: str) -> None:
+    row = conn.execute("SELECT rowid_ FROM indexed WHERE id = ?", (issue_id,)).fetchone()
+    if row:
+        conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+        conn.execute("DELETE FROM indexed WHERE id = ?", (issue_id,))
+
+
+def to_fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, quoted so punctuation is literal."""
+    words = text.split()
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    limit: int = DEFAULT_LIMIT,
+    status: str | None = None,
+    exclude: str | None = None,
+) -> list[dict]:
+    """
+    Ranked matches for an FTS5 query.
+
+    Args:
+        conn: Index connection (refreshed by the caller)
+        query: FTS5 MATCH expression
+        limit: Maximum results
+        status: Only issues with this status
+        exclude: Issue ID to leave out (e.g. the task being researched)
+
+    Returns:
+        List of dicts with id, title, status, score and snippet, best first
+    """
+    weights = ", ".join(["0", "0", *(str(w) for w in FIELDS.values())])
+    sql = f"""
+        SELECT id, title, status, -bm25(docs, {weights}) AS score,
+               snippet(docs, -1, '[', ']', '...', {SNIPPET_TOKENS})
+        FROM docs WHERE docs MATCH ?
+    """
+    params: list = [query]
+    if status:
+        sql += " AND status = ?"
+        params.append(status)
+    if exclude:
+        sql += " AND id != ?"
+        params.append(exclude)
+    sql += " ORDER BY bm25(docs, " + weights + ") LIMIT ?"
+    params.append(limit)
+
+    return [
+        {"id": row[0], "title": row[1], "status": row[2], "score": round(row[3], 3), "snippet": row[4]}
+        for row in conn.execute(sql, params)
+    ]
+
+
+def related(task: dict, limit: int = 5) -> list[dict]:
+    """
+    Past tasks related to a task, by its title words (any of them).
+
+    Best-effort: returns an empty list if the index can't be used.
+    """
+    words = [w for w in task.get("title", "").split() if len(w) > 2]
+    if not words:
+        return []
+    try:
+        conn = connect()
+        try:
+            refresh(conn)
+            query = " OR ".join(to_fts_query(w) for w in words)
+            return search(conn, query, limit=limit, exclude=task.get("id"))
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        return []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Full-text search over all beads tasks")
+    parser.add_argument("query", help="Words to search for (all must match)")
+    parser.add_argument("--raw", action="store_true", help="Treat query as FTS5 syntax (AND/OR/NOT, prefix*, \"phrases\")")
+    parser.add_argument("--status", help="Only tasks with this status (e.g. closed)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Maximum results (default {DEFAULT_LIMIT})")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    query = args.query if args.raw else to_fts_query(args.query)
+    if not query:
+        error_exit("Empty search query")
+
+    conn = connect()
+    try:
+        index = refresh(conn)
+        results = search(conn, query, args.limit, args.status)
+    except sqlite3.OperationalError as e:
+        error_exit("Search failed", str(e))
+    finally:
+        conn.close()
+
+    output = {
+        "query": args.query,
+        "results": results,
+        "index": index,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    print(json.dumps(output, indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,12 @@ Session end script for Control Tower.
 
 Handles the mechanical parts of session close:
 - Check for uncommitted changes
-- Sync beads
-- Pull with rebase
-- Push to remote
+- Sync beads (coalesced, see beads_sync.py)
+- Fetch once and rebase onto the remote (see netsync.py)
+- Push master and beads-sync in one atomic push (settling end-work's
+  queued pushes, see outbox.py)
 - Verify state
+- Snapshot every task into the session history (see history.py)
 
 Usage:
     python3 scripts/session-end.py
@@ -22,9 +24,13 @@ Output JSON:
         },
         "operations": {
             "synced": true,
+            "fetched": true,  // false when a fetch from earlier in the session was reused
             "pulled": true,
-            "pushed": true
+            "pushed": true,
+            "pushed_refs": ["master", "beads-sync"],  // empty when already up to date
+            "outbox_settled": 2  // queued end-work pushes this push covered
         },
+        "beads_syncs": {"requested": 3, "ran": 1},
         "post_state": {
             "up_to_date": true,
             "branch": "master",
@@ -53,6 +59,17 @@ import sys
 from datetime import date
 from pathlib import Path
 
+import beads_sync
+import cmdcache
+import locks
+import netsync
+import outbox
+import timing
+
+# Coalesces the bd sync requests of a session-end run.
+# --no-push: beads-sync goes out with master in push_changes' atomic push.
+BEADS_SYNC = beads_sync.SyncCoordinator(["--no-push"])
+
 # Vault work log location
 WORK_LOG_DIR = Path.home() / "Documents/second-brain/01_Projects/spacetraders/logs"
 
@@ -65,7 +82,7 @@ def run_command(
 ) -> subprocess.CompletedProcess:
     """Run a command and return the result."""
     try:
-        return subprocess.run(
+        return cmdcache.run(
             cmd,
             capture_output=capture_output,
             text=True,
@@ -109,19 +126,7 @@ def get_uncommitted_files(project_root: Path) -> list[str]:
 
 def has_beads_pending(project_root: Path) -> bool:
     """Check if there are pending beads changes."""
-    result = run_command(
-        ["bd", "sync", "--status", "--json"],
-        check=False
-    )
-    if isinstance(result, subprocess.CalledProcessError):
-        return False
-
-    try:
-        data = json.loads(result.stdout)
-        # bd sync --status returns info about pending changes
-        return data.get("pending", False) or data.get("uncommitted", False)
-    except (json.JSONDecodeError, AttributeError):
-        return False
+    return beads_sync.pending_status() is True
 
 
 def is_beads_only(files: list[str]) -> bool:
@@ -136,57 +141,53 @@ def is_beads_only(files: list[str]) -> bool:
     return True
 
 
+@timing.timed
 def sync_beads() -> bool:
-    """Run bd sync. Returns True on success."""
-    result = run_command(["bd", "sync"], check=False)
-    return not isinstance(result, subprocess.CalledProcessError) and result.returncode == 0
+    """
+    Request a bd sync. Returns True on success.
+
+    Skipped (and still successful) when nothing changed since the last sync
+    by this or any other script.
+    """
+    return BEADS_SYNC.sync()["ok"]
 
 
-def pull_rebase(project_root: Path) -> tuple[bool, list[str]]:
+@timing.timed
+def pull_rebase(project_root: Path) -> tuple[bool, list[str], bool]:
     """
-    Pull with rebase.
+    Fetch (reusing a recent fetch) and rebase master onto the remote.
 
     Returns:
-        Tuple of (success, conflicting_files)
+        Tuple of (success, conflicting_files, fetched)
     """
-    result = run_command(
-        ["git", "pull", "--rebase"],
-        cwd=project_root,
-        check=False
-    )
-
-    if isinstance(result, subprocess.CalledProcessError) or result.returncode != 0:
-        # Check for conflicts
-        conflicts_result = run_command(
-            ["git", "diff", "--name-only", "--diff-filter=U"],
-            cwd=project_root,
-            check=False
-        )
+    fetch_result = netsync.fetch(project_root)
+    if not fetch_result["ok"]:
+        error_exit("git fetch failed", fetch_result.get("details", ""))
 
-        conflicting_files = []
-        if not isinstance(conflicts_result, subprocess.CalledProcessError) and conflicts_result.stdout.strip():
-            conflicting_files = conflicts_result.stdout.strip().split("\n")
-
-        if conflicting_files:
-            return (False, conflicting_files)
+    try:
+        with locks.hold((locks.MAIN_CHECKOUT, locks.EXCLUSIVE), (locks.MASTER, locks.EXCLUSIVE)):
+            success, conflicting_files = netsync.integrate(project_root)
+    except locks.LockTimeout as e:
+        error_exit(str(e), "Another agent holds the lock; inspect with `ct locks`")
+    except RuntimeError as e:
+        error_exit("git rebase onto origin/master failed", str(e))
 
-        # Some other pull failure
-        error_msg = result.stderr if hasattr(result, 'stderr') else "Unknown error"
-        error_exit("git pull --rebase failed", error_msg)
+    return (success, conflicting_files, fetch_result["fetched"])
 
-    return (True, [])
 
+@timing.timed
+def push_changes(project_root: Path) -> list[str] | None:
+    """
+    Push master and beads-sync in one atomic push.
 
-def push_changes(project_root: Path) -> bool:
-    """Push to remote. Returns True on success."""
-    result = run_command(
-        ["git", "push"],
-        cwd=project_root,
-        check=False
-    )
-    return not isinstance(result, subprocess.CalledProcessError) and result.returncode == 0
+    Returns:
+        Branches pushed (empty if already up to date), or None on failure
+    """
+    result = netsync.push(project_root)
+    return result["pushed"] if result["ok"] else None
 
 
+@timing.timed
 def verify_up_to_date(project_root: Path) -> tuple[bool, str]:
     """
     Verify we're up to date with remote.
@@ -245,6 +246,7 @@ def get_stash_list(project_root: Path) -> list[str]:
     return result.stdout.strip().split("\n")
 
 
+@timing.timed
 def get_session_summary() -> dict:
     """Get counts of issues by status and work log state."""
     summary = {
@@ -275,6 +277,14 @@ def get_session_summary() -> dict:
     return summary
 
 
+def record_history(output: dict) -> None:
+    """Append this run to the session history (see history.py)."""
+    import history  # hashlib/zlib are only needed once the run is done
+
+    history.record("session-end", output)
+
+
+@timing.timed("session_end")
 def main() -> None:
     pretty = "--pretty" in sys.argv
 
@@ -297,13 +307,17 @@ def main() -> None:
             "message": "Uncommitted non-beads changes detected. Commit or stash before closing session.",
             "session_summary": get_session_summary()
         }
+        record_history(output)
         print(json.dumps(output, indent=2 if pretty else None))
         sys.exit(3)
 
     operations = {
         "synced": False,
+        "fetched": False,
         "pulled": False,
-        "pushed": False
+        "pushed": False,
+        "pushed_refs": [],
+        "outbox_settled": 0
     }
 
     # Sync beads first
@@ -311,7 +325,8 @@ def main() -> None:
         operations["synced"] = True
 
     # Pull with rebase
-    pull_success, conflicts = pull_rebase(project_root)
+    pull_success, conflicts, fetched = pull_rebase(project_root)
+    operations["fetched"] = fetched
 
     if not pull_success:
         output = {
@@ -322,6 +337,7 @@ def main() -> None:
             "message": "Rebase conflicts detected. Resolve manually, then run session-end again.",
             "session_summary": get_session_summary()
         }
+        record_history(output)
         print(json.dumps(output, indent=2 if pretty else None))
         sys.exit(2)
 
@@ -330,15 +346,23 @@ def main() -> None:
     # Sync again after pull (in case pull brought in beads changes)
     sync_beads()
 
-    # Push
-    if push_changes(project_root):
-        operations["pushed"] = True
-    else:
+    # Push (entries queued by now are covered by it)
+    queued = [entry["entry"] for entry in outbox.pending()]
+    pushed_refs = push_changes(project_root)
+    if pushed_refs is None:
         error_exit("git push failed", "Check remote connectivity and permissions")
-
-    # Final sync after push
-    sync_beads()
+    operations["pushed"] = True
+    operations["pushed_refs"] = pushed_refs
+
+    # Final sync after push; anything it commits needs one more push
+    if BEADS_SYNC.sync()["ran"]:
+        pushed_refs = push_changes(project_root)
+        if pushed_refs is None:
+            error_exit("git push failed", "Check remote connectivity and permissions")
+        operations["pushed_refs"] = sorted(set(operations["pushed_refs"]) | set(pushed_refs))
     operations["synced"] = True
+    outbox.clear(queued)
+    operations["outbox_settled"] = len(queued)
 
     # Verify state
     up_to_date, branch = verify_up_to_date(project_root)
@@ -354,11 +378,13 @@ def main() -> None:
         "result": "success",
         "pre_state": pre_state,
         "operations": operations,
+        "beads_syncs": BEADS_SYNC.stats(),
         "post_state": post_state,
         "session_summary": get_session_summary(),
         "message": "Session closed cleanly" if up_to_date else "Pushed but may not be fully up to date"
     }
 
+    record_history(output)
     print(json.dumps(output, indent=2 if pretty else None))
 
 
@@ -9,29 +9,81 @@ Gathers session state in a single invocation:
 - Draft issues (need refinement)
 - Orphaned issues (mentioned in commits but never closed)
 - Beads update availability
+- Build health of active worktrees against master (opt-in, --build-health)
+
+With --deadline-ms, every bd/git call shares one wall-clock budget and calls
+still running when it expires are killed. Sections that did not finish fall
+back to the last complete value (stale) or are left empty (missing); the
+"sections" key reports which is which.
+
+With --rank, ready tasks are ordered by score (priority, age, how many tasks
+they unblock, category) and carry 'score' and 'why'. --top K implies --rank
+and keeps only the best K; summary counts still cover every ready task.
+
+With --stream, each section is printed as its own NDJSON line the moment it
+is ready ({"section": ..., "status": ..., "data": ...}), so a consumer can
+act on the ready queue while the beads update check is still running. The
+summary event comes last and carries "sections" (plus "stale_since" and
+"deadline" when relevant).
+
+Once the report is printed, each run also appends a snapshot of every task
+to the session history, so `ct history diff end start` lists what changed
+since the last session-end (see history.py). Under --deadline-ms it is
+skipped when the budget is already spent.
+
+With --build-health, every active worktree's branch is merged with master
+in memory and `cargo check`ed (see build_health.py). Results are cached by
+branch tree and master SHA, so only worktrees whose inputs changed are
+checked; the first sweep after master moves can take minutes.
 
 Usage:
     python3 scripts/session-start.py
     python3 scripts/session-start.py --pretty
+    python3 scripts/session-start.py --deadline-ms 1500
+    python3 scripts/session-start.py --top 5      # Five best ready tasks, ranked
+    python3 scripts/session-start.py --format columnar  # Field arrays per section (smaller)
+    python3 scripts/session-start.py --stream     # NDJSON, one event per section as it finishes
+    python3 scripts/session-start.py --build-health  # Also cargo check active worktrees
+    ct session-start --pretty
 """
 
 import json
 import subprocess
 import sys
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+import timing
+from deadline import Deadline, DeadlineExceeded
+
+# argparse, concurrent.futures, ct_state and depgraph are imported where
+# they are used: session-start runs at the top of every session and has a
+# startup budget (see startup_budget.py)
+
 SCRIPT_DIR = Path(__file__).parent
 
 
-def check_beads_update() -> bool | None:
+def beads_check_command() -> list[str]:
+    """
+    Build the command that runs `install_beads.py --check --quiet`.
+
+    Inside a ct zipapp SCRIPT_DIR is the archive itself, so the check has to
+    go through the archive's entry point instead of a file path.
+    """
+    if SCRIPT_DIR.is_file():
+        return [sys.executable, str(SCRIPT_DIR), "beads", "check", "--quiet"]
+    return ["python3", str(SCRIPT_DIR / "install_beads.py"), "--check", "--quiet"]
+
+
+@timing.timed
+def check_beads_update(deadline: Deadline) -> bool | None:
     """Check if beads update is available. Returns None on error."""
     try:
-        result = subprocess.run(
-            ["python3", str(SCRIPT_DIR / "install_beads.py"), "--check", "--quiet"],
-            capture_output=True,
-            text=True,
-            timeout=35,  # GitHub API can be slow; install_beads.py has 30s urllib timeout
+        result = deadline.run(
+            beads_check_command(),
+            cap=35,  # GitHub API can be slow; install_beads.py has 30s urllib timeout
         )
         output = result.stdout.strip()
         if '"beads_update_available": true' in output:
@@ -43,13 +95,9 @@ def check_beads_update() -> bool | None:
         return None
 
 
-def run_bd(args: list[str]) -> list[dict[str, Any]]:
+def run_bd(args: list[str], deadline: Deadline) -> list[dict[str, Any]]:
     """Run bd command and return parsed JSON."""
-    result = subprocess.run(
-        ["bd", *args, "--json"],
-        capture_output=True,
-        text=True,
-    )
+    result = deadline.run(["bd", *args, "--json"])
     if result.returncode != 0:
         # bd may write errors to stderr but still return empty list
         return []
@@ -61,17 +109,68 @@ def run_bd(args: list[str]) -> list[dict[str, Any]]:
     return json.loads(output)
 
 
-def get_meta_task_ids() -> set[str]:
+@lru_cache(maxsize=1)
+def load_graph() -> "depgraph.DepGraph":
     """
-    Get IDs of all tasks under the meta-work epic (spacetraders-m7y).
+    Dependency graph from the local issues.jsonl (loaded once per run).
 
-    Uses single `bd list --parent` call instead of per-task lookups.
+    No `bd export` fallback: that call would escape the deadline.
     """
-    meta_tasks = run_bd(["list", "--parent", "spacetraders-m7y"])
+    import depgraph
+
+    return depgraph.DepGraph.load(export_fallback=False)
+
+
+@timing.timed
+def get_meta_task_ids(deadline: Deadline) -> set[str]:
+    """
+    Get IDs of all tasks under the meta-work epic (spacetraders-m7y), at any depth.
+
+    Walks the local dependency graph; falls back to a single
+    `bd list --parent` call (direct children only) when there is no export.
+    """
+    from depgraph import META_EPIC
+
+    graph = load_graph()
+    if META_EPIC in graph:
+        return graph.descendants(META_EPIC)
+    meta_tasks = run_bd(["list", "--parent", META_EPIC], deadline)
     return {task["id"] for task in meta_tasks}
 
 
+@timing.timed
+def get_ready_tasks(deadline: Deadline) -> list[dict[str, Any]]:
+    """Get ready tasks, minus containers (epics that aren't directly actionable)."""
+    ready_tasks = run_bd(["ready"], deadline)
+    return [t for t in ready_tasks if "container" not in t.get("labels", [])]
+
+
 TASK_DISPLAY_FIELDS = {"id", "title", "status", "priority", "issue_type"}
+RANK_FIELDS = ("score", "why")
+
+# Fraction of the deadline gate evaluation may use (it runs alone, first)
+GATES_BUDGET_SHARE = 0.4
+
+# Sections whose last complete value may stand in when a run is cut short.
+# Gate evaluation closes gates as a side effect, so an old result would lie.
+STALE_OK_SECTIONS = {
+    "orphans", "categories", "ready", "in_progress", "review", "drafts", "beads_update", "build_health",
+}
+
+LAST_STATE_FILE = "session-start-last.json"
+
+# Values used when a section neither completed nor has a stale fallback
+MISSING_VALUES: dict[str, Any] = {
+    "gates": {"evaluated": 0, "closed": [], "message": "Not evaluated (deadline exceeded)"},
+    "orphans": {"found": False, "count": 0, "message": "Not checked (deadline exceeded)"},
+    "categories": [],
+    "ready": [],
+    "in_progress": [],
+    "review": [],
+    "drafts": [],
+    "beads_update": None,
+    "build_health": {"worktrees": [], "failing": [], "checked": 0, "message": "Not checked (deadline exceeded)"},
+}
 
 
 def slim_tasks(tasks: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -91,20 +190,47 @@ def categorize_tasks(
     return categorized
 
 
-def evaluate_gates() -> dict[str, Any]:
+def rank_ready(
+    tasks: list[dict[str, Any]], meta_ids: set[str], top: int | None
+) -> list[dict[str, Any]]:
+    """Order ready tasks by score (best first), keeping the top K if given."""
+    import ranking
+
+    ranked = ranking.rank(tasks, meta_ids, load_graph(), k=top)
+    categorized = categorize_tasks(ranked, meta_ids)
+    for slim_task, task in zip(categorized, ranked):
+        slim_task.update({field: task[field] for field in RANK_FIELDS})
+    return categorized
+
+
+@timing.timed
+def check_build_health(deadline: Deadline) -> dict[str, Any]:
+    """cargo check of every active worktree merged with master (cached per tree and master SHA)."""
+    import build_health
+    from ct_state import find_project_root
+
+    project_root = find_project_root()
+    if project_root is None:
+        return MISSING_VALUES["build_health"]
+    if deadline.expired():
+        raise DeadlineExceeded("No budget left for the build health sweep")
+    return build_health.sweep(project_root, deadline=deadline)
+
+
+@timing.timed
+def evaluate_gates(deadline: Deadline) -> dict[str, Any]:
     """
     Evaluate timer gates and return results.
 
+    Runs before everything else, so it only gets GATES_BUDGET_SHARE of the
+    deadline to leave room for the task queries that follow.
+
     Returns dict with:
         - evaluated: number of gates checked
         - closed: list of gate IDs that were closed
         - message: human-readable summary
     """
-    result = subprocess.run(
-        ["bd", "gate", "eval"],
-        capture_output=True,
-        text=True,
-    )
+    result = deadline.run(["bd", "gate", "eval"], share=GATES_BUDGET_SHARE)
 
     output = result.stdout.strip()
 
@@ -135,7 +261,8 @@ def evaluate_gates() -> dict[str, Any]:
     return {"evaluated": 0, "closed": [], "message": output or "Unknown"}
 
 
-def check_orphans() -> dict[str, Any]:
+@timing.timed
+def check_orphans(deadline: Deadline) -> dict[str, Any]:
     """
     Check for orphaned issues (mentioned in commits but never closed).
 
@@ -148,11 +275,7 @@ def check_orphans() -> dict[str, Any]:
         - message: human-readable output
         - raw_output: original output for debugging when format changes
     """
-    result = subprocess.run(
-        ["bd", "orphans"],
-        capture_output=True,
-        text=True,
-    )
+    result = deadline.run(["bd", "orphans"])
 
     output = result.stdout.strip()
 
@@ -170,70 +293,306 @@ def check_orphans() -> dict[str, Any]:
     }
 
 
-def main() -> None:
-    pretty = "--pretty" in sys.argv
+def build_summary(values: dict[str, Any], meta_ids: set[str]) -> dict[str, Any]:
+    """Summary counts (compact one-liner format for meta/game/total)."""
+    counts = {}
+    for name in ("ready", "in_progress", "review"):
+        tasks = values[name]
+        meta = sum(1 for t in tasks if t["id"] in meta_ids)
+        counts[name] = (meta, len(tasks) - meta, len(tasks))
+
+    def line(index: int) -> str:
+        return f"RDY: {counts['ready'][index]}, PG: {counts['in_progress'][index]}, RW: {counts['review'][index]}"
+
+    summary = {
+        "meta": line(0),
+        "game": line(1),
+        "total": line(2),
+        "draft_count": len(values["drafts"]),
+        "beads_update_available": values["beads_update"],
+        "gates_closed": len(values["gates"].get("closed", [])),
+        "orphans_found": values["orphans"].get("found", False),
+    }
+    if "build_health" in values:
+        summary["build_failing"] = len(values["build_health"].get("failing", []))
+    return summary
 
-    # Evaluate gates first (may unblock work)
-    gates_result = evaluate_gates()
 
-    # Check for orphaned issues
-    orphans_result = check_orphans()
+class SectionStream:
+    """
+    Prints one NDJSON event per section as soon as it can be rendered.
+
+    ready, in_progress and review need the meta-work IDs to be categorized,
+    so they are held back until the categories section is in.
+
+    Event format:
+        {"section": "ready", "status": "complete", "data": [...]}
+    """
+
+    CATEGORIZED = {"ready", "in_progress", "review"}
+
+    def __init__(self, results: "SectionResults", args: "argparse.Namespace"):
+        self.results = results
+        self.args = args
+        self.waiting: list[str] = []
+
+    def emit(self, name: str, data: Any, **extra: Any) -> None:
+        event = {"section": name, "status": self.results.status.get(name, "complete"), "data": data, **extra}
+        print(json.dumps(event), flush=True)
+
+    def offer(self, name: str) -> None:
+        """Called when a section has been collected."""
+        values = self.results.values
+        if name == "categories":
+            for waiting in self.waiting:
+                self.render(waiting)
+            self.waiting.clear()
+        elif name in self.CATEGORIZED and "categories" not in values:
+            self.waiting.append(name)
+        else:
+            self.render(name)
+
+    def render(self, name: str) -> None:
+        values = self.results.values
+        if name in self.CATEGORIZED:
+            meta_ids = set(values["categories"])
+            tasks = categorize_tasks(values[name], meta_ids)
+            if name == "ready" and self.args.rank:
+                shown = rank_ready(values[name], meta_ids, self.args.top)
+                omitted = {"omitted": len(tasks) - len(shown)} if len(shown) < len(tasks) else {}
+                self.emit(name, shown, **omitted)
+                return
+            self.emit(name, tasks)
+        elif name == "drafts":
+            self.emit(name, slim_tasks(values[name]))
+        else:
+            self.emit(name, values[name])
+
+
+class SectionResults:
+    """
+    Collects per-section results and tracks how complete each one is.
+
+    Status per section:
+        - complete: fetched during this run
+        - stale: this run timed out, value is from an earlier run
+        - missing: this run timed out and there is nothing to fall back on
+    """
 
-    # Get meta-work task IDs (single bd call)
-    meta_ids = get_meta_task_ids()
+    def __init__(self, previous: dict[str, Any]):
+        self.previous = previous
+        self.values: dict[str, Any] = {}
+        self.status: dict[str, str] = {}
+        self.stale_since: dict[str, str] = {}
+
+    def complete(self, name: str, value: Any) -> None:
+        self.values[name] = value
+        self.status[name] = "complete"
+
+    def fallback(self, name: str) -> None:
+        saved = self.previous.get(name)
+        if name in STALE_OK_SECTIONS and saved is not None:
+            self.values[name] = saved["value"]
+            self.status[name] = "stale"
+            self.stale_since[name] = saved["as_of"]
+        else:
+            self.values[name] = MISSING_VALUES[name]
+            self.status[name] = "missing"
+
+    def collect(self, name: str, fetch) -> None:
+        """Wait for a fetch (callable or future) and record its outcome."""
+        try:
+            value = fetch.result() if hasattr(fetch, "result") else fetch()
+        except DeadlineExceeded:
+            self.fallback(name)
+        else:
+            self.complete(name, value)
+
+    def save(self) -> None:
+        """Persist complete sections as fallbacks for future runs."""
+        as_of = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        saved = dict(self.previous)
+        for name, status in self.status.items():
+            if status == "complete" and name in STALE_OK_SECTIONS:
+                saved[name] = {"value": self.values[name], "as_of": as_of}
+        from ct_state import state_dir, write_json
+
+        try:
+            write_json(state_dir() / LAST_STATE_FILE, saved)
+        except OSError:
+            pass  # Fallback cache is best-effort
+
+
+def record_queue_gauges(results: SectionResults) -> None:
+    """Record queue sizes for `ct metrics` (only sections fetched this run)."""
+    for name, gauge in (("ready", "queue_ready"), ("in_progress", "queue_in_progress"),
+                        ("review", "queue_review"), ("drafts", "queue_draft")):
+        if results.status.get(name) == "complete":
+            timing.gauge(gauge, len(results.values[name]))
+    gates = results.values["gates"]
+    if results.status.get("gates") == "complete":
+        timing.gauge("open_gates", gates.get("evaluated", 0) - len(gates.get("closed", [])))
+
+
+def record_history(results: SectionResults, deadline: Deadline) -> None:
+    """
+    Append this run to the session history (see history.py).
 
-    # Fetch task lists
-    ready_tasks = run_bd(["ready"])
-    # Filter out container tasks (epics that aren't directly actionable)
-    ready_tasks = [t for t in ready_tasks if "container" not in t.get("labels", [])]
-    in_progress_tasks = run_bd(["list", "--status", "in_progress"])
-    review_tasks = run_bd(["list", "--status", "review"])
-    drafts_tasks = run_bd(["list", "--status", "draft"])
+    Called once the report has been printed, so the snapshot never delays
+    it. Under --deadline-ms the wait for another run's snapshot gets only
+    what is left of the budget, and no snapshot is taken once it has run
+    out.
+    """
+    sys.stdout.flush()
+    if deadline.expired():
+        return
+    import history  # hashlib/zlib are only needed once the report is built
+
+    history.record("session-start", {
+        "sections": results.status,
+        "summary": build_summary(results.values, set(results.values["categories"])),
+    }, timeout=deadline.timeout(cap=history.LOCK_TIMEOUT))
+
+
+def parse_args() -> "argparse.Namespace":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gather session state for Control Tower")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    parser.add_argument(
+        "--deadline-ms",
+        type=int,
+        default=None,
+        help="Total time budget; late calls are cancelled and their sections reported stale or missing",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "columnar"],
+        default="json",
+        help="columnar: one array per field per section, dictionary-encoded values (see columnar.py)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print one NDJSON event per section as soon as it is ready (summary last)",
+    )
+    parser.add_argument(
+        "--build-health",
+        action="store_true",
+        help="cargo check every active worktree merged with master (cached; see build_health.py)",
+    )
+    parser.add_argument("--rank", action="store_true", help="Order ready tasks by score, with explanations")
+    parser.add_argument("--top", type=int, default=None, metavar="K", help="Only the K best ready tasks (implies --rank)")
+    args = parser.parse_args()
+    if args.stream and (args.pretty or args.format != "json"):
+        parser.error("--stream prints compact NDJSON; it can't be combined with --pretty or --format")
+    if args.top is not None:
+        if args.top < 1:
+            parser.error("--top must be at least 1")
+        args.rank = True
+    return args
+
+
+@timing.timed("session_start")
+def main() -> None:
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from ct_state import read_json, state_dir
+
+    args = parse_args()
+    deadline = Deadline(args.deadline_ms)
+    results = SectionResults(read_json(state_dir() / LAST_STATE_FILE, default={}))
+
+    stream = SectionStream(results, args) if args.stream else None
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        # Slowest probe (network) and independent of the rest: start it first
+        beads_update_future = pool.submit(check_beads_update, deadline)
+
+        # Evaluate gates first (may unblock work)
+        results.collect("gates", lambda: evaluate_gates(deadline))
+        if stream:
+            stream.offer("gates")
+
+        # Everything else only reads, so fetch it concurrently
+        futures = {
+            "orphans": pool.submit(check_orphans, deadline),
+            "categories": pool.submit(lambda: sorted(get_meta_task_ids(deadline))),
+            "ready": pool.submit(get_ready_tasks, deadline),
+            "in_progress": pool.submit(run_bd, ["list", "--status", "in_progress"], deadline),
+            "review": pool.submit(run_bd, ["list", "--status", "review"], deadline),
+            "drafts": pool.submit(run_bd, ["list", "--status", "draft"], deadline),
+            "beads_update": beads_update_future,
+        }
+        if args.build_health:
+            futures["build_health"] = pool.submit(check_build_health, deadline)
+        names = {future: name for name, future in futures.items()}
+        for future in as_completed(names):
+            results.collect(names[future], future)
+            if stream:
+                stream.offer(names[future])
+
+    results.save()
+    record_queue_gauges(results)
+
+    if stream:
+        extra: dict[str, Any] = {"sections": results.status}
+        if results.stale_since:
+            extra["stale_since"] = results.stale_since
+        if args.deadline_ms is not None:
+            extra["deadline"] = {"budget_ms": args.deadline_ms, "elapsed_ms": deadline.elapsed_ms()}
+        stream.emit("summary", build_summary(results.values, set(results.values["categories"])), **extra)
+        record_history(results, deadline)
+        return
+
+    gates_result = results.values["gates"]
+    orphans_result = results.values["orphans"]
+    meta_ids = set(results.values["categories"])
+    ready_tasks = results.values["ready"]
+    in_progress_tasks = results.values["in_progress"]
+    review_tasks = results.values["review"]
+    drafts_tasks = results.values["drafts"]
 
     # Categorize tasks as meta or game work
     categorized_ready = categorize_tasks(ready_tasks, meta_ids)
     categorized_in_progress = categorize_tasks(in_progress_tasks, meta_ids)
     categorized_review = categorize_tasks(review_tasks, meta_ids)
 
+    shown_ready = rank_ready(ready_tasks, meta_ids, args.top) if args.rank else categorized_ready
+
     session_state = {
         "gates": gates_result,
         "orphans": orphans_result,
-        "ready": categorized_ready,
+        "ready": shown_ready,
         "in_progress": categorized_in_progress,
         "review": categorized_review,
         "drafts": slim_tasks(drafts_tasks),
+        "sections": results.status,
     }
+    if args.build_health:
+        session_state["build_health"] = results.values["build_health"]
+    if len(shown_ready) < len(categorized_ready):
+        session_state["ready_omitted"] = len(categorized_ready) - len(shown_ready)
+    if results.stale_since:
+        session_state["stale_since"] = results.stale_since
+    if args.deadline_ms is not None:
+        session_state["deadline"] = {
+            "budget_ms": args.deadline_ms,
+            "elapsed_ms": deadline.elapsed_ms(),
+        }
 
-    # Check for beads updates
-    beads_update = check_beads_update()
+    session_state["summary"] = build_summary(results.values, meta_ids)
 
-    # Calculate meta/game breakdown
-    meta_ready = sum(1 for t in categorized_ready if t["category"] == "meta")
-    game_ready = sum(1 for t in categorized_ready if t["category"] == "game")
-    meta_in_progress = sum(
-        1 for t in categorized_in_progress if t["category"] == "meta"
-    )
-    game_in_progress = sum(
-        1 for t in categorized_in_progress if t["category"] == "game"
-    )
-    meta_review = sum(1 for t in categorized_review if t["category"] == "meta")
-    game_review = sum(1 for t in categorized_review if t["category"] == "game")
-
-    # Add summary counts (compact one-liner format for meta/game/total)
-    session_state["summary"] = {
-        "meta": f"RDY: {meta_ready}, PG: {meta_in_progress}, RW: {meta_review}",
-        "game": f"RDY: {game_ready}, PG: {game_in_progress}, RW: {game_review}",
-        "total": f"RDY: {len(categorized_ready)}, PG: {len(categorized_in_progress)}, RW: {len(categorized_review)}",
-        "draft_count": len(drafts_tasks),
-        "beads_update_available": beads_update,
-        "gates_closed": len(gates_result.get("closed", [])),
-        "orphans_found": orphans_result.get("found", False),
-    }
+    if args.format == "columnar":
+        import columnar
+
+        session_state = columnar.encode(session_state)
 
-    if pretty:
+    if args.pretty:
         print(json.dumps(session_state, indent=2))
     else:
         print(json.dumps(session_state))
+    record_history(results, deadline)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the ct entry point.
+
+Runs fresh interpreters under `python3 -X importtime` and adds up the import
+cost that ct and its subcommand modules put on top of a bare interpreter.
+Fails when any probe goes over the budget, or when a probe pulls in a module
+that must stay lazy (e.g. tarfile for `ct beads check`).
+
+Single runs swing by 20 ms or more on a busy machine, so each probe's median
+over several interleaved runs is compared, and the budget is relative: a
+probe may cost at most BUDGET_RATIO times the reference probe (the stdlib
+modules every lifecycle script imports anyway), measured in the same runs.
+A slow machine slows both alike. --budget-ms sets an absolute budget
+instead.
+
+Usage:
+    python3 scripts/startup_budget.py
+    python3 scripts/startup_budget.py --runs 11
+    python3 scripts/startup_budget.py --budget-ms 40
+    ct startup-budget --pretty
+
+Output JSON:
+    {
+        "budget_ms": 66.0,          // BUDGET_RATIO x reference_ms, or --budget-ms
+        "budget_ratio": 2.2,        // null with --budget-ms
+        "runs": 7,
+        "reference_ms": 30.0,
+        "passed": true,
+        "probes": [
+            {"name": "ct --help", "import_ms": 0.3, "spread_ms": 0.1, "passed": true, "forbidden": []},
+            ...
+        ]
+    }
+
+Exit codes:
+    0: All probes within budget
+    1: At least one probe over budget or importing a forbidden module
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+
+# The heaviest probes (end-work, session-end) measure 1.4-1.7x the
+# reference and session-start 1.0-1.2x; 2.2 leaves about 30% headroom over
+# the worst of them
+BUDGET_RATIO = 2.2
+
+# Measured runs per probe; the median is compared against the budget
+DEFAULT_RUNS = 7
+
+# Stdlib modules every lifecycle script imports anyway (see measure())
+REFERENCE = ("reference", "import argparse, json, subprocess, threading, pathlib, contextlib")
+
+# Modules that only the install path of install_beads.py may import.
+# Everything reachable from session start must stay clear of them.
+LAZY_ONLY = {"tarfile", "tempfile", "shutil", "urllib.request", "platform"}
+
+# (name, python code to run, modules that must not appear in the import log)
+PROBES: list[tuple[str, str, set[str]]] = [
+    (
+        "ct --help",
+        "import sys; sys.argv = ['ct', '--help']; import ct; ct.main()",
+        LAZY_ONLY,
+    ),
+    ("session-start", "import importlib; importlib.import_module('session-start')", LAZY_ONLY),
+    ("begin-work", "import importlib; importlib.import_module('begin-work')", LAZY_ONLY),
+    ("end-work", "import importlib; importlib.import_module('end-work')", LAZY_ONLY),
+    ("session-end", "import importlib; importlib.import_module('session-end')", LAZY_ONLY),
+    ("beads check/doctor", "import install_beads", LAZY_ONLY),
+]
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """
+    Parse `-X importtime` output into top-level module -> cumulative µs.
+
+    Only top-level entries are kept (nested imports are already included in
+    their parent's cumulative time).
+
+    Format of each line:
+        import time: self [us] | cumulative | imported package
+        import time:       998 |       8733 |   subprocess
+    """
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # Header line
+        name = parts[2]
+        stripped = name.strip()
+        # Nesting is shown as two extra spaces per level after the first one
+        if len(name) - len(name.lstrip()) <= 1:
+            top_level[stripped] = int(parts[1])
+    return top_level
+
+
+def imported_names(stderr: str) -> set[str]:
+    """All module names in `-X importtime` output, at any depth."""
+    names = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:"):
+            parts = line.split("|")
+            if len(parts) == 3:
+                names.add(parts[2].strip())
+    return names
+
+
+def run_probe(code: str, env: dict[str, str] | None = None) -> str:
+    """
+    Run code in a fresh interpreter with importtime enabled, return stderr.
+
+    The first run of a probe may include writing .pyc files; measure()
+    discards a warm-up round.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=SCRIPT_DIR,
+        timeout=30,
+        env=env,
+    )
+    if result.returncode != 0:
+        # Import errors are interleaved with the importtime log; keep the tail
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "probe failed")
+    return result.stderr
+
+
+def import_ms(stderr: str, baseline: set[str]) -> float:
+    """Import time (ms) a probe adds on top of the bare interpreter."""
+    return sum(us for mod, us in parse_importtime(stderr).items() if mod not in baseline) / 1000
+
+
+def measure(budget_ms: float | None = None, runs: int = DEFAULT_RUNS) -> dict:
+    """
+    Run every probe `runs` times and compare each median against the budget
+    (BUDGET_RATIO x the reference median, unless budget_ms is given).
+
+    A warm-up round comes first (it may write .pyc files, which is not what
+    a cold start costs). Rounds are interleaved, probe after probe, so a
+    burst of load on the machine hits every probe once rather than all runs
+    of one probe. The reference probe imports the stdlib modules every
+    lifecycle script needs anyway: when it is slow too, the machine is slow,
+    not the scripts.
+
+    Bytecode is cached in a private PYTHONPYCACHEPREFIX (even under
+    PYTHONDONTWRITEBYTECODE), so probes measure an installed cold start, not
+    compiling every script from source, and nothing is written to scripts/.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="ct-startup-") as pycache:
+        env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+        env["PYTHONPYCACHEPREFIX"] = pycache
+        return _measure(budget_ms, runs, env)
+
+
+def _measure(budget_ms: float | None, runs: int, env: dict[str, str]) -> dict:
+    # Modules the bare interpreter imports anyway (encodings, site, ...)
+    run_probe("pass", env)
+    baseline = set(parse_importtime(run_probe("pass", env)))
+
+    samples: dict[str, list[float]] = {name: [] for name, _, _ in PROBES}
+    samples[REFERENCE[0]] = []
+    hits: dict[str, set[str]] = {name: set() for name, _, _ in PROBES}
+    errors: dict[str, str] = {}
+    for round_number in range(runs + 1):
+        for name, code, forbidden in [*PROBES, (*REFERENCE, set())]:
+            if name in errors:
+                continue
+            try:
+                stderr = run_probe(code, env)
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                errors[name] = str(e)
+                continue
+            if round_number == 0:
+                continue
+            samples[name].append(import_ms(stderr, baseline))
+            if forbidden:
+                hits[name] |= forbidden & imported_names(stderr)
+
+    reference = samples[REFERENCE[0]]
+    reference_ms = round(statistics.median(reference), 2) if reference else None
+    ratio = None
+    if budget_ms is None:
+        ratio = BUDGET_RATIO
+        budget_ms = round(BUDGET_RATIO * reference_ms, 2) if reference_ms else 0.0
+
+    probes = []
+    for name, _, _ in PROBES:
+        if name in errors:
+            probes.append({"name": name, "passed": False, "error": errors[name]})
+            continue
+        median = round(statistics.median(samples[name]), 2)
+        probes.append({
+            "name": name,
+            "import_ms": median,
+            "spread_ms": round(max(samples[name]) - min(samples[name]), 2),
+            "passed": median <= budget_ms and not hits[name],
+            "forbidden": sorted(hits[name]),
+        })
+
+    return {
+        "budget_ms": budget_ms,
+        "budget_ratio": ratio,
+        "runs": runs,
+        "reference_ms": reference_ms,
+        "passed": all(p["passed"] for p in probes),
+        "probes": probes,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check ct cold-start import budget")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help=f"Absolute budget per probe in milliseconds (default: {BUDGET_RATIO}x the reference probe)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=DEFAULT_RUNS,
+        help=f"Measured runs per probe, median compared (default: {DEFAULT_RUNS})",
+    )
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    report = measure(args.budget_ms, max(1, args.runs))
+    print(json.dumps(report, indent=2 if args.pretty else None))
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
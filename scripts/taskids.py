@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Local task ID index: resolve short and partial IDs without spawning bd.
+
+Every issue ID in the local issues.jsonl export is inserted into a prefix
+trie twice, under its full form (spacetraders-q4x) and its short form (q4x),
+so both `q4` and `spacetraders-q4` resolve. A query that matches several
+issues is reported as ambiguous with its candidates instead of being
+guessed.
+
+The ID list is persisted in .git/ct/taskids.json together with the export's
+mtime and size. When the export changes, only the added and removed IDs are
+applied to the trie; an unchanged export is never re-parsed.
+
+IDs that are not in the export (created since the last flush) resolve to
+None, and callers fall back to passing the query to bd unchanged. For the
+same reason a prefix expansion is never trusted blindly: a stale export may
+know spacetraders-abcd but not the newer spacetraders-abc, so before a
+partial query is expanded (or reported as ambiguous) `bd show <query>` is
+asked whether that exact ID exists. Exact matches need no bd call.
+
+Usage:
+    python3 scripts/taskids.py resolve q4        # {"query": "q4", "id": "spacetraders-q4x"}
+    python3 scripts/taskids.py complete q        # One short ID per line (for shell completion)
+    ct ids resolve q4
+    ct ids complete q
+
+Bash completion for task IDs after `ct begin` / `ct end`:
+    _ct_ids() { [[ ${COMP_WORDS[1]} =~ ^(begin|end)$ ]] && COMPREPLY=($(ct ids complete "${COMP_WORDS[COMP_CWORD]}")); }
+    complete -F _ct_ids ct
+
+Exit codes:
+    0: Resolved (or completions printed)
+    1: Not found or ambiguous (JSON error on stderr)
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import cmdcache
+import issue_store
+from ct_state import find_project_root, read_json, state_dir, write_json
+
+INDEX_FILE = "taskids.json"
+
+# Candidates listed in an ambiguity error
+MAX_CANDIDATES = 10
+
+
+class AmbiguousId(Exception):
+    """Raised when a partial ID matches more than one issue."""
+
+    def __init__(self, query: str, candidates: list[str]):
+        self.query = query
+        self.candidates = candidates
+        count = f"more than {MAX_CANDIDATES}" if len(candidates) > MAX_CANDIDATES else str(len(candidates))
+        super().__init__(f"Ambiguous task ID '{query}' matches {count} issues")
+
+
+def short_id(full_id: str) -> str:
+    """
+    Short form of an issue ID: everything after the last '-' of the prefix.
+
+    'spacetraders-q4x' -> 'q4x', 'my-proj-q4x.1' -> 'q4x.1'. Hashes never
+    contain '-', so the last one always ends the project prefix.
+    """
+    return full_id.rsplit("-", 1)[-1]
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: dict[str, "_Node"] = {}
+        self.ids: set[str] = set()  # Full IDs whose key ends at this node
+
+
+class IdTrie:
+    """Prefix trie over full and short issue IDs."""
+
+    def __init__(self, ids=()):
+        self.root = _Node()
+        self.ids: set[str] = set()
+        for issue_id in ids:
+            self.add(issue_id)
+
+    def _keys(self, full_id: str) -> set[str]:
+        return {full_id, short_id(full_id)}
+
+    def add(self, full_id: str) -> None:
+        if full_id in self.ids:
+            return
+        self.ids.add(full_id)
+        for key in self._keys(full_id):
+            node = self.root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+            node.ids.add(full_id)
+
+    def discard(self, full_id: str) -> None:
+        if full_id not in self.ids:
+            return
+        self.ids.discard(full_id)
+        for key in self._keys(full_id):
+            path = [self.root]
+            for char in key:
+                path.append(path[-1].children[char])
+            path[-1].ids.discard(full_id)
+            # Prune nodes that no longer lead anywhere
+            for depth in range(len(key), 0, -1):
+                node = path[depth]
+                if node.ids or node.children:
+                    break
+                del path[depth - 1].children[key[depth - 1]]
+
+    def _find(self, prefix: str) -> _Node | None:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def matches(self, prefix: str, limit: int | None = None) -> tuple[list[str], list[str]]:
+        """
+        Full IDs with a key starting with prefix.
+
+        Returns:
+            Tuple of (exact matches, all matches), the latter sorted and cut at
+            limit + 1 so callers can tell "more than limit"
+        """
+        node = self._find(prefix)
+        if node is None:
+            return ([], [])
+        found: set[str] = set()
+        stack = [node]
+        while stack and (limit is None or len(found) <= limit):
+            current = stack.pop()
+            found.update(current.ids)
+            stack.extend(current.children.values())
+        ordered = sorted(found)
+        return (sorted(node.ids), ordered if limit is None else ordered[:limit + 1])
+
+    def resolve(self, query: str) -> str | None:
+        """
+        Full ID for a short, full or partial ID.
+
+        An exact key wins over longer keys ('q4x' over its child 'q4x.1').
+
+        Raises:
+            AmbiguousId: Several issues match and none exactly
+        """
+        exact, candidates = self.matches(query, MAX_CANDIDATES)
+        if len(exact) == 1:
+            return exact[0]
+        if len(exact) > 1:
+            raise AmbiguousId(query, exact)
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            raise AmbiguousId(query, candidates)
+        return None
+
+    def complete(self, prefix: str) -> list[str]:
+        """Short IDs (or full IDs, if prefix looks like one) starting with prefix."""
+        _, candidates = self.matches(prefix)
+        keys = set()
+        for full_id in candidates:
+            keys.update(key for key in self._keys(full_id) if key.startswith(prefix))
+        # Prefer the short form when both forms match
+        short = {k for k in keys if "-" not in k}
+        return sorted(short or keys)
+
+
+def _signature(store: Path) -> list:
+    stat = store.stat()
+    return [str(store), stat.st_mtime_ns, stat.st_size]
+
+
+def load_index(project_root: Path | None = None) -> IdTrie:
+    """
+    Build the trie from the persisted ID list, applying export changes.
+
+    Returns an empty trie when there is no export.
+    """
+    project_root = project_root or find_project_root()
+    store = issue_store.find_store(project_root) if project_root else None
+    if store is None:
+        return IdTrie()
+
+    index_path = state_dir() / INDEX_FILE
+    cached = read_json(index_path, default={})
+    trie = IdTrie(cached.get("ids", []))
+    signature = _signature(store)
+    if cached.get("signature") == signature:
+        return trie
+
+    with open(store) as f:
+        current = {issue["id"] for issue in issue_store.parse_lines(f) if "id" in issue}
+    for gone in trie.ids - current:
+        trie.discard(gone)
+    for new in current - trie.ids:
+        trie.add(new)
+
+    try:
+        write_json(index_path, {"signature": signature, "ids": sorted(trie.ids)})
+    except OSError:
+        pass  # Index is a cache; resolving still worked
+    return trie
+
+
+def exact_in_bd(query: str, project_root: Path | None = None) -> str | None:
+    """
+    Full ID of the issue bd knows under exactly this (full or short) ID.
+
+    Goes through cmdcache, whose key includes the beads database
+    fingerprint, so a repeated query costs no bd call until beads changes.
+    """
+    try:
+        result = cmdcache.run(["bd", "show", query, "--json"], cwd=project_root)
+        issues = json.loads(result.stdout) if result.returncode == 0 else None
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(issues, list):
+        return None
+    for issue in issues:
+        full_id = issue.get("id") if isinstance(issue, dict) else None
+        if full_id and query in (full_id, short_id(full_id)):
+            return full_id
+    return None
+
+
+def resolve(query: str, project_root: Path | None = None) -> str | None:
+    """
+    Resolve a task ID against the local index.
+
+    A query that isn't an exact key in the index is checked against bd
+    first, so an ID created since the last export is never expanded to an
+    older, longer one.
+
+    Returns:
+        Full ID, or None if the export does not know it (pass the query to bd)
+
+    Raises:
+        AmbiguousId: Several issues match
+    """
+    trie = load_index(project_root)
+    try:
+        full_id = trie.resolve(query)
+    except AmbiguousId:
+        if trie.matches(query, 0)[0]:
+            raise
+        full_id = exact_in_bd(query, project_root)
+        if full_id is None:
+            raise
+        return full_id
+    if full_id is None or query in trie._keys(full_id):
+        return full_id
+    return exact_in_bd(query, project_root) or full_id
+
+
+def error_exit(message: str, details: str = "") -> None:
+    """Print JSON error to stderr and exit."""
+    error = {"error": message}
+    if details:
+        error["details"] = details
+    print(json.dumps(error), file=sys.stderr)
+    sys.exit(1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Resolve and complete beads task IDs locally")
+    parser.add_argument("command", choices=["resolve", "complete"])
+    parser.add_argument("query", nargs="?", default="", help="Full, short or partial task ID")
+    args = parser.parse_args()
+
+    if args.command == "complete":
+        for key in load_index().complete(args.query):
+            print(key)
+        return 0
+
+    try:
+        full_id = resolve(args.query)
+    except AmbiguousId as e:
+        error_exit(str(e), ", ".join(e.candidates[:MAX_CANDIDATES]))
+    if full_id is None:
+        error_exit(f"Task not found in local index: {args.query}")
+    print(json.dumps({"query": args.query, "id": full_id}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Phase timing for the lifecycle scripts (the recording half of metrics.py).
+
+begin-work, end-work, session-start and session-end import this at startup,
+so it stays small and imports nothing they don't load anyway; folding and
+export live in metrics.py, which is only imported when a fold is due.
+
+Each process keeps its samples in memory and, at exit, writes them as one
+file to .git/ct/metrics/samples/ (one file per process, so concurrent agents
+never race on a shared file and a script pays a single small write).
+
+Example:
+    @timing.timed
+    def pull_master(project_root): ...
+
+    @timing.timed("end_work")
+    def main(): ...
+"""
+
+import atexit
+import functools
+import os
+import threading
+import time
+
+# Fold in the writing process once this many sample files pile up
+FOLD_THRESHOLD = 500
+
+_samples: dict[str, list[int]] = {}
+_gauges: dict[str, float] = {}
+_guard = threading.Lock()
+_registered = False
+
+
+def record(phase: str, seconds: float) -> None:
+    """Record one duration for a phase (written out at process exit)."""
+    _register()
+    micros = int(seconds * 1_000_000)
+    with _guard:
+        _samples.setdefault(phase, []).append(micros)
+
+
+def gauge(name: str, value: float) -> None:
+    """Set a gauge (the latest value written by any process wins)."""
+    _register()
+    with _guard:
+        _gauges[name] = value
+
+
+def timed(phase=None):
+    """
+    Decorator recording how long each successful call takes.
+
+    Usable bare (`@timing.timed`, phase = function name) or with an explicit
+    phase name (`@timing.timed("end_work")`). Calls that raise, including
+    sys.exit() from error_exit, are not recorded.
+    """
+    def decorate(func, name):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            record(name, time.perf_counter() - start)
+            return result
+        return wrapper
+
+    if callable(phase):
+        return decorate(phase, phase.__name__)
+    return lambda func: decorate(func, phase or func.__name__)
+
+
+def _register() -> None:
+    global _registered
+    if not _registered:
+        _registered = True
+        atexit.register(flush)
+
+
+def samples_dir():
+    """Directory of pending sample files."""
+    from ct_state import state_dir
+
+    return state_dir("metrics", "samples")
+
+
+def flush() -> None:
+    """Write this process's samples and gauges as one sample file."""
+    from ct_state import write_json
+
+    with _guard:
+        if not _samples and not _gauges:
+            return
+        data = {"at": time.time(), "phases": dict(_samples), "gauges": dict(_gauges)}
+        _samples.clear()
+        _gauges.clear()
+    try:
+        directory = samples_dir()
+        write_json(directory / f"{time.time_ns()}-{os.getpid()}.json", data)
+        with os.scandir(directory) as entries:
+            pending = sum(1 for entry in entries if entry.name.endswith(".json"))
+        if pending > FOLD_THRESHOLD:
+            import metrics
+
+            metrics.fold(wait=False)
+    except OSError:
+        pass  # Metrics never fail a lifecycle script
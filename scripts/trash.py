@@ -0,0 +1,66 @@
+"""
+Instant worktree removal: rename into worktrees/.trash, delete later.
+
+`git worktree remove` deletes the whole checkout, including a cargo target/
+of several gigabytes, before returning. end-work instead:
+
+    1. renames the worktree directory into worktrees/.trash/ (same
+       filesystem, so the rename is atomic and O(1))
+    2. runs `git worktree prune`, which drops the now-dangling metadata
+    3. starts a detached, low-priority process that deletes the trashed
+       directory
+
+Anything the background delete doesn't finish (crash, reboot) is removed by
+the next `ct gc --apply`.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+TRASH_DIR = ".trash"
+
+# Run by the detached reaper; avoids depending on a script path (works in a zipapp)
+_REAPER = "import os, shutil, sys; os.nice(10); shutil.rmtree(sys.argv[1], ignore_errors=True)"
+
+
+def trash_dir(project_root: Path) -> Path:
+    return project_root / "worktrees" / TRASH_DIR
+
+
+def move_to_trash(path: Path, project_root: Path) -> Path:
+    """
+    Atomically move a directory into the trash.
+
+    Returns:
+        New location of the directory
+
+    Raises:
+        OSError: The rename failed (e.g. trash on another filesystem)
+    """
+    trash = trash_dir(project_root)
+    trash.mkdir(parents=True, exist_ok=True)
+    destination = trash / f"{path.name}-{time.time_ns()}"
+    os.rename(path, destination)
+    return destination
+
+
+def reap_in_background(path: Path) -> None:
+    """Delete a trashed directory in a detached process that outlives this one."""
+    subprocess.Popen(
+        [sys.executable, "-c", _REAPER, str(path)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def contents(project_root: Path) -> list[Path]:
+    """Directories currently in the trash."""
+    trash = trash_dir(project_root)
+    if not trash.is_dir():
+        return []
+    return sorted(p for p in trash.iterdir() if p.is_dir())
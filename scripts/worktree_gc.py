@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Garbage-collect abandoned worktrees and their disk usage.
+
+Finds worktrees under worktrees/ that are no longer needed, joined against
+task status from the local issues.jsonl export:
+
+    orphaned          Directory git no longer knows as a worktree (removed only
+                      if empty, or with --force)
+    detached          Worktree on a detached HEAD: mid-rebase, bisect or a
+                      checked-out commit (reported, kept)
+    closed_merged     Task closed and branch merged into master
+    closed_unmerged   Task closed but branch has commits master lacks (reported, kept)
+    unknown_task      Task not in the export (reported, kept)
+
+A task missing from issues.jsonl is usually one begin-work just created and
+bd hasn't exported yet; its fresh branch has no commits and so counts as
+merged, which is why unknown tasks are never removed automatically.
+
+Disk usage of every worktree (and of its target/) is measured in parallel
+with os.scandir. Without --apply nothing is changed. With --apply,
+removable worktrees without uncommitted changes and empty orphaned
+directories (all of them with --force) are moved into worktrees/.trash and
+deleted by detached processes (see trash.py), `git worktree prune` drops
+their metadata, their registry entries and merged branches are deleted.
+Whatever end-work's background deletes left in worktrees/.trash is emptied
+too.
+
+--dedupe additionally hardlinks byte-identical files across the target/
+dirs of the remaining worktrees. Cargo replaces build outputs rather than
+rewriting them in place, so shared inodes stay correct; use it on idle
+worktrees.
+
+Usage:
+    python3 scripts/worktree_gc.py                       # Report only
+    python3 scripts/worktree_gc.py --apply               # Remove removable worktrees
+    python3 scripts/worktree_gc.py --apply --dedupe      # ... and hardlink duplicate target/ files
+    ct gc --pretty
+
+Output JSON:
+    {
+        "worktrees": [
+            {"path": "worktrees/q4x", "branch": "task/q4x", "task_id": "spacetraders-q4x",
+             "status": "closed", "reason": "closed_merged", "removable": true,
+             "dirty": 0, "bytes": 2147483648, "target_bytes": 2140000000}
+        ],
+        "removed": ["worktrees/q4x"],
+        "skipped": [{"path": "worktrees/abc", "reason": "3 uncommitted changes"}],
+        "branches_deleted": ["task/q4x"],
+        "trash": {"entries": 1, "bytes": 1073741824, "emptied": true},  // worktrees/.trash (end-work)
+        "bytes_reclaimed": 2147483648,
+        "dedupe": {"files_linked": 812, "bytes_reclaimed": 734003200}
+    }
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cmdcache
+import fleet
+import issue_store
+import locks
+import registry
+import taskids
+import trash
+from ct_state import find_project_root
+
+REMOVABLE = {"orphaned", "closed_merged"}
+MAX_WORKERS = 8
+
+# Files smaller than this aren't worth hashing for dedupe
+DEDUPE_MIN_BYTES = 16 * 1024
+
+
+def error_exit(message: str, details: str = "") -> None:
+    """Print JSON error to stderr and exit."""
+    error = {"error": message}
+    if details:
+        error["details"] = details
+    print(json.dumps(error), file=sys.stderr)
+    sys.exit(1)
+
+
+def disk_usage(root: Path) -> int:
+    """Bytes allocated under root (hardlinked files counted once), via os.scandir."""
+    total = 0
+    seen: set[tuple[int, int]] = set()
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if stat.st_nlink > 1:
+                        key = (stat.st_dev, stat.st_ino)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    total += stat.st_blocks * 512
+        except OSError:
+            continue
+    return total
+
+
+def merged_branches(project_root: Path) -> set[str]:
+    result = cmdcache.run(
+        ["git", "branch", "--merged", "master", "--format=%(refname:short)"],
+        cwd=project_root,
+    )
+    return set(result.stdout.split())
+
+
+def classify(project_root: Path) -> list[dict]:
+    """Every directory under worktrees/, with why (and whether) it can go."""
+    worktrees_dir = project_root / "worktrees"
+    if not worktrees_dir.is_dir():
+        return []
+
+    registered = {path.resolve(): branch for path, branch in fleet.worktree_paths(project_root).items()}
+    merged = merged_branches(project_root)
+    issues = {taskids.short_id(i["id"]): i for i in issue_store.load_issues(project_root)}
+
+    entries = []
+    for path in sorted(p for p in worktrees_dir.iterdir() if p.is_dir() and p.name != trash.TRASH_DIR):
+        known = path.resolve() in registered
+        branch = registered.get(path.resolve())
+        issue = issues.get(path.name)
+        status = issue.get("status") if issue else None
+
+        if not known:
+            reason = "orphaned"
+        elif branch is None:
+            reason = "detached"
+        elif status == "closed":
+            reason = "closed_merged" if branch in merged else "closed_unmerged"
+        elif issue is None:
+            reason = "unknown_task"
+        else:
+            reason = "active"
+
+        entries.append({
+            "path": path,
+            "branch": branch,
+            "task_id": issue["id"] if issue else None,
+            "status": status,
+            "reason": reason,
+            "removable": reason in REMOVABLE,
+        })
+    return entries
+
+
+def remove(entry: dict, project_root: Path) -> None:
+    """
+    Move one worktree directory into the trash and delete it in the background.
+
+    Metadata is pruned afterwards. Falls back to deleting in place if the
+    rename fails (e.g. worktrees/ spans filesystems).
+    """
+    with locks.hold((locks.worktree(entry["path"].name), locks.EXCLUSIVE)):
+        try:
+            trashed = trash.move_to_trash(entry["path"], project_root)
+        except OSError:
+            import shutil
+
+            shutil.rmtree(entry["path"])
+            return
+    trash.reap_in_background(trashed)
+
+
+def dedupe(roots: list[Path]) -> dict:
+    """
+    Hardlink identical files across roots.
+
+    Files are grouped by size first; only same-size groups are hashed (in
+    parallel), and within each hash group every file is relinked to the
+    first one. Different filesystems and already-shared inodes are skipped.
+    """
+    import hashlib
+
+    by_size: dict[tuple[int, int], list[tuple[str, int]]] = {}
+    for root in roots:
+        stack = [str(root)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            if stat.st_size >= DEDUPE_MIN_BYTES:
+                                by_size.setdefault((stat.st_dev, stat.st_size), []).append((entry.path, stat.st_ino))
+            except OSError:
+                continue
+
+    def digest(path: str) -> str | None:
+        h = hashlib.blake2b(digest_size=20)
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            return None
+        return h.hexdigest()
+
+    candidates = {key: files for key, files in by_size.items() if len({ino for _, ino in files}) > 1}
+    paths = [path for files in candidates.values() for path, _ in files]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        hashes = dict(zip(paths, pool.map(digest, paths)))
+
+    linked = 0
+    reclaimed = 0
+    for (_, size), files in candidates.items():
+        groups: dict[str, list[tuple[str, int]]] = {}
+        for path, ino in files:
+            if hashes.get(path):
+                groups.setdefault(hashes[path], []).append((path, ino))
+        for group in groups.values():
+            keep_path, keep_ino = group[0]
+            for path, ino in group[1:]:
+                if ino == keep_ino:
+                    continue
+                temp = f"{path}.ct-dedupe"
+                try:
+                    os.link(keep_path, temp)
+                    os.replace(temp, path)
+                except OSError:
+                    try:
+                        os.unlink(temp)
+                    except OSError:
+                        pass
+                    continue
+                linked += 1
+                reclaimed += size
+    return {"files_linked": linked, "bytes_reclaimed": reclaimed}
+
+
+def gc(project_root: Path, apply: bool, force: bool, with_dedupe: bool) -> dict:
+    entries = classify(project_root)
+    trashed = trash.contents(project_root)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        trash_bytes = sum(pool.map(disk_usage, trashed))
+        sizes = list(pool.map(lambda e: disk_usage(e["path"]), entries))
+        target_sizes = list(pool.map(lambda e: disk_usage(e["path"] / "target"), entries))
+        dirty = list(pool.map(
+            lambda e: _content_count(e["path"]) if e["reason"] == "orphaned" else fleet.dirty_count(e["path"]), entries
+        ))
+    for entry, size, target_size, changes in zip(entries, sizes, target_sizes, dirty):
+        entry.update({"dirty": changes, "bytes": size, "target_bytes": target_size})
+
+    removed = []
+    skipped = []
+    branches_deleted = []
+    if apply:
+        doomed = []
+        for entry in entries:
+            if not entry["removable"]:
+                continue
+            if entry["dirty"] is None and not force:
+                skipped.append({"path": entry["path"], "reason": "could not read git status"})
+                continue
+            if entry["dirty"] and not force:
+                what = "entries in a directory git doesn't know" if entry["reason"] == "orphaned" else "uncommitted changes"
+                skipped.append({"path": entry["path"], "reason": f"{entry['dirty']} {what}"})
+                continue
+            doomed.append(entry)
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            outcomes = list(pool.map(lambda e: _try_remove(e, project_root), doomed))
+        for entry, error in zip(doomed, outcomes):
+            if error:
+                skipped.append({"path": entry["path"], "reason": error})
+            else:
+                removed.append(entry)
+
+        # Leftovers of end-work's background deletes
+        import shutil
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            list(pool.map(lambda p: shutil.rmtree(p, ignore_errors=True), trashed))
+
+        cmdcache.run(["git", "worktree", "prune"], cwd=project_root)
+        for entry in removed:
+            registry.unregister(entry["path"].name)
+            if entry["branch"] and entry["reason"] != "orphaned":
+                result = cmdcache.run(["git", "branch", "-d", entry["branch"]], cwd=project_root)
+                if result.returncode == 0:
+                    branches_deleted.append(entry["branch"])
+
+    output = {
+        "worktrees": [_relative(entry, project_root) for entry in entries],
+        "removed": [os.path.relpath(e["path"], project_root) for e in removed],
+        "skipped": [{**s, "path": os.path.relpath(s["path"], project_root)} for s in skipped],
+        "branches_deleted": branches_deleted,
+        "trash": {"entries": len(trashed), "bytes": trash_bytes, "emptied": apply},
+        "bytes_reclaimed": sum(e["bytes"] for e in removed) + (trash_bytes if apply else 0),
+    }
+
+    if with_dedupe:
+        removed_paths = {e["path"] for e in removed}
+        targets = [
+            e["path"] / "target" for e in entries
+            if e["path"] not in removed_paths and (e["path"] / "target").is_dir()
+        ]
+        if apply:
+            output["dedupe"] = dedupe(targets)
+        else:
+            output["dedupe"] = {"targets": len(targets), "note": "dry run; pass --apply to link"}
+    return output
+
+
+def _content_count(path: Path) -> int:
+    """Entries directly under a directory (a leftover .git file included)."""
+    try:
+        with os.scandir(path) as entries:
+            return sum(1 for _ in entries)
+    except OSError:
+        return 1
+
+
+def _try_remove(entry: dict, project_root: Path) -> str | None:
+    try:
+        remove(entry, project_root)
+    except (OSError, locks.LockTimeout) as e:
+        return str(e)
+    return None
+
+
+def _relative(entry: dict, project_root: Path) -> dict:
+    return {**entry, "path": os.path.relpath(entry["path"], project_root)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Remove abandoned worktrees and reclaim disk space")
+    parser.add_argument("--apply", action="store_true", help="Actually remove (default: report only)")
+    parser.add_argument("--force", action="store_true", help="Also remove worktrees with uncommitted changes")
+    parser.add_argument("--dedupe", action="store_true", help="Hardlink identical files across remaining target/ dirs")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    args = parser.parse_args()
+
+    project_root = find_project_root()
+    if project_root is None:
+        error_exit("Not inside a git repository")
+
+    print(json.dumps(gc(project_root, args.apply, args.force, args.dedupe), indent=2 if args.pretty else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())